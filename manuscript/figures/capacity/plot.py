@@ -1,3 +1,4 @@
+import os
 import pandas
 import pyam
 import matplotlib.pyplot as plt
@@ -9,6 +10,14 @@ from shapely import geometry, ops
 from matplotlib.lines import Line2D
 import numpy as np
 
+
+def read_result(name, **kwargs):
+    """Reads a model result, preferring the Parquet output over the Excel export."""
+    if os.path.exists(name + ".parquet"):
+        return pandas.read_parquet(name + ".parquet")
+    return pandas.read_excel(name + ".xlsx", **kwargs)
+
+
 plt.rcParams['ytick.labelsize'] = 7
 
 def draw_brace(ax, xspan, text):
@@ -42,7 +51,7 @@ def draw_brace(ax, xspan, text):
 _color_pressure = {'Transmission line': '#9B0000', "High-Pressure": "#9B0000", "Mid-Pressure": "#A6CF98"}
 plt.style.use(["science"])
 
-_cap_2050 = pyam.IamDataFrame("PipCapacity.xlsx").filter(year=2050)
+_cap_2050 = pyam.IamDataFrame(read_result("PipCapacity")).filter(year=2050)
 high2050 = _cap_2050.filter(variable=["High-Pressure|Pipeline capacity", "Transmission|Pipeline capacity"]).data
 mid2050 = _cap_2050.filter(variable="Mid-Pressure|Pipeline capacity").data
 
@@ -1,3 +1,4 @@
+import os
 import pandas
 import pyam
 import matplotlib.pyplot as plt
@@ -15,6 +16,25 @@ import matplotlib.colors as c
 from utils import create_lines_between_centroids
 
 
+def read_result(name, **kwargs):
+    """Reads a model result, preferring the Parquet output over the Excel export."""
+    if os.path.exists(name + ".parquet"):
+        return pandas.read_parquet(name + ".parquet")
+    return pandas.read_excel(name + ".xlsx", **kwargs)
+
+
+def read_shadow_prices(name):
+    """Reads shadow prices per node (rows) and year (columns): the labelled table of
+    the model (Parquet) or the committed Excel export without header (from 2025)."""
+    if os.path.exists(name + ".parquet"):
+        df = pandas.read_parquet(name + ".parquet")
+        df.columns = [int(year) for year in df.columns]
+        return df
+    df = pandas.read_excel(name + ".xlsx", header=None)
+    df.columns = range(2025, 2025 + len(df.columns))
+    return df
+
+
 """PREAMBLE AND DEFINITIONS"""
 
 _color_pressure = {'Transmission line': '#9B0000',
@@ -41,7 +61,7 @@ districts = districts.loc[districts["GISCO_ID"].str.contains('AT_8')]
 districts.set_crs(epsg="4326", inplace=True)
 districts.boundary.plot(ax=ax_network, color="black", linewidth=0.05, zorder=1)
 
-regions_connected = pyam.IamDataFrame('Demands.xlsx').region
+regions_connected = pyam.IamDataFrame(read_result("Demands")).region
 centroids = districts.loc[districts['LAU_NAME'].isin(regions_connected)]
 
 centroids.plot(ax=ax_network, color='lightgray')
@@ -132,8 +152,8 @@ ax_socialization.text(x=0, y=50, s='Socialized (96.29)', va="center", ha="center
 
 
 '''2030's MID-PRESSURE SHADOW PRICES'''
-run2 = pandas.read_excel('2MP_SHD_PRICES.xlsx', header=None).iloc[:, 5].values
-run3 = pandas.read_excel('3MP_SHD_PRICES.xlsx', header=None).iloc[:, 5].values
+run2 = read_shadow_prices("2MP_SHD_PRICES")[2030].values
+run3 = read_shadow_prices("3MP_SHD_PRICES")[2030].values
 
 box_values = [run2, run3]
 
@@ -173,13 +193,12 @@ leg = ax_2030.legend(
 )
 
 '''TEMPORAL DEVELOPMENT OF SHADOW PRICE'''
-x = range(0, 26, 1)
-
-co_near = pandas.read_excel('2MP_SHD_PRICES.xlsx').iloc[-5, :]
-co_off = pandas.read_excel('2MP_SHD_PRICES.xlsx').iloc[-13, :]
+co_near = read_shadow_prices("2MP_SHD_PRICES").iloc[-5, :]
+co_off = read_shadow_prices("2MP_SHD_PRICES").iloc[-13, :]
 
-es_near = pandas.read_excel('3MP_SHD_PRICES.xlsx').iloc[-5, :]
-es_off = pandas.read_excel('3MP_SHD_PRICES.xlsx').iloc[-13, :]
+es_near = read_shadow_prices("3MP_SHD_PRICES").iloc[-5, :]
+es_off = read_shadow_prices("3MP_SHD_PRICES").iloc[-13, :]
+x = co_near.index
 
 
 
@@ -191,7 +210,7 @@ ax_time.plot(x, es_off, color='#d8b365')
 
 ax_time.set_title('Shadow price in EUR/MWh', fontsize=8)
 
-ax_time.set_xticks(ticks=[0, 5, 10, 15, 20, 25])
+ax_time.set_xticks(ticks=[2025, 2030, 2035, 2040, 2045, 2050])
 ax_time.set_xticklabels(labels=['2025', '2030', '2035', '2040', '2045', '2050'])
 
 _patches = []
@@ -1,3 +1,4 @@
+import os
 import pandas
 import pyam
 import matplotlib.pyplot as plt
@@ -9,6 +10,14 @@ from shapely import geometry, ops
 from matplotlib.lines import Line2D
 import numpy as np
 
+
+def read_result(name, **kwargs):
+    """Reads a model result, preferring the Parquet output over the Excel export."""
+    if os.path.exists(name + ".parquet"):
+        return pandas.read_parquet(name + ".parquet")
+    return pandas.read_excel(name + ".xlsx", **kwargs)
+
+
 plt.rcParams['ytick.labelsize'] = 7
 
 def draw_brace(ax, xspan, text):
@@ -42,7 +51,7 @@ def draw_brace(ax, xspan, text):
 _color_pressure = {'Transmission line': '#9B0000', "High-Pressure": "#9B0000", "Mid-Pressure": "#A6CF98"}
 plt.style.use(["science"])
 
-data = pyam.IamDataFrame('Demands.xlsx')
+data = pyam.IamDataFrame(read_result("Demands"))
 High_Supplied = data.filter(variable='Gas|Demand|High|Supplied')
 High_Not_Supplied = data.filter(variable='Gas|Demand|High|Not Supplied')
 
@@ -1,3 +1,4 @@
+import os
 import pandas
 import pyam
 import matplotlib.pyplot as plt
@@ -5,6 +6,13 @@ import matplotlib.colors as c
 import matplotlib
 
 
+def read_result(name, **kwargs):
+    """Reads a model result, preferring the Parquet output over the Excel export."""
+    if os.path.exists(name + ".parquet"):
+        return pandas.read_parquet(name + ".parquet")
+    return pandas.read_excel(name + ".xlsx", **kwargs)
+
+
 def prepare_ax(ax=None):
     ax.spines["top"].set_visible(False)
     ax.spines["right"].set_visible(False)
@@ -75,7 +83,7 @@ high.rename(columns={"value": "today"}, inplace=True)
 mid = pandas.merge(mid, _mid_names, left_on="region", right_index=True)
 mid.rename(columns={"value": "today"}, inplace=True)
 
-_cap_2050 = pyam.IamDataFrame("PipCapacity.xlsx").filter(year=2050)
+_cap_2050 = pyam.IamDataFrame(read_result("PipCapacity")).filter(year=2050)
 _transmission2050 = _cap_2050.filter(variable="Transmission|Pipeline capacity").data
 _high2050 = _cap_2050.filter(variable="High-Pressure|Pipeline capacity").data
 _mid2050 = _cap_2050.filter(variable="Mid-Pressure|Pipeline capacity").data
@@ -1,3 +1,4 @@
+import os
 import pandas
 import matplotlib.pyplot as plt
 import numpy as np
@@ -5,6 +6,19 @@ from matplotlib.lines import Line2D
 import matplotlib.colors as c
 import matplotlib
 
+
+def read_shadow_prices(name):
+    """Reads shadow prices per node (rows) and year (columns): the labelled table of
+    the model (Parquet) or the committed Excel export without header (from 2025)."""
+    if os.path.exists(name + ".parquet"):
+        df = pandas.read_parquet(name + ".parquet")
+        df.columns = [int(year) for year in df.columns]
+        return df
+    df = pandas.read_excel(name + ".xlsx", header=None)
+    df.columns = range(2025, 2025 + len(df.columns))
+    return df
+
+
 # ZUERST GGPLOT UND DANN SCIENCE
 
 plt.style.use('science')
@@ -15,13 +29,16 @@ bound = list(range(0, 5, 1))
 norm = c.BoundaryNorm(bound, cmap.N)
 
 
-midpress = pandas.read_excel('MP_SHD_PRICES.xlsx', header=None)
+midpress = read_shadow_prices("MP_SHD_PRICES")
 mid_price = 17.5
 for c in midpress.columns:
     for r in midpress.index:
         value = midpress.loc[r, c]
+        if np.isnan(value):
+            # node without demand constraint
+            continue
         rou_value = np.round(value, 5)
-        ref = np.round(- mid_price / (1.025 ** c), 5)
+        ref = np.round(- mid_price / (1.025 ** (c - 2025)), 5)
         
         if np.absolute(rou_value - ref) < 0.001:
             # NO NETWORK EXPANSION / REDUCED (i.e., -17.5)
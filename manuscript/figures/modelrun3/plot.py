@@ -1,3 +1,4 @@
+import os
 import pandas
 import pyam
 import matplotlib.pyplot as plt
@@ -13,6 +14,13 @@ from matplotlib_scalebar.scalebar import ScaleBar
 import matplotlib.colors as c
 
 
+def read_result(name, **kwargs):
+    """Reads a model result, preferring the Parquet output over the Excel export."""
+    if os.path.exists(name + ".parquet"):
+        return pandas.read_parquet(name + ".parquet")
+    return pandas.read_excel(name + ".xlsx", **kwargs)
+
+
 """PREAMBLE AND DEFINITIONS"""
 
 _color_pressure = {'Transmission line': '#9B0000',
@@ -55,7 +63,7 @@ def create_lines_between_centroids(LAU=None, Nodes=None):
 # _init = pandas.read_excel("InitCapacities2025.xlsx")
 # initial = _init
 
-_init = pyam.IamDataFrame('PipCapacity.xlsx').filter(year=2025).data
+_init = pyam.IamDataFrame(read_result("PipCapacity")).filter(year=2025).data
 
 
 
@@ -101,7 +109,7 @@ high.rename(columns={"value": "today"}, inplace=True)
 mid = pandas.merge(mid, _mid_names, left_on="region", right_index=True)
 mid.rename(columns={"value": "today"}, inplace=True)
 
-_cap_2050 = pyam.IamDataFrame("PipCapacity.xlsx").filter(year=2050)
+_cap_2050 = pyam.IamDataFrame(read_result("PipCapacity")).filter(year=2050)
 _transmission2050 = _cap_2050.filter(variable="Transmission|Pipeline capacity").data
 _high2050 = _cap_2050.filter(variable="High-Pressure|Pipeline capacity").data
 _mid2050 = _cap_2050.filter(variable="Mid-Pressure|Pipeline capacity").data
@@ -242,7 +250,7 @@ ax_cap.get_xaxis().set_ticks([])
 ax_cap.get_yaxis().set_ticks([])
 
 '''DEMAND SUPPLIED / NOT SUPPLIED'''
-data = pyam.IamDataFrame('Demands.xlsx')
+data = pyam.IamDataFrame(read_result("Demands"))
 High_Supplied = data.filter(variable='Gas|Demand|High-Pressure|Supplied').aggregate_region('Gas|Demand|High-Pressure|Supplied')
 High_Supplied.convert_unit(current='MWh', to='TWh', factor=1/1000000, inplace=True)
 High_Aggregated = High_Supplied.data.groupby('year').agg(value_per_year = ('value', 'sum'))
@@ -0,0 +1,140 @@
+import time
+import numpy as np
+import pandas as pd
+import utils
+
+
+"""
+BENCHMARK: BUILD TIME OF THE LINE PARAMETERS AGAINST THE NUMBER OF LINES
+Compares the one-pass table builder (utils.get_line_parameters) with the
+former initialization that filtered the pipeline data per (line, year) index.
+Both return the same parameters, which is asserted for each network size of
+the former one.
+"""
+
+YEARS = list(range(2025, 2051))
+LINE_COUNTS = [50, 100, 200, 400, 800, 1600, 3200]
+MAX_LINES_PER_INDEX = 400
+
+
+def synthetic_network(lines=None, seed=0):
+    _rng = np.random.default_rng(seed)
+    _nodes = ["Node {}".format(i) for i in range(lines + 1)]
+    _lines = pd.DataFrame(
+        {
+            "Start": _nodes[:-1],
+            "End": _nodes[1:],
+            "Type": "Mid-Pressure",
+            "Length": _rng.uniform(1, 20, lines),
+        }
+    )
+    _technical = pd.DataFrame(
+        {
+            "Start": _lines.Start,
+            "End": _lines.End,
+            "Type": "Mid-Pressure",
+            "Capacity": _rng.integers(10, 1000, lines),
+            "Yr.-con.": _rng.integers(1960, 2020, lines),
+            "Tec.-life": 50,
+        }
+    )
+    _economic = pd.DataFrame(
+        {
+            "Start": _lines.Start,
+            "End": _lines.End,
+            "Type": "Mid-Pressure",
+            "Inv.-cost": _rng.integers(0, 500, lines),
+            "Yr.-con": _technical["Yr.-con."],
+            "Amort.": 50,
+        }
+    )
+    return _lines, _technical, _economic
+
+
+def per_index(lines=None, technical=None, economic=None, line_type=None, years=None):
+    """
+    Former initialization: one boolean-mask scan of the pipeline data per index.
+
+    Returns
+    -------
+    parameters : Dict
+        Same as utils.get_line_parameters.
+
+    """
+
+    def _row(data, line):
+        _line = lines.loc[line]
+        return data.loc[
+            (data.Start == _line.Start)
+            & (data.End == _line.End)
+            & (data.Type == line_type)
+        ]
+
+    parameters = {"capacity": {}, "depreciation": {}, "book_value": {}}
+    for line in lines.index:
+        for year in years:
+            _tec = _row(technical, line)
+            _eco = _row(economic, line)
+            _con = _tec["Yr.-con."].item()
+            _end = _con + _tec["Tec.-life"].item()
+            parameters["capacity"][line, year] = (
+                _tec.Capacity.item() if _end > year else 0
+            )
+            parameters["depreciation"][line, year] = (
+                0 if _end > year else 1 - (year - _end) / 50
+            )
+            _amo = _eco["Amort."].item()
+            if year > _con + _amo:
+                parameters["book_value"][line, year] = 0
+            else:
+                parameters["book_value"][line, year] = (
+                    _tec.Capacity.item() * _eco["Inv.-cost"].item()
+                ) * (1 - (year - _con) / _amo)
+    parameters["year_of_inv"] = {}
+    for line in lines.index:
+        _tec = _row(technical, line)
+        parameters["year_of_inv"][line] = (
+            _tec["Yr.-con."].item() + _tec["Tec.-life"].item()
+        )
+    return parameters
+
+
+def assert_equal(parameters=None, expected=None):
+    """Raises an AssertionError if two results of the builders differ."""
+    for _name, _values in expected.items():
+        if parameters[_name].keys() != _values.keys():
+            raise AssertionError("Indices of {} differ".format(_name))
+        _keys = list(_values)
+        if not np.allclose(
+            [parameters[_name][_key] for _key in _keys],
+            [_values[_key] for _key in _keys],
+        ):
+            raise AssertionError("Values of {} differ".format(_name))
+    return
+
+
+def timed(function, **kwargs):
+    _start = time.perf_counter()
+    result = function(**kwargs)
+    return result, time.perf_counter() - _start
+
+
+if __name__ == "__main__":
+    print("{:>8} {:>14} {:>14}".format("Lines", "Per index [s]", "One pass [s]"))
+    for count in LINE_COUNTS:
+        _lines, _technical, _economic = synthetic_network(lines=count)
+        _kwargs = dict(
+            lines=_lines,
+            technical=_technical,
+            economic=_economic,
+            line_type="Mid-Pressure",
+            years=YEARS,
+        )
+        _parameters, _one_pass = timed(utils.get_line_parameters, **_kwargs)
+        if count <= MAX_LINES_PER_INDEX:
+            _expected, _seconds = timed(per_index, **_kwargs)
+            assert_equal(parameters=_parameters, expected=_expected)
+            _per_index = "{:14.3f}".format(_seconds)
+        else:
+            _per_index = "{:>14}".format("-")
+        print("{:>8} {} {:14.3f}".format(count, _per_index, _one_pass))
@@ -1,35 +1,50 @@
-import pandas as pd
+import os
+import sys
 import utils
 import constraints
+import matrix
 import report
 from pathlib import Path
 from pyomo.environ import Suffix
-import numpy as np
 
 
-"""READ IN SHAPEFILES"""
-_trans = utils.read_shapefile(path="transmission", name="transmission.shp")
-_high = utils.read_shapefile(path="high", name="high.shp")
-_mid = utils.read_shapefile(path="mid", name="mid.shp")
+"""BUILD PROFILE (ENABLED BY GND_PROFILE=1, GND_PROFILE=memory OR --profile)"""
+profiler = utils.Profiler()
+
+
+"""PARAMETER OVERRIDES OF A SWEEP RUN (GND_OVERRIDES, SEE sweep.py)"""
+_overrides = utils.get_overrides()
+
+
+"""READ IN SHAPEFILES (NETWORK TOPOLOGY ONLY, NO GEOMETRIES)"""
+with profiler.phase("read shapefiles"):
+    _trans = utils.read_shapefile(
+        path="transmission", name="transmission.shp", geometry=False
+    )
+    _high = utils.read_shapefile(path="high", name="high.shp", geometry=False)
+    _mid = utils.read_shapefile(path="mid", name="mid.shp", geometry=False)
 
 
 """READ IN DATA"""
 _path = Path("data")
 
-_demand = pd.read_excel(_path / "INPUT_Demand.xlsx")
-_pipeline_eco = pd.read_excel(_path / "INPUT_Pipelines_Economic.xlsx")
-_pipeline_tec = pd.read_excel(_path / "INPUT_Pipelines_Technical.xlsx")
-_refurbishment = pd.read_excel(_path / "INPUT_Refurbishment.xlsx")
-_source = pd.read_excel(_path / "INPUT_Source.xlsx")
-_storage = pd.read_excel(_path / "INPUT_Storage_Technical.xlsx")
-_time_dev = pd.read_excel(_path / "INPUT_Time_Resolution.xlsx")
-_prices = pd.read_excel(_path / "INPUT_Prices.xlsx")
+with profiler.phase("read input data"):
+    _demand = utils.read_input(path=_path / "INPUT_Demand.xlsx")
+    _pipeline_eco = utils.read_input(path=_path / "INPUT_Pipelines_Economic.xlsx")
+    _pipeline_tec = utils.read_input(path=_path / "INPUT_Pipelines_Technical.xlsx")
+    _refurbishment = utils.read_input(path=_path / "INPUT_Refurbishment.xlsx")
+    _source = utils.read_input(path=_path / "INPUT_Source.xlsx")
+    _storage = utils.read_input(path=_path / "INPUT_Storage_Technical.xlsx")
+    _time_dev = utils.read_input(path=_path / "INPUT_Time_Resolution.xlsx")
+    _prices = utils.read_input(path=_path / "INPUT_Prices.xlsx")
 
 
 """NODES OF THE NETWORK"""
-_nodes = utils.get_nodes_from_lines(
-    transmission=_trans, high_pressure=_high, mid_pressure=_mid
-)
+with profiler.phase("network topology"):
+    _topology = utils.get_network_topology(
+        transmission=_trans, high_pressure=_high, mid_pressure=_mid
+    )
+    _nodes = utils.get_nodes_from_lines(topology=_topology)
 
 
 """PYOMO.CONCRETEMODEL()"""
@@ -39,7 +54,7 @@ model.transmission = _trans
 model.high = _high
 model.mid = _mid
 
-utils.add_import_and_export_lines_per_node(model=model)
+utils.add_network_topology(model=model, topology=_topology)
 
 model.demand = _demand
 model.pipeline_economic = _pipeline_eco
@@ -50,30 +65,94 @@ model.storage = _storage
 model.temporal_demand = _time_dev
 model.prices = _prices
 
-utils.add_nodal_sets(model=model, nodes=_nodes)
-
-utils.add_line_sets(model=model, data=[_trans, _high, _mid])
-utils.add_time_horizon(model=model, year=2050, temporal=12)
-utils.add_parameter_to_model(model=model)
-utils.add_decision_variables(model=model)
-
-constraints.add(model=model)
-utils.add_objective_function(model=model)
-
-"""PRINT AND DISPLAY THE MODEL"""
-utils.print_model(model)
+with profiler.phase("sets"):
+    utils.add_nodal_sets(model=model, nodes=_nodes)
+    utils.add_line_sets(model=model, data=[_trans, _high, _mid])
+    utils.add_time_horizon(
+        model=model, year=_overrides.pop("horizon", utils.HORIZON), temporal=12
+    )
+with profiler.components("parameters"):
+    utils.add_parameter_to_model(
+        model=model,
+        decline=utils.get_demand_decline(
+            period=_overrides.pop("decline_period", None),
+            residual=_overrides.pop("residual_share", None),
+        ),
+    )
+    utils.set_parameters(model=model, **_overrides)
+with profiler.components("variables"):
+    utils.add_decision_variables(model=model)
+
+"""CONSTRAINTS: PYOMO OR MATRIX ASSEMBLY (ENABLED BY GND_BACKEND=matrix OR --backend)"""
+_backend = utils.get_backend()
+with profiler.components("constraints"):
+    if _backend == "matrix":
+        lp = matrix.build(model=model, exclude=constraints.VARIANTS["CO"])
+    else:
+        constraints.add(model=model, variant="CO")
+with profiler.phase("objective"):
+    utils.add_objective_function(model=model)
+
+"""PRINT AND DISPLAY THE MODEL (ENABLED BY GND_DUMP=1 OR --dump)"""
+with profiler.phase("print model"):
+    utils.print_model(model)
 
 model.dual = Suffix(direction=Suffix.IMPORT)
 
-"""START TO SOLVE THE MODEL"""
-Solver = utils.set_solver_for_the_model(model)
-solution = Solver.solve(model, tee=True)
-
-solution.write()
+"""RUN STAGES: STOP AFTER WRITING THE MODEL (BUILD) OR LOAD THE SOLUTION (REPORT)"""
+_stage = utils.get_stage()
+_fix_and_dual = utils.get_fix_and_dual()
+if _fix_and_dual and _stage is not None:
+    raise ValueError("The fix and dual mode re-solves in this process, not in stages.")
+if _backend == "matrix" and (
+    _stage is not None or _fix_and_dual or utils.get_start_path() is not None
+):
+    raise ValueError(
+        "The matrix backend solves in this process, without a warm start or the "
+        "fix and dual mode."
+    )
+if _stage == "build":
+    with profiler.phase("write mps"):
+        utils.write_mps(model=model)
+    profiler.write(path=utils.STAGE_PATH)
+    sys.exit()
+
+"""START TO SOLVE THE MODEL (REPORT STAGE: LOAD THE SOLUTION OF solve.py)"""
+_duals = None
+if _stage == "report":
+    with profiler.phase("load solution"):
+        solution = utils.read_sol(model=model)
+    _basis = None
+elif _backend == "matrix":
+    with profiler.phase("solve"):
+        _solution = matrix.solve(lp=lp)
+    print("Status: {}".format(_solution["status"]))
+    with profiler.phase("load solution"):
+        _duals = matrix.load_solution(model=model, lp=lp, solution=_solution)
+    _basis = None
+else:
+    # fix and dual: the persistent interface keeps the loaded model for the re-solve
+    Solver = utils.set_solver_for_the_model(model, persistent=_fix_and_dual)
+    _warmstart = False
+    if utils.get_start_path() is not None:
+        with profiler.phase("warm start"):
+            _warmstart = utils.set_start(
+                model=model,
+                Solver=Solver,
+                start=report.read_start(path=utils.get_start_path(), model=model),
+            )
+    with profiler.phase("solve"):
+        solution = Solver.solve(model, tee=True, warmstart=_warmstart)
+    solution.write()
+    _basis = utils.get_basis(Solver)
 model.objective.display()
 
 """REPORT RESULTS IN OUTPUT FILES"""
-report.write_results_to_folder(model, "CO_MD1")
+with profiler.phase("report"):
+    _solution_path = report.write_results_to_folder(
+        model, "CO_MD1", basis=_basis, duals=_duals
+    )
+profiler.write(path=_solution_path)
 
 # """PRINT (NODAL) GAS SHADOW PRICE FOR THE FIRST YEAR"""
 # print('NODE / YEAR : VALUE')
@@ -83,11 +162,48 @@ report.write_results_to_folder(model, "CO_MD1")
 #     print("Available demand: {}".format(model.par_demand_high[node, 2050, 1]))
     
 print('SHADOW PRICE : MID-PRESSURE GAS NETWORK DEMAND')
-for year in model.set_year:
-    print('{} : {}' .format(year, model.dual[model.c_limit_mid_demand['Bludesch', year, 1]]))
-    
+_prices = report.get_shadow_prices(
+    model=model, constraint="c_limit_mid_demand", duals=_duals
+)
+for year, value in _prices.loc['Bludesch'].items():
+    print('{} : {}' .format(year, value))
+
 print('SHADOW PRICE : HIGH-PRESSURE GAS NETWORK DEMAND')
+_prices = report.get_shadow_prices(
+    model=model, constraint="c_limit_high_demand", duals=_duals
+)
 for region in ['Bregenz', 'Nenzing']:
-    for year in model.set_year:
-        print('{} : {}' .format(year, model.dual[model.c_limit_high_demand[region, year, 1]]))
-    
\ No newline at end of file
+    for year, value in _prices.loc[region].items():
+        print('{} : {}' .format(year, value))
+
+
+"""FIX AND DUAL (ENABLED BY GND_FIX_AND_DUAL=1 OR --fix-and-dual): MODEL RUN 2"""
+if _fix_and_dual:
+    with profiler.phase("fix and dual"):
+        utils.add_opt_demand(model=model)
+        constraints.pin_demand(model=model)
+        # a basis of run 1 does not fit the pinned model: slower than the presolve
+        utils.clear_basis(Solver)
+        solution = Solver.solve(model, tee=True)
+    solution.write()
+    model.objective.display()
+
+    # a sweep run (RUN_ID) gets the second folder <run id>-CO_MD2
+    _run_id = os.environ.get(report.RUN_ID)
+    _solution_path = report.write_results_to_folder(
+        model,
+        "CO_MD2",
+        run_id=_run_id and "{}-CO_MD2".format(_run_id),
+        basis=utils.get_basis(Solver),
+    )
+    profiler.write(path=_solution_path)
+
+    """SHADOW PRICES OF THE OPTIMAL DEMAND BOUNDS (NODE x YEAR, FIRST MONTH)"""
+    report.write_shadow_prices(
+        model=model,
+        path=_solution_path,
+        constraints={
+            "HP_SHD_PRICES": model.c_opt_bound_high,
+            "MP_SHD_PRICES": model.c_opt_bound_mid,
+        },
+    )
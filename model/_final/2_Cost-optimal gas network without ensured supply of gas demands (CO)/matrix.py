@@ -0,0 +1,1016 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+import pyomo.environ as py
+import scipy.sparse as sp
+import constraints
+from solve import GUROBI_STATUS
+
+
+"""
+MATRIX-LEVEL ASSEMBLY OF THE LINEAR PROGRAM
+Builds the same variables, constraints and objective as utils.add_decision_variables,
+constraints.add and utils.obj_value directly as scipy.sparse blocks from the
+parameters of the model, i.e. without Pyomo variables and expression trees.
+The variables and constraints carry the names of the Pyomo components, so the
+solution can be mapped back to the model indices for reporting.
+"""
+
+"""NAMES OF THE SETS AND PARAMETERS PER NETWORK LEVEL"""
+LINES = {"tra": "set_line_tra", "high": "set_line_high", "mid": "set_line_mid"}
+NODES = {"tra": "set_compressor", "high": "set_node_hp", "mid": "set_node_mp"}
+LEVEL = {
+    "tra": {
+        "capacity": "par_tra_capacity",
+        "length": "par_tra_length",
+        "year_of_inv": "par_year_of_inv_tra",
+        "source": "par_source_tra",
+        "topology": "topology_tra",
+    },
+    "high": {
+        "capacity": "par_high_capacity",
+        "length": "par_high_length",
+        "year_of_inv": "par_year_of_inv_hp",
+        "source": "par_source_hp",
+        "topology": "topology_high",
+    },
+    "mid": {
+        "capacity": "par_mid_capacity",
+        "length": "par_mid_length",
+        "year_of_inv": "par_year_of_inv_mp",
+        "source": "par_source_mp",
+        "topology": "topology_mid",
+    },
+}
+
+
+class LinearProgram:
+    """
+    min cost'x  s.t.  row_lower <= A x <= row_upper,  col_lower <= x <= col_upper
+
+    Attributes
+    ----------
+    columns : Dict
+        Includes the first column and the index sets per variable.
+    rows : Dict
+        Includes the first row and the index (pandas.Index) per constraint.
+    exclude : List
+        Includes the constraints that are not added (like Constraint.deactivate();
+        variable bounds set by their rules are kept).
+
+    """
+
+    def __init__(self, exclude=None):
+        self.exclude = list(exclude or [])
+        self.columns = {}
+        self.rows = {}
+        self.num_col = 0
+        self.num_row = 0
+        self.cost = None
+        self._col_lower = []
+        self._col_upper = []
+        self._row_lower = []
+        self._row_upper = []
+        self._entries = []
+
+    def add_variable(self, name, index, lower=0.0, upper=np.inf):
+        _index = [list(_set) for _set in index]
+        _size = int(np.prod([len(_set) for _set in _index]))
+        self.columns[name] = (self.num_col, _index)
+        self.num_col += _size
+        self._col_lower.append(np.full(_size, lower, dtype=float))
+        self._col_upper.append(np.full(_size, upper, dtype=float))
+        return
+
+    def col(self, name, *positions):
+        """Columns of the variable at the (broadcast) positions of its index sets."""
+        _offset, _index = self.columns[name]
+        _shape = tuple(len(_set) for _set in _index)
+        return _offset + np.ravel_multi_index(np.broadcast_arrays(*positions), _shape)
+
+    def add_constraint(self, name, index, terms, lower, upper):
+        """
+        Parameters
+        ----------
+        name : String, required
+            Name of the constraint (as in constraints.add).
+        index : pandas.Index, required
+            Includes the index of each row.
+        terms : List, required
+            Includes (row, column, coefficient) arrays; rows start at 0 per constraint.
+        lower, upper : Float or numpy.ndarray, required
+            Bounds of the rows.
+
+        """
+        if name in self.exclude:
+            return
+        _size = len(index)
+        self.rows[name] = (self.num_row, index)
+        for _row, _col, _value in terms:
+            _row, _col, _value = np.broadcast_arrays(_row, _col, _value)
+            self._entries.append(
+                (_row.ravel() + self.num_row, _col.ravel(), _value.ravel())
+            )
+        self.num_row += _size
+        self._row_lower.append(np.broadcast_to(np.asarray(lower, dtype=float), _size))
+        self._row_upper.append(np.broadcast_to(np.asarray(upper, dtype=float), _size))
+        return
+
+    def set_upper_bound(self, columns, upper):
+        _upper = np.concatenate(self._col_upper)
+        _upper[columns] = upper
+        self._col_upper = [_upper]
+        return
+
+    @property
+    def col_lower(self):
+        return np.concatenate(self._col_lower)
+
+    @property
+    def col_upper(self):
+        return np.concatenate(self._col_upper)
+
+    @property
+    def row_lower(self):
+        return np.concatenate(self._row_lower)
+
+    @property
+    def row_upper(self):
+        return np.concatenate(self._row_upper)
+
+    def matrix(self):
+        """Constraint matrix (CSC); duplicates are summed and zeros dropped."""
+        _rows, _cols, _values = (np.concatenate(_x) for _x in zip(*self._entries))
+        _matrix = sp.coo_matrix(
+            (_values, (_rows, _cols)), shape=(self.num_row, self.num_col)
+        ).tocsc()
+        _matrix.sum_duplicates()
+        _matrix.eliminate_zeros()
+        return _matrix
+
+    def variable(self, name, x):
+        """Values of one variable as a Series on the index of the Pyomo variable."""
+        _offset, _index = self.columns[name]
+        _size = int(np.prod([len(_set) for _set in _index]))
+        if len(_index) == 1:
+            _labels = pd.Index(_index[0])
+        else:
+            _labels = pd.MultiIndex.from_product(_index)
+        return pd.Series(x[_offset : _offset + _size], index=_labels, name=name)
+
+    def constraint(self, name, y):
+        """Duals of one constraint as a Series on the index of the Pyomo constraint."""
+        _offset, _index = self.rows[name]
+        return pd.Series(y[_offset : _offset + len(_index)], index=_index, name=name)
+
+
+def _grid(*sizes):
+    """Positions of all index combinations in the order of the Pyomo index set."""
+    _positions = np.meshgrid(*[np.arange(_n) for _n in sizes], indexing="ij")
+    return [_x.ravel() for _x in _positions]
+
+
+def _all_years_and_months(position, years, months):
+    """Broadcast positions (position, year, month) of all years and months."""
+    return position[:, None, None], np.arange(years)[:, None], np.arange(months)
+
+
+def _index(sets, mask=None, names=None):
+    """Index of the rows, with the level names of report.get_duals (e.g. node)."""
+    if len(sets) == 1:
+        _index = pd.Index(sets[0], name=names and names[0])
+    else:
+        _index = pd.MultiIndex.from_product(sets, names=names)
+    if mask is not None:
+        _index = _index[mask]
+    return _index
+
+
+def _values(param, *sets):
+    """Values of an (indexed) Pyomo parameter over the product of the sets."""
+    if len(sets) == 1:
+        return np.array([py.value(param[_key]) for _key in sets[0]], dtype=float)
+    return np.array(
+        [py.value(param[_key]) for _key in itertools.product(*sets)], dtype=float
+    ).reshape([len(_set) for _set in sets])
+
+
+def add_variables(lp=None, model=None):
+    """Variables of utils.add_decision_variables (same names, index sets, domains)."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _free = dict(lower=-np.inf)
+
+    for _name in ["capex", "opex", "rev", "pi"]:
+        lp.add_variable("var_" + _name, [_y])
+    for _level in ["tra", "high", "mid"]:
+        lp.add_variable("var_lambda_" + _level, [_y])
+    for _level in ["tra", "high", "mid"]:
+        lp.add_variable("var_gamma_" + _level, [_y])
+    for _level, _lines in LINES.items():
+        lp.add_variable(
+            "var_gamma_{}_line".format(_level), [_y, getattr(model, _lines)]
+        )
+    for _level, _lines in LINES.items():
+        lp.add_variable(
+            "var_gamma_{}_line_inv".format(_level), [_y, getattr(model, _lines)]
+        )
+    for _level in ["tra", "high", "mid"]:
+        lp.add_variable("var_pi_" + _level, [_y])
+    for _level, _lines in LINES.items():
+        lp.add_variable("var_pi_{}_line".format(_level), [getattr(model, _lines), _y])
+    for _level, _lines in LINES.items():
+        lp.add_variable("var_pi_{}_line_inv".format(_level), [getattr(model, _lines)])
+
+    for _level, _nodes in NODES.items():
+        lp.add_variable("var_source_" + _level, [getattr(model, _nodes), _y, _m])
+    for _level, _lines in LINES.items():
+        lp.add_variable(
+            "var_transported_" + _level, [getattr(model, _lines), _y, _m], **_free
+        )
+    for _level, _nodes in NODES.items():
+        lp.add_variable("var_demand_" + _level, [getattr(model, _nodes), _y, _m])
+
+    lp.add_variable("var_storage_in_out", [model.set_storage, _y, _m], **_free)
+    lp.add_variable("var_storage_soc", [model.set_storage, _y, _m])
+
+    for _flow in ["export", "import"]:
+        for _level, _nodes in NODES.items():
+            lp.add_variable(
+                "var_{}_{}".format(_flow, _level),
+                [getattr(model, _nodes), _y, _m],
+                **_free,
+            )
+
+    lp.add_variable("var_revenues_high", [model.set_node_hp, _y, _m])
+    lp.add_variable("var_revenues_mid", [model.set_node_mp, _y, _m])
+    lp.add_variable("var_gas_purchase", [_y])
+    lp.add_variable("var_del_tra_high", [model.set_delivery_tra_hp, _y, _m])
+    lp.add_variable("var_del_high_mid", [model.set_delivery_hp_mp, _y, _m])
+    return
+
+
+def _line_position(lines, labels):
+    _position = pd.Index(list(lines)).get_indexer(labels)
+    if (_position < 0).any():
+        raise KeyError("Unknown line(s): {}".format(list(labels[_position < 0])))
+    return _position
+
+
+def add_cost_constraints(lp=None, model=None):
+    """Capex, opex, capacity and book value constraints (per year and line)."""
+    _y = list(model.set_year)
+    _Y = len(_y)
+    _year = np.arange(_Y)
+    _last = np.array([year == _y[-1] for year in _y])
+
+    lp.add_constraint(
+        "con_capex",
+        _index([_y], names=["year"]),
+        [
+            (_year, lp.col("var_capex", _year), 1.0),
+            (
+                _year,
+                lp.col("var_pi", _year),
+                np.where(_last, -1.0, -model.par_wacc.value),
+            ),
+        ],
+        0.0,
+        0.0,
+    )
+    lp.add_constraint(
+        "con_fixed",
+        _index([_y], names=["year"]),
+        [(_year, lp.col("var_opex", _year), 1.0)]
+        + [
+            (_year, lp.col("var_lambda_" + _level, _year), -1.0)
+            for _level in ["tra", "high", "mid"]
+        ],
+        0.0,
+        0.0,
+    )
+    for _level in ["tra", "high", "mid"]:
+        lp.add_constraint(
+            "con_fixed_" + _level,
+            _index([_y], names=["year"]),
+            [
+                (_year, lp.col("var_lambda_" + _level, _year), 1.0),
+                (
+                    _year,
+                    lp.col("var_gamma_" + _level, _year),
+                    -getattr(model, "par_fixed_" + _level).value,
+                ),
+            ],
+            0.0,
+            0.0,
+        )
+    for _level, _lines in LINES.items():
+        _L = len(getattr(model, _lines))
+        _row, _line = _grid(_Y, _L)
+        lp.add_constraint(
+            "con_total_{}_cap".format(_level),
+            _index([_y], names=["year"]),
+            [
+                (_year, lp.col("var_gamma_" + _level, _year), 1.0),
+                (_row, lp.col("var_gamma_{}_line".format(_level), _row, _line), -1.0),
+            ],
+            0.0,
+            0.0,
+        )
+    for _level, _lines in LINES.items():
+        _lines = list(getattr(model, _lines))
+        _year_l, _line = _grid(_Y, len(_lines))
+        _row = np.arange(len(_year_l))
+        _capacity = _values(getattr(model, LEVEL[_level]["capacity"]), _lines, _y)
+        lp.add_constraint(
+            "con_total_{}_cap_line".format(_level),
+            _index([_y, _lines], names=["year", "line"]),
+            [
+                (_row, lp.col("var_gamma_{}_line".format(_level), _year_l, _line), 1.0),
+                (
+                    _row,
+                    lp.col("var_gamma_{}_line_inv".format(_level), _year_l, _line),
+                    -1.0,
+                ),
+            ],
+            _capacity.T.ravel(),
+            _capacity.T.ravel(),
+        )
+
+    lp.add_constraint(
+        "con_total_book_val",
+        _index([_y], names=["year"]),
+        [(_year, lp.col("var_pi", _year), 1.0)]
+        + [
+            (_year, lp.col("var_pi_" + _level, _year), -1.0)
+            for _level in ["tra", "high", "mid"]
+        ],
+        0.0,
+        0.0,
+    )
+    for _level, _lines in LINES.items():
+        _row, _line = _grid(_Y, len(getattr(model, _lines)))
+        lp.add_constraint(
+            "con_book_value_" + _level,
+            _index([_y], names=["year"]),
+            [
+                (_year, lp.col("var_pi_" + _level, _year), 1.0),
+                (_row, lp.col("var_pi_{}_line".format(_level), _line, _row), -1.0),
+            ],
+            0.0,
+            0.0,
+        )
+    for _level, _lines in LINES.items():
+        _lines = list(getattr(model, _lines))
+        _year_l, _line = _grid(_Y, len(_lines))
+        _row = np.arange(len(_year_l))
+        _book_value = _values(getattr(model, "par_book_value_" + _level), _lines, _y)
+        _depreciation = _values(
+            getattr(model, "par_depreciation_" + _level), _lines, _y
+        )
+        lp.add_constraint(
+            "con_book_value_{}_line".format(_level),
+            _index([_y, _lines], names=["year", "line"]),
+            [
+                (_row, lp.col("var_pi_{}_line".format(_level), _line, _year_l), 1.0),
+                (
+                    _row,
+                    lp.col("var_pi_{}_line_inv".format(_level), _line),
+                    -_depreciation.T.ravel(),
+                ),
+            ],
+            _book_value.T.ravel(),
+            _book_value.T.ravel(),
+        )
+
+    for _level, _lines in LINES.items():
+        _lines = list(getattr(model, _lines))
+        _line = np.arange(len(_lines))
+        _inv_year = _year_of_investment(model, _level, _lines)
+        _factor = getattr(model, "par_ref_" + _level).value * _values(
+            getattr(model, LEVEL[_level]["length"]), _lines
+        )
+        lp.add_constraint(
+            "con_inv_{}_line".format(_level),
+            _index([_lines], names=["line"]),
+            [
+                (_line, lp.col("var_pi_{}_line_inv".format(_level), _line), 1.0),
+                (
+                    _line,
+                    lp.col("var_gamma_{}_line_inv".format(_level), _inv_year, _line),
+                    -_factor,
+                ),
+            ],
+            0.0,
+            0.0,
+        )
+
+    for _level, _lines in LINES.items():
+        _lines = list(getattr(model, _lines))
+        _line, _year_l = _grid(len(_lines), _Y)
+        _inv_year = _year_of_investment(model, _level, _lines)[_line]
+        _before = _year_l < _inv_year
+        _after = _year_l > _inv_year
+        _keep = _before | _after
+        _line, _year_l, _after = _line[_keep], _year_l[_keep], _after[_keep]
+        _row = np.arange(len(_line))
+        _name = "var_gamma_{}_line_inv".format(_level)
+        lp.add_constraint(
+            "con_gamma_inv_{}_bounds".format(_level),
+            _index([_lines, _y], mask=_keep, names=["line", "year"]),
+            [
+                (_row, lp.col(_name, _year_l, _line), 1.0),
+                (
+                    _row[_after],
+                    lp.col(_name, _year_l[_after] - 1, _line[_after]),
+                    -1.0,
+                ),
+            ],
+            0.0,
+            0.0,
+        )
+    return
+
+
+def _year_of_investment(model, level, lines):
+    """Position of the year of the refurbishment investment per line."""
+    _y = list(model.set_year)
+    _year = _values(getattr(model, LEVEL[level]["year_of_inv"]), lines).astype(int)
+    _outside = (_year < _y[0]) | (_year > _y[-1])
+    if _outside.any():
+        raise KeyError(
+            "Year of investment outside of the modeling horizon for line(s): {}".format(
+                list(np.array(lines)[_outside])
+            )
+        )
+    return _year - _y[0]
+
+
+def add_flow_constraints(lp=None, model=None):
+    """Export/import per node and capacity bounds per line (per year and month)."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+
+    for _flow in ["export", "import"]:
+        for _level, _nodes in NODES.items():
+            _nodes = list(getattr(model, _nodes))
+            _lines = list(getattr(model, LINES[_level]))
+            _topology = getattr(model, LEVEL[_level]["topology"])
+            if _flow == "export":
+                _ptr, _incident = _topology.out_ptr, _topology.out_lines
+            else:
+                _ptr, _incident = _topology.in_ptr, _topology.in_lines
+
+            # incident lines per node of the set (nodes not at this level have none)
+            _id = np.array([_topology.node_id.get(_node, -1) for _node in _nodes])
+            _count = np.where(_id >= 0, np.diff(_ptr)[_id], 0)
+            _node = np.repeat(np.arange(len(_nodes)), _count)
+            _line = _line_position(
+                _lines,
+                np.concatenate(
+                    [_incident[_ptr[i] : _ptr[i + 1]] for i in _id[_id >= 0]]
+                    + [np.array([], dtype=_incident.dtype)]
+                ),
+            )
+
+            _node_r, _year_r, _month_r = _grid(len(_nodes), _Y, _M)
+            _row = np.arange(len(_node_r))
+            _name = "var_{}_{}".format(_flow, _level)
+            _node_l, _year_l, _month_l = _all_years_and_months(_node, _Y, _M)
+            lp.add_constraint(
+                "con_total_{}_per_{}_node".format(_flow, _level),
+                _index([_nodes, _y, _m], names=["node", "year", "month"]),
+                [
+                    (_row, lp.col(_name, _node_r, _year_r, _month_r), 1.0),
+                    (
+                        (_node_l * _Y + _year_l) * _M + _month_l,
+                        lp.col(
+                            "var_transported_" + _level,
+                            *_all_years_and_months(_line, _Y, _M),
+                        ),
+                        -1.0,
+                    ),
+                ],
+                0.0,
+                0.0,
+            )
+
+    for _sign, _direction in [(1.0, "positive"), (-1.0, "negative")]:
+        for _level, _lines in LINES.items():
+            _lines = list(getattr(model, _lines))
+            _line, _year_r, _month_r = _grid(len(_lines), _Y, _M)
+            _row = np.arange(len(_line))
+            lp.add_constraint(
+                "con_{}_capacity_bound_{}".format(_direction, _level),
+                _index([_lines, _y, _m], names=["line", "year", "month"]),
+                [
+                    (
+                        _row,
+                        lp.col("var_transported_" + _level, _line, _year_r, _month_r),
+                        _sign,
+                    ),
+                    (
+                        _row,
+                        lp.col("var_gamma_{}_line".format(_level), _year_r, _line),
+                        -1.0,
+                    ),
+                ],
+                -np.inf,
+                0.0,
+            )
+    return
+
+
+def add_balance_constraints(lp=None, model=None):
+    """Gas balance per node and network level, gas storage (per year and month)."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+    _factor = _values(model.par_total_peak_factor, _m)
+    _storage = list(model.set_storage)
+    _delivery = {
+        "var_del_tra_high": list(model.set_delivery_tra_hp),
+        "var_del_high_mid": list(model.set_delivery_hp_mp),
+    }
+
+    def _terms(name, nodes, sets, coefficient):
+        """Entries of the variable at the nodes that belong to its index set."""
+        _position = pd.Index(sets).get_indexer(nodes)
+        _node = np.flatnonzero(_position >= 0)
+        _node_r, _year, _month = _all_years_and_months(_node, _Y, _M)
+        _col = lp.col(name, *_all_years_and_months(_position[_node], _Y, _M))
+        return (_node_r * _Y + _year) * _M + _month, _col, coefficient
+
+    _balance = {
+        "tra": [("var_del_tra_high", -1.0)],
+        "high": [("var_del_tra_high", 1.0), ("var_del_high_mid", -1.0)],
+        "mid": [("var_del_high_mid", 1.0)],
+    }
+    _names = {
+        "tra": "c_gas_balance_tra",
+        "high": "c_gas_balance_hp",
+        "mid": "c_gas_balance_mp",
+    }
+    _topology = model.topology_high
+    _both = _topology.delivery_in & _topology.delivery_out & set(model.set_node_hp)
+    if _both:
+        # no gas balance is defined for these nodes in constraints.py
+        raise ValueError(
+            "High-pressure node(s) supplied by and delivering to other levels: "
+            "{}".format(sorted(_both))
+        )
+    for _level, _nodes in NODES.items():
+        _nodes = list(getattr(model, _nodes))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _row = np.arange(len(_node))
+        _terms_level = [
+            (_row, lp.col("var_source_" + _level, _node, _year, _month), 1.0),
+            (_row, lp.col("var_demand_" + _level, _node, _year, _month), -1.0),
+            (
+                _row,
+                lp.col("var_export_" + _level, _node, _year, _month),
+                -_factor[_month],
+            ),
+            (
+                _row,
+                lp.col("var_import_" + _level, _node, _year, _month),
+                _factor[_month],
+            ),
+        ]
+        _terms_level += [
+            _terms(_name, _nodes, _delivery[_name], _coefficient)
+            for _name, _coefficient in _balance[_level]
+        ]
+        if _level == "high":
+            _terms_level.append(_terms("var_storage_in_out", _nodes, _storage, 1.0))
+        lp.add_constraint(
+            _names[_level],
+            _index([_nodes, _y, _m], names=["node", "year", "month"]),
+            _terms_level,
+            0.0,
+            0.0,
+        )
+
+    _node, _year, _month = _grid(len(_storage), _Y, _M)
+    _row = np.arange(len(_node))
+    _capacity = _values(model.par_storage_capacity, _storage)
+    lp.add_constraint(
+        "c_soc_upper_bound",
+        _index([_storage, _y, _m], names=["node", "year", "month"]),
+        [(_row, lp.col("var_storage_soc", _node, _year, _month), 1.0)],
+        -np.inf,
+        _capacity[_node],
+    )
+    # state of charge of the previous month (last month of the previous year)
+    _first = (_year == 0) & (_month == 0)
+    _previous = ~_first
+    _year_p = np.where(_month == 0, _year - 1, _year)[_previous]
+    _month_p = np.where(_month == 0, _M - 1, _month - 1)[_previous]
+    lp.add_constraint(
+        "c_soc_in_and_out",
+        _index([_storage, _y, _m], names=["node", "year", "month"]),
+        [
+            (_row, lp.col("var_storage_soc", _node, _year, _month), 1.0),
+            (_row, lp.col("var_storage_in_out", _node, _year, _month), -1.0),
+            (
+                _row[_previous],
+                lp.col("var_storage_soc", _node[_previous], _year_p, _month_p),
+                -0.99,
+            ),
+        ],
+        0.0,
+        0.0,
+    )
+    return
+
+
+def add_revenue_constraints(lp=None, model=None):
+    """Revenues per node and per year, spendings for the gas purchase."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+    _prices = _values(model.par_gas_prices, _y, _m)
+
+    for _level in ["high", "mid"]:
+        _markup = getattr(model, "par_markup_" + _level).value
+        _nodes = list(getattr(model, NODES[_level]))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _row = np.arange(len(_node))
+        lp.add_constraint(
+            "c_rev_" + _level,
+            _index([_nodes, _y, _m], names=["node", "year", "month"]),
+            [
+                (_row, lp.col("var_revenues_" + _level, _node, _year, _month), 1.0),
+                (
+                    _row,
+                    lp.col("var_demand_" + _level, _node, _year, _month),
+                    -(_markup + _prices[_year, _month]),
+                ),
+            ],
+            0.0,
+            0.0,
+        )
+
+    _year = np.arange(_Y)
+    _terms = [(_year, lp.col("var_rev", _year), 1.0)]
+    for _level in ["high", "mid"]:
+        _node, _year_n, _month = _grid(len(getattr(model, NODES[_level])), _Y, _M)
+        _terms.append(
+            (_year_n, lp.col("var_revenues_" + _level, _node, _year_n, _month), -1.0)
+        )
+    lp.add_constraint("c_rev_year", _index([_y], names=["year"]), _terms, 0.0, 0.0)
+    return
+
+
+def add_purchase_constraints(lp=None, model=None):
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+    _prices = _values(model.par_gas_prices, _y, _m)
+    _year = np.arange(_Y)
+    _node, _year_n, _month = _grid(len(model.set_delivery_tra_hp), _Y, _M)
+    lp.add_constraint(
+        "c_gas_purchase",
+        _index([_y], names=["year"]),
+        [
+            (_year, lp.col("var_gas_purchase", _year), 1.0),
+            (
+                _year_n,
+                lp.col("var_del_tra_high", _node, _year_n, _month),
+                -_prices[_year_n, _month],
+            ),
+        ],
+        0.0,
+        0.0,
+    )
+    return
+
+
+def add_demand_and_source_constraints(lp=None, model=None):
+    """
+    Demand and source limits. As in constraints.py, rows with a structurally zero
+    parameter are skipped and the variables are bounded to zero instead, except
+    for the demand limits whose duals are the shadow prices (skip=False).
+    """
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+
+    def _demand(name, level, equal, skip=True):
+        _nodes = list(getattr(model, NODES[level]))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _demand = _values(getattr(model, "par_demand_" + level), _nodes, _y, _m).ravel()
+        _keep = _demand != 0 if skip else np.ones(len(_demand), dtype=bool)
+        _col = lp.col("var_demand_" + level, _node, _year, _month)
+        if name in lp.exclude:
+            # as constraints.py: the rule of a family that is not built sets no bounds
+            return
+        lp.set_upper_bound(_col[~_keep], 0.0)
+        lp.add_constraint(
+            name,
+            _index([_nodes, _y, _m], mask=_keep, names=["node", "year", "month"]),
+            [(np.arange(_keep.sum()), _col[_keep], 1.0)],
+            _demand[_keep] if equal else -np.inf,
+            _demand[_keep],
+        )
+        return
+
+    def _decline(name, level, monthly=False):
+        # gas demands that are no longer supplied are not reconnected (first month,
+        # in ES every month)
+        _nodes = list(getattr(model, NODES[level]))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _keep = (_year != _Y - 1) & ((_month == 0) | monthly)
+        _node, _year, _month = _node[_keep], _year[_keep], _month[_keep]
+        _row = np.arange(len(_node))
+        lp.add_constraint(
+            name,
+            _index([_nodes, _y, _m], mask=_keep, names=["node", "year", "month"]),
+            [
+                (_row, lp.col("var_demand_" + level, _node, _year + 1, _month), 1.0),
+                (_row, lp.col("var_demand_" + level, _node, _year, _month), -1.0),
+            ],
+            -np.inf,
+            0.0,
+        )
+        return
+
+    def _source(name, level):
+        _nodes = list(getattr(model, NODES[level]))
+        _node, _year = _grid(len(_nodes), _Y)
+        _source = _values(getattr(model, LEVEL[level]["source"]), _nodes, _y).ravel()
+        _keep = _source != 0
+        if name in lp.exclude:
+            return
+        _col = lp.col(
+            "var_source_" + level, _node[:, None], _year[:, None], np.arange(_M)
+        )
+        lp.set_upper_bound(_col[~_keep].ravel(), 0.0)
+        lp.add_constraint(
+            name,
+            _index([_nodes, _y], mask=_keep, names=["node", "year"]),
+            [(np.arange(_keep.sum())[:, None], _col[_keep], 1.0)],
+            -np.inf,
+            _source[_keep],
+        )
+        return
+
+    _demand("c_equal_tra_demand", "tra", equal=True)
+    _demand("c_limit_high_demand", "high", equal=False, skip=False)
+    _decline("c_decline_gas_supply", "high")
+    _decline("c_decline_gas_mid_pressure", "mid")
+    _demand("c_limit_mid_demand", "mid", equal=False, skip=False)
+    _demand("c_ensure_high_demand", "high", equal=True, skip=False)
+    _demand("c_ensure_mid_demand", "mid", equal=True, skip=False)
+    _decline("c_decline_gas_supply_monthly", "high", monthly=True)
+    _decline("c_decline_gas_mid_pressure_monthly", "mid", monthly=True)
+    _source("c_limit_tra_source", "tra")
+    _source("c_limit_high_source", "high")
+    _source("c_limit_mid_source", "mid")
+    return
+
+
+def add_supply_profile_constraints(lp=None, model=None):
+    """Covered demand follows the monthly profile of the first month."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+    _profile = model.temporal_demand.A.to_numpy(dtype=float)[:_M]
+    _profile = _profile / _profile[0]
+
+    for _level in ["high", "mid"]:
+        _nodes = list(getattr(model, NODES[_level]))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _keep = _month != 0
+        _node, _year, _month = _node[_keep], _year[_keep], _month[_keep]
+        _row = np.arange(len(_node))
+        lp.add_constraint(
+            "c_ensure_supply_profile_" + _level,
+            _index([_nodes, _y, _m], mask=_keep, names=["node", "year", "month"]),
+            [
+                (_row, lp.col("var_demand_" + _level, _node, _year, _month), 1.0),
+                (
+                    _row,
+                    lp.col("var_demand_" + _level, _node, _year, 0),
+                    -_profile[_month],
+                ),
+            ],
+            0.0,
+            0.0,
+        )
+    return
+
+
+def add_opt_bound_constraints(lp=None, model=None):
+    """Covered demand equals the demand covered in the cost-optimal model run."""
+    _y, _m = list(model.set_year), list(model.set_time_unit)
+    _Y, _M = len(_y), len(_m)
+
+    for _level in ["high", "mid"]:
+        if "c_opt_bound_" + _level in lp.exclude:
+            # the parameters p_opt_*_gas exist in the variant CO_MD2 only
+            continue
+        _nodes = list(getattr(model, NODES[_level]))
+        _node, _year, _month = _grid(len(_nodes), _Y, _M)
+        _opt = _values(getattr(model, "p_opt_{}_gas".format(_level)), _nodes, _y, _m)
+        lp.add_constraint(
+            "c_opt_bound_" + _level,
+            _index([_nodes, _y, _m], names=["node", "year", "month"]),
+            [
+                (
+                    np.arange(len(_node)),
+                    lp.col("var_demand_" + _level, _node, _year, _month),
+                    1.0,
+                )
+            ],
+            _opt.ravel(),
+            _opt.ravel(),
+        )
+    return
+
+
+def add_objective(lp=None, model=None):
+    """Cost vector of utils.obj_value (discounted capex + opex - rev. + purchase)."""
+    _y = list(model.set_year)
+    _year = np.arange(len(_y))
+    _discount = np.array([1 / (1 + model.par_i.value) ** (year - 2025) for year in _y])
+    lp.cost = np.zeros(lp.num_col)
+    for _name, _sign in [
+        ("var_capex", 1.0),
+        ("var_opex", 1.0),
+        ("var_rev", -1.0),
+        ("var_gas_purchase", 1.0),
+    ]:
+        lp.cost[lp.col(_name, _year)] += _sign * _discount
+    return
+
+
+def build(model=None, exclude=None):
+    """
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Includes the sets, parameters and topology (up to utils.add_parameter_to_model).
+        The default is None.
+    exclude : List, optional
+        Includes the names of constraints that are left out. If None, those of the
+        variant of constraints.add (constraints.VARIANTS[constraints.VARIANT]).
+        The default is None.
+
+    Returns
+    -------
+    lp : LinearProgram
+        Includes the linear program of the model in matrix form.
+
+    """
+    if exclude is None:
+        exclude = constraints.VARIANTS[constraints.VARIANT]
+    lp = LinearProgram(exclude=exclude)
+    add_variables(lp=lp, model=model)
+    add_cost_constraints(lp=lp, model=model)
+    add_flow_constraints(lp=lp, model=model)
+    add_balance_constraints(lp=lp, model=model)
+    add_revenue_constraints(lp=lp, model=model)
+    add_demand_and_source_constraints(lp=lp, model=model)
+    add_purchase_constraints(lp=lp, model=model)
+    add_supply_profile_constraints(lp=lp, model=model)
+    add_opt_bound_constraints(lp=lp, model=model)
+    add_objective(lp=lp, model=model)
+    return lp
+
+
+def solve_with_highs(lp=None, threads=None, time_limit=None, tee=True):
+    """
+    Parameters
+    ----------
+    lp : LinearProgram, required
+        The default is None.
+    threads : Integer, optional
+        The default is None.
+    time_limit : Float, optional
+        Time limit in seconds. The default is None.
+    tee : Boolean, optional
+        Print the solver log. The default is True.
+
+    Returns
+    -------
+    solution : Dict
+        Includes the status, objective, primal values (x) and duals (y).
+
+    """
+    import highspy
+
+    _matrix = lp.matrix()
+    _lp = highspy.HighsLp()
+    _lp.num_col_ = lp.num_col
+    _lp.num_row_ = lp.num_row
+    _lp.col_cost_ = lp.cost
+    _lp.col_lower_ = lp.col_lower
+    _lp.col_upper_ = lp.col_upper
+    _lp.row_lower_ = lp.row_lower
+    _lp.row_upper_ = lp.row_upper
+    _lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    _lp.a_matrix_.start_ = _matrix.indptr
+    _lp.a_matrix_.index_ = _matrix.indices
+    _lp.a_matrix_.value_ = _matrix.data
+
+    _highs = highspy.Highs()
+    _highs.setOptionValue("output_flag", tee)
+    if threads is not None:
+        _highs.setOptionValue("threads", int(threads))
+    if time_limit is not None:
+        _highs.setOptionValue("time_limit", float(time_limit))
+    _highs.passModel(_lp)
+    _highs.run()
+
+    _solution = _highs.getSolution()
+    solution = {
+        "status": _highs.modelStatusToString(_highs.getModelStatus()),
+        "objective": _highs.getInfo().objective_function_value,
+        "x": np.array(_solution.col_value),
+        "y": np.array(_solution.row_dual),
+    }
+    return solution
+
+
+def solve_with_gurobipy(lp=None, threads=None, time_limit=None, tee=True):
+    """Same as solve_with_highs, but with the matrix API of gurobipy."""
+    import gurobipy as gp
+
+    _lower, _upper = lp.row_lower, lp.row_upper
+    _equal = _lower == _upper
+    if not (_equal | np.isneginf(_lower)).all():
+        raise ValueError("Ranged rows are not supported by solve_with_gurobipy.")
+
+    _model = gp.Model()
+    _model.Params.OutputFlag = int(tee)
+    if threads is not None:
+        _model.Params.Threads = int(threads)
+    if time_limit is not None:
+        _model.Params.TimeLimit = float(time_limit)
+    _x = _model.addMVar(lp.num_col, lb=lp.col_lower, ub=lp.col_upper, obj=lp.cost)
+    _sense = np.where(_equal, "=", "<")
+    _constraints = _model.addMConstr(lp.matrix().tocsr(), _x, _sense, _upper)
+    _model.optimize()
+
+    solution = {
+        "status": GUROBI_STATUS.get(_model.Status, "Unknown"),
+        "objective": _model.ObjVal,
+        "x": _x.X,
+        "y": np.array(_constraints.Pi),
+    }
+    return solution
+
+
+SOLVERS = {"highs": solve_with_highs, "gurobi": solve_with_gurobipy}
+
+
+def solve(lp=None, solver=None, threads=None, time_limit=None, tee=True):
+    """
+    Parameters
+    ----------
+    lp : LinearProgram, required
+        The default is None.
+    solver : String, optional
+        One of SOLVERS (highs, gurobi). If None, the environment variable
+        GND_SOLVER is used, otherwise highs. The default is None.
+    threads : Integer, optional
+        Number of threads (GND_THREADS). The default is None.
+    time_limit : Float, optional
+        Time limit in seconds (GND_TIME_LIMIT). The default is None.
+    tee : Boolean, optional
+        Print the solver log. The default is True.
+
+    Returns
+    -------
+    solution : Dict
+        Includes the status, objective, primal values (x) and duals (y).
+
+    """
+    solver = solver or os.environ.get("GND_SOLVER") or "highs"
+    threads = threads or os.environ.get("GND_THREADS")
+    time_limit = time_limit or os.environ.get("GND_TIME_LIMIT")
+    if solver not in SOLVERS:
+        raise ValueError(
+            "Unknown solver '{}', choose one of {}.".format(solver, list(SOLVERS))
+        )
+    print("Solver: {} (matrix)".format(solver))
+    solution = SOLVERS[solver](lp=lp, threads=threads, time_limit=time_limit, tee=tee)
+    return solution
+
+
+def load_solution(model=None, lp=None, solution=None):
+    """
+    Writes the primal values into the variables of the model (if they are added by
+    utils.add_decision_variables) so that report.py can be used unchanged.
+
+    Returns
+    -------
+    duals : Dict
+        Includes the duals (Series) per constraint name.
+
+    """
+    for _name in lp.columns:
+        _var = getattr(model, _name, None)
+        if _var is None:
+            continue
+        for _key, _value in lp.variable(_name, solution["x"]).items():
+            _var[_key].set_value(_value, skip_validation=True)
+
+    duals = {_name: lp.constraint(_name, solution["y"]) for _name in lp.rows}
+    return duals
@@ -1,40 +1,55 @@
-import pandas as pd
+import sys
 import utils
 import constraints
+import matrix
 import report
 from pathlib import Path
 from pyomo.environ import Suffix
-import numpy as np
-import pandas as pd
-import pyam
 
 
-"""READ IN SHAPEFILES"""
-_trans = utils.read_shapefile(path="transmission", name="transmission.shp")
-_high = utils.read_shapefile(path="high", name="high.shp")
-_mid = utils.read_shapefile(path="mid", name="mid.shp")
+"""BUILD PROFILE (ENABLED BY GND_PROFILE=1, GND_PROFILE=memory OR --profile)"""
+profiler = utils.Profiler()
+
+
+"""PARAMETER OVERRIDES OF A SWEEP RUN (GND_OVERRIDES, SEE sweep.py)"""
+_overrides = utils.get_overrides()
+
+
+"""READ IN SHAPEFILES (NETWORK TOPOLOGY ONLY, NO GEOMETRIES)"""
+with profiler.phase("read shapefiles"):
+    _trans = utils.read_shapefile(
+        path="transmission", name="transmission.shp", geometry=False
+    )
+    _high = utils.read_shapefile(path="high", name="high.shp", geometry=False)
+    _mid = utils.read_shapefile(path="mid", name="mid.shp", geometry=False)
 
 
 """READ IN DATA"""
 _path = Path("data")
 
-_demand = pd.read_excel(_path / "INPUT_Demand.xlsx")
-_pipeline_eco = pd.read_excel(_path / "INPUT_Pipelines_Economic.xlsx")
-_pipeline_tec = pd.read_excel(_path / "INPUT_Pipelines_Technical.xlsx")
-_refurbishment = pd.read_excel(_path / "INPUT_Refurbishment.xlsx")
-_source = pd.read_excel(_path / "INPUT_Source.xlsx")
-_storage = pd.read_excel(_path / "INPUT_Storage_Technical.xlsx")
-_time_dev = pd.read_excel(_path / "INPUT_Time_Resolution.xlsx")
-_prices = pd.read_excel(_path / "INPUT_Prices.xlsx")
+with profiler.phase("read input data"):
+    _demand = utils.read_input(path=_path / "INPUT_Demand.xlsx")
+    _pipeline_eco = utils.read_input(path=_path / "INPUT_Pipelines_Economic.xlsx")
+    _pipeline_tec = utils.read_input(path=_path / "INPUT_Pipelines_Technical.xlsx")
+    _refurbishment = utils.read_input(path=_path / "INPUT_Refurbishment.xlsx")
+    _source = utils.read_input(path=_path / "INPUT_Source.xlsx")
+    _storage = utils.read_input(path=_path / "INPUT_Storage_Technical.xlsx")
+    _time_dev = utils.read_input(path=_path / "INPUT_Time_Resolution.xlsx")
+    _prices = utils.read_input(path=_path / "INPUT_Prices.xlsx")
 
-_opt_demand = pyam.IamDataFrame("Demands.xlsx")
+with profiler.phase("read cost-optimal demand"):
+    _opt_demand = utils.read_opt_demand(
+        data=report.read_table(path=utils.get_opt_demand_path(), name="Demands")
+    )
 
 
 
 """NODES OF THE NETWORK"""
-_nodes = utils.get_nodes_from_lines(
-    transmission=_trans, high_pressure=_high, mid_pressure=_mid
-)
+with profiler.phase("network topology"):
+    _topology = utils.get_network_topology(
+        transmission=_trans, high_pressure=_high, mid_pressure=_mid
+    )
+    _nodes = utils.get_nodes_from_lines(topology=_topology)
 
 
 """PYOMO.CONCRETEMODEL()"""
@@ -44,7 +59,7 @@ model.transmission = _trans
 model.high = _high
 model.mid = _mid
 
-utils.add_import_and_export_lines_per_node(model=model)
+utils.add_network_topology(model=model, topology=_topology)
 
 model.demand = _demand
 model.pipeline_economic = _pipeline_eco
@@ -56,49 +71,93 @@ model.temporal_demand = _time_dev
 model.prices = _prices
 model.opt_demand = _opt_demand
 
-utils.add_nodal_sets(model=model, nodes=_nodes)
-
-utils.add_line_sets(model=model, data=[_trans, _high, _mid])
-utils.add_time_horizon(model=model, year=2050, temporal=12)
-utils.add_parameter_to_model(model=model)
-utils.add_decision_variables(model=model)
-
-constraints.add(model=model)
-utils.add_objective_function(model=model)
-
-"""PRINT AND DISPLAY THE MODEL"""
-utils.print_model(model)
+with profiler.phase("sets"):
+    utils.add_nodal_sets(model=model, nodes=_nodes)
+    utils.add_line_sets(model=model, data=[_trans, _high, _mid])
+    utils.add_time_horizon(
+        model=model, year=_overrides.pop("horizon", utils.HORIZON), temporal=12
+    )
+with profiler.components("parameters"):
+    utils.add_parameter_to_model(
+        model=model,
+        decline=utils.get_demand_decline(
+            period=_overrides.pop("decline_period", None),
+            residual=_overrides.pop("residual_share", None),
+        ),
+    )
+    utils.set_parameters(model=model, **_overrides)
+with profiler.components("variables"):
+    utils.add_decision_variables(model=model)
+
+"""CONSTRAINTS: PYOMO OR MATRIX ASSEMBLY (ENABLED BY GND_BACKEND=matrix OR --backend)"""
+_backend = utils.get_backend()
+with profiler.components("constraints"):
+    if _backend == "matrix":
+        lp = matrix.build(model=model, exclude=constraints.VARIANTS["CO_MD2"])
+    else:
+        constraints.add(model=model, variant="CO_MD2")
+with profiler.phase("objective"):
+    utils.add_objective_function(model=model)
+
+"""PRINT AND DISPLAY THE MODEL (ENABLED BY GND_DUMP=1 OR --dump)"""
+with profiler.phase("print model"):
+    utils.print_model(model)
 
 model.dual = Suffix(direction=Suffix.IMPORT)
 
-"""DEACTIVATE NOT NEEDED CONSTRAINTS (IN MODEL RUN 2 ONLY)"""
-model.c_limit_high_demand.deactivate()
-model.c_limit_mid_demand.deactivate()
-model.c_decline_gas_supply.deactivate()
-model.c_decline_gas_mid_pressure.deactivate()
-
-"""START TO SOLVE THE MODEL"""
-Solver = utils.set_solver_for_the_model(model)
-solution = Solver.solve(model, tee=True)
-
-solution.write()
+"""RUN STAGES: STOP AFTER WRITING THE MODEL (BUILD) OR LOAD THE SOLUTION (REPORT)"""
+_stage = utils.get_stage()
+if _backend == "matrix" and (_stage is not None or utils.get_start_path() is not None):
+    raise ValueError("The matrix backend solves in this process, without a warm start.")
+if _stage == "build":
+    with profiler.phase("write mps"):
+        utils.write_mps(model=model)
+    profiler.write(path=utils.STAGE_PATH)
+    sys.exit()
+
+"""START TO SOLVE THE MODEL (REPORT STAGE: LOAD THE SOLUTION OF solve.py)"""
+_duals = None
+if _stage == "report":
+    with profiler.phase("load solution"):
+        solution = utils.read_sol(model=model)
+    _basis = None
+elif _backend == "matrix":
+    with profiler.phase("solve"):
+        _solution = matrix.solve(lp=lp)
+    print("Status: {}".format(_solution["status"]))
+    with profiler.phase("load solution"):
+        _duals = matrix.load_solution(model=model, lp=lp, solution=_solution)
+    _basis = None
+else:
+    Solver = utils.set_solver_for_the_model(model)
+    _warmstart = False
+    if utils.get_start_path() is not None:
+        with profiler.phase("warm start"):
+            _warmstart = utils.set_start(
+                model=model,
+                Solver=Solver,
+                start=report.read_start(path=utils.get_start_path(), model=model),
+            )
+    with profiler.phase("solve"):
+        solution = Solver.solve(model, tee=True, warmstart=_warmstart)
+    solution.write()
+    _basis = utils.get_basis(Solver)
 model.objective.display()
 
 """REPORT RESULTS IN OUTPUT FILES"""
-report.write_results_to_folder(model, "CO_MD2")
-
-shadow_high = np.empty([len(model.set_year), len(model.set_node_hp)])
-for index1, year in enumerate(model.set_year):
-    for index2, node in enumerate(model.set_node_hp):
-        shadow_high[index1][index2] = model.dual[model.c_opt_bound_high[node, year, 1]]
-
-df = pd.DataFrame(shadow_high).T
-df.to_excel('HP_SHD_PRICES.xlsx', header=None, index=None)
-
-shadow_mid = np.empty([len(model.set_year), len(model.set_node_mp)])
-for index1, year in enumerate(model.set_year):
-    for index2, node in enumerate(model.set_node_mp):
-        shadow_mid[index1][index2] = model.dual[model.c_opt_bound_mid[node, year, 1]]
-    
-df = pd.DataFrame(shadow_mid).T
-df.to_excel('MP_SHD_PRICES.xlsx', header=None, index=None)
+with profiler.phase("report"):
+    _solution_path = report.write_results_to_folder(
+        model, "CO_MD2", basis=_basis, duals=_duals
+    )
+profiler.write(path=_solution_path)
+
+"""SHADOW PRICES OF THE OPTIMAL DEMAND BOUNDS (NODE x YEAR, FIRST MONTH)"""
+report.write_shadow_prices(
+    model=model,
+    path=_solution_path,
+    constraints={
+        "HP_SHD_PRICES": "c_opt_bound_high",
+        "MP_SHD_PRICES": "c_opt_bound_mid",
+    },
+    duals=_duals,
+)
@@ -0,0 +1,179 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import itertools
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import pandas as pd
+import report
+import utils
+
+
+"""
+SCENARIO SWEEP: python sweep.py grid.json [--workers N] [--threads N]
+Runs model.py once per point of a grid of parameter overrides (see
+utils.get_overrides) on a process pool, e.g. grid.json:
+    {"par_markup_mid": [15, 17.5], "par_wacc": [0.05, 0.06], "horizon": [2050]}
+Each run has its own working directory sweep/<sweep id>/<run id> with links to the
+inputs (and the input cache) of this folder, writes its results to
+solution/<run id> there and appends them to the results store of this folder.
+The runs are collected in the table sweep/<sweep id>/Sweep.
+"""
+SWEEP_PATH = "sweep"
+WORKERS_FLAG = "--workers"
+THREADS_FLAG = "--threads"
+
+"""INPUTS OF model.py THAT ARE LINKED INTO THE WORKING DIRECTORY OF A RUN"""
+MODEL_PATH = Path(__file__).resolve().parent
+INPUTS = ["data", "transmission", "high", "mid", utils.CACHE]
+
+
+def get_grid(grid=None):
+    """
+    Parameters
+    ----------
+    grid : Dict, required
+        Includes the values per override, e.g. {"par_wacc": [0.05, 0.06]}; a
+        single value is used in every run. The default is None.
+
+    Returns
+    -------
+    points : List
+        Includes one dictionary of overrides per run (Cartesian product).
+
+    """
+    _names = list(grid)
+    _values = [
+        _value if isinstance(_value, list) else [_value] for _value in grid.values()
+    ]
+    return [dict(zip(_names, _point)) for _point in itertools.product(*_values)]
+
+
+def run(run_id=None, overrides=None, path=None, threads=None, store=None):
+    """
+    One run of model.py (in a worker process of the pool) in the working directory
+    <path>/<run id>, with the overrides and a solver thread budget.
+
+    Returns
+    -------
+    result : Dict
+        Includes the run ID, the overrides, the status, the objective value, the
+        wall time and the folder of the results.
+
+    """
+    _folder = Path(path) / run_id
+    _folder.mkdir()
+    for _input in INPUTS:
+        if (MODEL_PATH / _input).exists():
+            (_folder / _input).symlink_to(MODEL_PATH / _input)
+    os.chdir(_folder)
+    sys.argv = [str(MODEL_PATH / "model.py")]
+    os.environ[utils.OVERRIDES] = json.dumps(overrides)
+    os.environ[report.RUN_ID] = run_id
+    os.environ[report.STORE] = store
+    if threads is not None:
+        os.environ["GND_THREADS"] = str(threads)
+
+    # the solver writes to the file descriptors, hence the redirect of these
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _log = os.open("model.log", os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    os.dup2(_log, 1)
+    os.dup2(_log, 2)
+
+    result = dict(run_id=run_id, **overrides)
+    _start = time.perf_counter()
+    try:
+        runpy.run_path(str(MODEL_PATH / "model.py"), run_name="__main__")
+        _values = report.read_table(path=Path("solution") / run_id, name="Values")
+        result.update(status="ok", objective=float(_values["value"].iloc[0]))
+    except (Exception, SystemExit) as error:
+        result.update(status="{}: {}".format(type(error).__name__, error))
+    result["seconds"] = round(time.perf_counter() - _start, 1)
+    result["path"] = str(_folder / "solution" / run_id)
+    return result
+
+
+def sweep(grid=None, workers=None, threads=None, formats=None):
+    """
+    Parameters
+    ----------
+    grid : Dict, required
+        See get_grid. The default is None.
+    workers : Integer, optional
+        Number of runs at once. If None, the number of CPUs divided by the threads
+        per run. The default is None.
+    threads : Integer, optional
+        Solver threads per run. If None, GND_THREADS or 1. The default is None.
+    formats : List, optional
+        Output formats of the table Sweep, see report.get_output_formats.
+        The default is None.
+
+    Returns
+    -------
+    results : DataFrame
+        Includes one row per run (see run).
+
+    """
+    threads = int(threads or os.environ.get("GND_THREADS") or 1)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    _points = get_grid(grid)
+    _sweep_id = report.get_run_id("sweep")
+    _path = MODEL_PATH / SWEEP_PATH / _sweep_id
+    _store = os.environ.get(report.STORE) or str(MODEL_PATH / report.STORE_FILE)
+    if _store.lower() != "none":
+        _store = str(Path(_store).resolve())
+    _path.mkdir(parents=True)
+    print("{}: {} runs, {} workers".format(_path, len(_points), workers))
+
+    # spawn: a new interpreter (and model build) per run
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as _pool:
+        _futures = [
+            _pool.submit(
+                run,
+                run_id="{}-{:03d}".format(_sweep_id, _number),
+                overrides=_overrides,
+                path=_path,
+                threads=threads,
+                store=_store,
+            )
+            for _number, _overrides in enumerate(_points)
+        ]
+        _results = []
+        for _future in _futures:
+            _results.append(_future.result())
+            print("{run_id}: {status} ({seconds} s)".format(**_results[-1]))
+
+    results = pd.DataFrame(_results)
+    report.write_table(
+        results,
+        path=_path,
+        name="Sweep",
+        formats=report.get_output_formats(formats),
+    )
+    return results
+
+
+if __name__ == "__main__":
+    _arguments = sys.argv[1:]
+    _options = {}
+    for _flag in [WORKERS_FLAG, THREADS_FLAG]:
+        if _flag in _arguments:
+            _position = _arguments.index(_flag)
+            _options[_flag] = int(_arguments[_position + 1])
+            del _arguments[_position : _position + 2]
+    with open(_arguments[0]) as _file:
+        _grid = json.load(_file)
+    results = sweep(
+        grid=_grid,
+        workers=_options.get(WORKERS_FLAG),
+        threads=_options.get(THREADS_FLAG),
+    )
+    print(results.to_string(index=False))
@@ -0,0 +1,124 @@
+import sys
+import time
+from pathlib import Path
+import pyomo.environ as py
+import utils
+import constraints
+import matrix
+import report
+
+
+"""
+VALIDATION: MATRIX-LEVEL ASSEMBLY (matrix.build) AGAINST THE PYOMO BUILD
+Usage: python validate_matrix.py [case ...]
+A case is a folder with data/, transmission/, high/ and mid/ (default: this folder),
+e.g. ../../validation/vorarlberg or ../../validation/wag-test-bed. The cost-optimal
+demands of the case are the table Demands of utils.get_opt_demand_path.
+"""
+
+
+def build_model(case=None):
+    """Sets, parameters and topology of the case as in model.py."""
+    _case = Path(case)
+    _trans = utils.read_shapefile(
+        path=_case / "transmission", name="transmission.shp", geometry=False
+    )
+    _high = utils.read_shapefile(path=_case / "high", name="high.shp", geometry=False)
+    _mid = utils.read_shapefile(path=_case / "mid", name="mid.shp", geometry=False)
+    _topology = utils.get_network_topology(
+        transmission=_trans, high_pressure=_high, mid_pressure=_mid
+    )
+
+    model = utils.create_model()
+    model.transmission = _trans
+    model.high = _high
+    model.mid = _mid
+    utils.add_network_topology(model=model, topology=_topology)
+
+    _path = _case / "data"
+    model.demand = utils.read_input(path=_path / "INPUT_Demand.xlsx")
+    model.pipeline_economic = utils.read_input(
+        path=_path / "INPUT_Pipelines_Economic.xlsx"
+    )
+    model.pipeline_technical = utils.read_input(
+        path=_path / "INPUT_Pipelines_Technical.xlsx"
+    )
+    model.refurbishment = utils.read_input(path=_path / "INPUT_Refurbishment.xlsx")
+    model.source = utils.read_input(path=_path / "INPUT_Source.xlsx")
+    model.storage = utils.read_input(path=_path / "INPUT_Storage_Technical.xlsx")
+    model.temporal_demand = utils.read_input(path=_path / "INPUT_Time_Resolution.xlsx")
+    model.prices = utils.read_input(path=_path / "INPUT_Prices.xlsx")
+    model.opt_demand = utils.read_opt_demand(
+        data=report.read_table(path=utils.get_opt_demand_path(), name="Demands")
+    )
+
+    utils.add_nodal_sets(model=model, nodes=utils.get_nodes_from_lines(_topology))
+    utils.add_line_sets(model=model, data=[_trans, _high, _mid])
+    utils.add_time_horizon(model=model, year=2050, temporal=12)
+    utils.add_parameter_to_model(model=model)
+    return model
+
+
+def validate(case=None):
+    model = build_model(case=case)
+
+    _start = time.perf_counter()
+    lp = matrix.build(model=model)
+    _matrix = lp.matrix()
+    _time_matrix = time.perf_counter() - _start
+
+    _start = time.perf_counter()
+    utils.add_decision_variables(model=model)
+    constraints.add(model=model)
+    utils.add_objective_function(model=model)
+    _time_pyomo = time.perf_counter() - _start
+
+    """SAME CONSTRAINTS (FAMILIES, ROW BY ROW) AND VARIABLE BOUNDS"""
+    _families = {
+        _constraint.local_name
+        for _constraint in model.component_objects(py.Constraint, active=True)
+    }
+    if _families != set(lp.rows):
+        raise AssertionError(
+            "Constraint families differ: Pyomo only {}, matrix only {}".format(
+                sorted(_families - set(lp.rows)), sorted(set(lp.rows) - _families)
+            )
+        )
+    for _name, (_offset, _index) in lp.rows.items():
+        _keys = list(getattr(model, _name).keys())
+        if _keys != list(_index):
+            raise AssertionError("Rows of {} differ from the Pyomo build".format(_name))
+    for _name in lp.columns:
+        _upper = lp.variable(_name, lp.col_upper)
+        for _key, _var in getattr(model, _name).items():
+            if (_var.ub if _var.ub is not None else float("inf")) != _upper[_key]:
+                raise AssertionError("Upper bound of {}[{}]".format(_name, _key))
+
+    """SAME OPTIMAL OBJECTIVE VALUE"""
+    _solution = matrix.solve_with_highs(lp=lp, tee=False)
+    Solver = utils.set_solver_for_the_model(model, solver="highs")
+    Solver.solve(model)
+    _objective = py.value(model.objective)
+    _difference = abs(_solution["objective"] - _objective) / max(1, abs(_objective))
+
+    print(
+        "{}: {} rows, {} columns, {} nonzeros".format(
+            case, lp.num_row, lp.num_col, _matrix.nnz
+        )
+    )
+    print(
+        "    build [s]: Pyomo {:.2f}, matrix {:.2f} ({:.0f}x)".format(
+            _time_pyomo, _time_matrix, _time_pyomo / _time_matrix
+        )
+    )
+    print(
+        "    objective: Pyomo {:.6f}, matrix {:.6f} (rel. difference {:.1e})".format(
+            _objective, _solution["objective"], _difference
+        )
+    )
+    return
+
+
+if __name__ == "__main__":
+    for _case in sys.argv[1:] or ["."]:
+        validate(case=_case)
@@ -1,11 +1,290 @@
+from contextlib import contextmanager
 from pathlib import Path
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+import tracemalloc
 import geopandas as gpd
 import pyomo.environ as py
 import pyomo
 import numpy as np
+import pandas as pd
+
+
+CACHE = ".cache"
+
+"""ATTRIBUTES OF THE SHAPEFILES THAT ARE USED BY THE MODEL"""
+TOPOLOGY = ["Start", "End", "Type", "Length"]
+
+"""ENVIRONMENT VARIABLE (OR COMMAND LINE FLAG) THAT ENABLES THE BUILD PROFILE"""
+PROFILE = "GND_PROFILE"
+PROFILE_FLAG = "--profile"
+
+"""ENVIRONMENT VARIABLE (OR COMMAND LINE FLAG) THAT ENABLES THE MODEL DUMPS"""
+DUMP = "GND_DUMP"
+DUMP_FLAG = "--dump"
+
+"""SOLVER BACKENDS (IN ORDER OF AUTO-DETECTION) AND THEIR OPTION NAMES"""
+SOLVERS = {
+    "gurobi": {
+        "factory": "gurobi",
+        "persistent": "appsi_gurobi",
+        "threads": "Threads",
+        "time_limit": "TimeLimit",
+        "log_file": "LogFile",
+    },
+    "highs": {
+        "factory": "appsi_highs",
+        "persistent": "appsi_highs",
+        "threads": "threads",
+        "time_limit": "time_limit",
+        "log_file": "log_file",
+    },
+    "cbc": {"factory": "cbc", "threads": "threads", "time_limit": "sec"},
+    "glpk": {"factory": "glpk", "time_limit": "tmlim"},
+}
+
+"""MUTABLE PARAMETERS THAT A SESSION UPDATES IN PLACE (SENSITIVITY RUNS)"""
+MUTABLE = ["par_markup_high", "par_markup_mid", "par_wacc", "par_i", "par_gas_prices"]
+
+"""
+PARAMETER OVERRIDES OF A MODEL RUN (GND_OVERRIDES AS JSON, SET BY sweep.py)
+- MUTABLE parameters, e.g. {"par_wacc": 0.06, "par_markup_mid": 15}
+- horizon: final year of the modeling (default HORIZON)
+- decline_period, residual_share: of DEMAND_DECLINE, a number for all
+  compositions or a dictionary per composition
+"""
+OVERRIDES = "GND_OVERRIDES"
+HORIZON = 2050
+
+"""
+COST-OPTIMAL DEMANDS OF MODEL RUN 1: the table Demands (report.read_table: parquet,
+csv.gz or xlsx) in the folder GND_OPT_DEMAND (e.g. the solution folder of run 1,
+an absolute path for sweeps), by default the folder of this variant
+"""
+OPT_DEMAND = "GND_OPT_DEMAND"
+
+"""
+WARM START FROM THE ARTIFACT report.START OF AN EARLIER RUN OF ANY VARIANT
+(GND_START=<solution folder> OR --start <solution folder>), e.g. in the order
+CO -> CO_MD2 -> ES -> LUMPINESS: an LP gets the basis (highs), a MIP the values
+as MIP start. A basis skips the presolve of HiGHS, so it pays off for re-solves
+of the same variant only: an LP of another variant starts cold (see
+report.read_start).
+BASIS: names of the basis status codes (as HiGHS)
+"""
+START = "GND_START"
+START_FLAG = "--start"
+BASIS = ["lower", "basic", "upper", "zero", "nonbasic"]
+
+"""
+RUN STAGES (python model.py --stage build|report OR GND_STAGE)
+- build: writes STAGE_PATH/model.mps and the name map STAGE_PATH/names.json
+- python solve.py: solves model.mps and writes STAGE_PATH/model.sol
+- report: loads model.sol into the (rebuilt) model and reports the results
+"""
+STAGE = "GND_STAGE"
+STAGE_FLAG = "--stage"
+STAGE_PATH = "stage"
+STAGES = ["build", "report"]
+
+"""
+BACKENDS (python model.py --backend pyomo|matrix OR GND_BACKEND)
+- pyomo: constraints.add builds the constraints, solved by a Pyomo solver
+- matrix: matrix.build assembles the linear program of the same variant without
+  Pyomo constraints, solved by matrix.solve; the values are loaded into the Pyomo
+  variables for the report (not in stages, warm starts or the fix and dual mode)
+"""
+BACKEND = "GND_BACKEND"
+BACKEND_FLAG = "--backend"
+BACKENDS = ["pyomo", "matrix"]
+
+
+def get_cache_file(files=None, cache=None, suffix=None):
+    """
+    Parameters
+    ----------
+    files : List, required
+        Includes the paths of the source files. The default is None.
+    cache : String, required
+        Folder of the cached input data. If None, no cache is used. The default is None.
+    suffix : String, required
+        File extension of the cached copy. The default is None.
+
+    Returns
+    -------
+    _file : Path
+        Path of the cached copy. The name includes the hash of the content of
+        the source files, hence editing a source file invalidates its copy.
+
+    """
+    if cache is None:
+        return None
+    _hash = hashlib.sha256()
+    for _source in files:
+        _hash.update(Path(_source).read_bytes())
+    _name = "{}-{}{}".format(Path(files[0]).stem, _hash.hexdigest()[:16], suffix)
+    _file = Path(cache) / _name
+    return _file
+
+
+def store_in_cache(data=None, file=None):
+    """
+    Parameters
+    ----------
+    data : DataFrame or GeoDataFrame, required
+        Includes the input data to be cached. The default is None.
+    file : Path, required
+        Path of the cached copy (.feather or .parquet). The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    if file is None:
+        return
+    file.parent.mkdir(parents=True, exist_ok=True)
+    _stem = file.stem.rsplit("-", 1)[0]
+    for _stale in file.parent.glob("{}-*{}".format(_stem, file.suffix)):
+        _stale.unlink()
+
+    _temp = file.with_name("{}.{}.tmp".format(file.name, os.getpid()))
+    try:
+        if file.suffix == ".parquet":
+            data.to_parquet(_temp)
+        else:
+            data.to_feather(_temp, compression="uncompressed")
+    except (ImportError, ValueError, TypeError) as error:
+        print("Input data is not cached ({}): {}".format(file.name, error))
+        _temp.unlink(missing_ok=True)
+        return
+    os.replace(_temp, file)
+    return
+
+
+def read_from_cache(file=None):
+    """
+    Parameters
+    ----------
+    file : Path, required
+        Path of the cached copy (.feather or .parquet). The default is None.
+
+    Returns
+    -------
+    _data : DataFrame or GeoDataFrame
+        Includes the cached input data; None if there is no cached copy.
+
+    """
+    if (file is None) or (not file.exists()):
+        return None
+    if file.suffix == ".parquet":
+        return gpd.read_parquet(file)
+
+    from pyarrow import feather
+
+    return feather.read_table(file, memory_map=True).to_pandas()
 
 
-def read_shapefile(path=None, name=None):
+def read_input(path=None, cache=CACHE):
+    """
+    Parameters
+    ----------
+    path : String, required
+        Path to the input file (INPUT_*.xlsx). The default is None.
+    cache : String, optional
+        Folder of the cached input data. If None, the Excel file is always parsed. The default is CACHE.
+
+    Returns
+    -------
+    _data : DataFrame
+        Includes the input data. On first use, a columnar copy (Feather) is
+        stored in the cache and reloaded (memory-mapped) on later runs.
+
+    """
+    _file = get_cache_file(files=[path], cache=cache, suffix=".feather")
+    _data = read_from_cache(file=_file)
+    if _data is not None:
+        return _data
+
+    _data = pd.read_excel(path)
+    store_in_cache(data=_data, file=_file)
+    return _data
+
+
+def read_dbf(file=None, columns=None):
+    """
+    Reads the attribute table (dBase III, .dbf) of a shapefile without GDAL, so
+    without the .shp and .shx files. The encoding is given by the .cpg file
+    next to it, else ISO-8859-1 (as of the dBase standard).
+
+    Parameters
+    ----------
+    file : Path, required
+        Path to the .dbf file. The default is None.
+    columns : List, optional
+        Includes the columns to read. If None, all columns. The default is None.
+
+    Returns
+    -------
+    _data : DataFrame
+        Includes one row per (not deleted) record: the character (C) and date
+        (D) fields as strings, the numeric fields (N, F) as float, or as integer
+        without decimals, the logical (L) fields as Boolean.
+
+    """
+    file = Path(file)
+    _cpg = file.with_suffix(".cpg")
+    _encoding = _cpg.read_text().strip() if _cpg.exists() else "ISO-8859-1"
+    _bytes = file.read_bytes()
+    _records, _header, _length = struct.unpack("<IHH", _bytes[4:12])
+
+    # field descriptors of 32 bytes each, up to the terminator 0x0D
+    _fields = []
+    _offset = 1  # each record starts with the deletion flag
+    for _start in range(32, _header - 1, 32):
+        if _bytes[_start] == 0x0D:
+            break
+        _name = _bytes[_start : _start + 11].split(b"\0")[0].decode(_encoding)
+        _type = chr(_bytes[_start + 11])
+        _size, _decimals = _bytes[_start + 16], _bytes[_start + 17]
+        _fields.append((_name, _type, _offset, _size, _decimals))
+        _offset += _size
+
+    _table = np.frombuffer(
+        _bytes, dtype=np.uint8, count=_records * _length, offset=_header
+    ).reshape(_records, _length)
+    _table = _table[_table[:, 0] != ord("*")]
+
+    _data = {}
+    for _name, _type, _offset, _size, _decimals in _fields:
+        if (columns is not None) and (_name not in columns):
+            continue
+        _values = [
+            bytes(_row).decode(_encoding).strip()
+            for _row in _table[:, _offset : _offset + _size]
+        ]
+        if _type in "NF":
+            _values = pd.to_numeric(pd.Series(_values).replace("", None))
+            if _decimals == 0 and _values.notna().all():
+                _values = _values.astype(np.int64)
+        elif _type == "L":
+            _values = [_value in ("T", "t", "Y", "y") for _value in _values]
+        _data[_name] = _values
+    _data = pd.DataFrame(_data)
+    if columns is not None:
+        _data = _data[[_column for _column in columns if _column in _data]]
+    return _data
+
+
+def read_shapefile(path=None, name=None, cache=CACHE, geometry=True):
     """
     Parameters
     ----------
@@ -13,62 +292,284 @@ def read_shapefile(path=None, name=None):
         Sets the path to the shapefile. The default is None.
     name : String, required
         Name of the shapefile. The default is None.
+    cache : String, optional
+        Folder of the cached input data. If None, the shapefile is always read. The default is CACHE.
+    geometry : Boolean, optional
+        If False, only the attribute table (.dbf) is read with read_dbf, without
+        geometries and coordinate reference system (the .shp and .shx files
+        need not exist), and reduced to the columns in TOPOLOGY. The default is
+        True.
 
     Returns
     -------
-    _data : GeoDataFrame
+    _data : GeoDataFrame or DataFrame
         Includes the information of the shapefile input data.
 
     """
     _path = Path(path)
-    _data = gpd.read_file(_path / name)
+    _stem = Path(name).stem
+    if geometry:
+        _files = sorted(_path.glob(_stem + ".*"))
+        _file = get_cache_file(files=_files, cache=cache, suffix=".parquet")
+    else:
+        _files = [_path / (_stem + _ext) for _ext in [".dbf", ".cpg"]]
+        _files = [_source for _source in _files if _source.exists()]
+        _file = get_cache_file(files=_files, cache=cache, suffix=".feather")
+
+    _data = read_from_cache(file=_file)
+    if _data is not None:
+        return _data
+
+    if geometry:
+        _data = gpd.read_file(_path / name)
+    else:
+        _data = read_dbf(file=_path / (_stem + ".dbf"), columns=TOPOLOGY)
+    store_in_cache(data=_data, file=_file)
     return _data
 
 
-def get_nodes_from_lines(transmission=None, high_pressure=None, mid_pressure=None):
+class NetworkTopology:
+    """
+    Node/line incidence of one network level in compressed sparse row (CSR) format.
+
+    Parameters
+    ----------
+    lines : DataFrame, required
+        Includes the pipelines (Start, End) of the network level. The default is None.
+
+    Attributes
+    ----------
+    nodes : List
+        Includes the nodes of the network level; the position is the integer node ID.
+    node_id : Dict
+        Includes the integer node ID per node.
+    out_ptr, out_lines : numpy.ndarray
+        The lines starting at node i are out_lines[out_ptr[i]:out_ptr[i + 1]].
+    in_ptr, in_lines : numpy.ndarray
+        The lines ending at node i are in_lines[in_ptr[i]:in_ptr[i + 1]].
+    delivery_in : Set
+        Includes the nodes supplied by the upper network level.
+    delivery_out : Set
+        Includes the nodes delivering gas to the lower network level.
+
+    """
+
+    def __init__(self, lines=None):
+        _ids, _nodes = pd.factorize(
+            np.concatenate([lines.Start.to_numpy(), lines.End.to_numpy()])
+        )
+        self.nodes = list(_nodes)
+        self.node_id = {node: i for i, node in enumerate(self.nodes)}
+        _index = lines.index.to_numpy()
+        self.out_ptr, self.out_lines = self._csr(_ids[: len(lines)], _index)
+        self.in_ptr, self.in_lines = self._csr(_ids[len(lines) :], _index)
+        self.delivery_in = set()
+        self.delivery_out = set()
+
+    def _csr(self, ids, index):
+        _ptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=len(self.nodes)), out=_ptr[1:])
+        return _ptr, index[np.argsort(ids, kind="stable")]
+
+    def export_lines(self, node):
+        """Lines starting at the node (empty if the node is not at this level)."""
+        _id = self.node_id.get(node)
+        if _id is None:
+            return []
+        return self.out_lines[self.out_ptr[_id] : self.out_ptr[_id + 1]].tolist()
+
+    def import_lines(self, node):
+        """Lines ending at the node (empty if the node is not at this level)."""
+        _id = self.node_id.get(node)
+        if _id is None:
+            return []
+        return self.in_lines[self.in_ptr[_id] : self.in_ptr[_id + 1]].tolist()
+
+
+def get_network_topology(transmission=None, high_pressure=None, mid_pressure=None):
     """
     Parameters
     ----------
-    transmission : GeoDataFrame, required
+    transmission : DataFrame, required
         Includes the transmission lines. The default is None.
-    high_pressure : GeoDataFrame, required
+    high_pressure : DataFrame, required
         Includes the high-pressure pipelines. The default is None.
-    mid_pressure : GeoDataFrame, required
-        Includes the low-pressure pipelines. The default is None.
+    mid_pressure : DataFrame, required
+        Includes the mid-pressure pipelines. The default is None.
 
     Returns
     -------
-    network : Dict
-        Includes a dictionary with compressor, network level, and delivery nodes.
+    topology : Dict
+        Includes the NetworkTopology per network level, connected by the delivery nodes.
 
     """
-    nodes_tra = []
-    nodes_tra = nodes_tra + list(transmission.Start) + list(transmission.End)
-    nodes_tra = list(set(nodes_tra))
+    _tra = NetworkTopology(lines=transmission)
+    _high = NetworkTopology(lines=high_pressure)
+    _mid = NetworkTopology(lines=mid_pressure)
+
+    _tra.delivery_out = {x for x in _tra.nodes if x in _high.node_id}
+    _high.delivery_in = _tra.delivery_out
+    _high.delivery_out = {x for x in _high.nodes if x in _mid.node_id}
+    _mid.delivery_in = _high.delivery_out
 
-    nodes_high = []
-    nodes_high = nodes_high + list(high_pressure.Start) + list(high_pressure.End)
-    nodes_high = list(set(nodes_high))
+    topology = {"Transmission": _tra, "High-Pressure": _high, "Mid-Pressure": _mid}
+    return topology
 
-    nodes_mid = []
-    nodes_mid = nodes_mid + list(mid_pressure.Start) + list(mid_pressure.End)
-    nodes_mid = list(set(nodes_mid))
 
-    compressors = nodes_tra
-    con_tra_high = [x for x in nodes_tra if x in nodes_high]
-    con_high_mid = [x for x in nodes_high if x in nodes_mid]
+def get_nodes_from_lines(topology=None):
+    """
+    Parameters
+    ----------
+    topology : Dict, required
+        Includes the NetworkTopology per network level. The default is None.
+
+    Returns
+    -------
+    network : Dict
+        Includes a dictionary with compressor, network level, and delivery nodes.
+
+    """
+    _tra = topology["Transmission"]
+    _high = topology["High-Pressure"]
+    _mid = topology["Mid-Pressure"]
 
     network = {
-        "Compressor": compressors,
-        "High-Pressure": nodes_high,
-        "Mid-Pressure": nodes_mid,
-        "Delivery (transmission_high)": con_tra_high,
-        "Delivery (high_mid)": con_high_mid,
+        "Compressor": _tra.nodes,
+        "High-Pressure": _high.nodes,
+        "Mid-Pressure": _mid.nodes,
+        "Delivery (transmission_high)": [
+            x for x in _tra.nodes if x in _tra.delivery_out
+        ],
+        "Delivery (high_mid)": [x for x in _high.nodes if x in _high.delivery_out],
     }
 
     return network
 
 
+def get_rss():
+    """Resident set size of the process in MB (peak RSS if psutil is missing)."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+class Profiler:
+    """
+    Wall time and memory (tracemalloc, RSS) per build phase of a model run.
+
+    Parameters
+    ----------
+    enabled : Boolean, optional
+        If None, the profiler is enabled by the environment variable PROFILE
+        (GND_PROFILE=1) or the command line flag PROFILE_FLAG. The default is None.
+    memory : Boolean, optional
+        Traces the Python memory allocations with tracemalloc, which slows down
+        the model build considerably. If None, set by GND_PROFILE=memory.
+        The default is None.
+
+    Attributes
+    ----------
+    records : List
+        Includes one dictionary per phase (and per constraint of a phase).
+
+    """
+
+    def __init__(self, enabled=None, memory=None):
+        _setting = os.environ.get(PROFILE, "").lower()
+        if enabled is None:
+            enabled = _setting in ["1", "true", "yes", "memory"]
+            enabled = enabled or PROFILE_FLAG in sys.argv
+        if memory is None:
+            memory = _setting == "memory"
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.records = []
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _traced_memory(self):
+        if not self.memory:
+            return 0, 0
+        _current, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return _current, _peak
+
+    def _record(self, name, seconds, start):
+        _current, _peak = self._traced_memory()
+        _record = {"phase": name, "seconds": round(seconds, 4)}
+        if self.memory:
+            _record["memory_delta_mb"] = round((_current - start) / 1e6, 3)
+            _record["memory_peak_mb"] = round(_peak / 1e6, 3)
+        _record["rss_mb"] = round(get_rss(), 3)
+        self.records.append(_record)
+        return _current
+
+    @contextmanager
+    def phase(self, name=None):
+        """Times the enclosed block and takes a memory snapshot at its end."""
+        if not self.enabled:
+            yield
+            return
+        _start = self._traced_memory()[0]
+        _time = time.perf_counter()
+        yield
+        self._record(name, time.perf_counter() - _time, _start)
+        return
+
+    @contextmanager
+    def components(self, name=None):
+        """
+        Like phase, but with one additional record per Pyomo component that is
+        constructed in the block (e.g. per constraint in constraints.add), based
+        on the construction timing that Pyomo reports to its logger.
+        """
+        if not self.enabled:
+            yield
+            return
+        _logger = logging.getLogger("pyomo.common.timing.construction")
+        _profiler = self
+        _start = [self._traced_memory()[0]]
+
+        class _Handler(logging.Handler):
+            def emit(self, record):
+                _component = getattr(record.msg, "obj", None)
+                _seconds = getattr(record.msg, "timer", 0.0)
+                if _component is None:
+                    return
+                _start[0] = _profiler._record(
+                    "{}.{}".format(name, _component.name), _seconds, _start[0]
+                )
+
+        _handler = _Handler()
+        _level, _propagate = _logger.level, _logger.propagate
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(_handler)
+        try:
+            with self.phase(name):
+                yield
+        finally:
+            _logger.removeHandler(_handler)
+            _logger.setLevel(_level)
+            _logger.propagate = _propagate
+        return
+
+    def write(self, path=None):
+        """Writes the records to profile.json in the folder path."""
+        if not self.enabled:
+            return
+        _file = os.path.join(path, "profile.json")
+        with open(_file, "w", encoding="utf-8") as _json:
+            json.dump({"phases": self.records}, _json, indent=2)
+        print("Profile of the model run: {}".format(_file))
+        return
+
+
 def create_model():
     """
     Returns
@@ -158,148 +659,285 @@ def add_time_horizon(model=None, year=None, temporal=None):
     return
 
 
-def transmission_line_capacity_per_year(model, line, year):
-    _line = model.transmission.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Transmission"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return _data.Capacity.item()
-    else:
-        return 0
+def get_line_parameters(
+    lines=None, technical=None, economic=None, line_type=None, years=None
+):
+    """
+    Parameters
+    ----------
+    lines : GeoDataFrame, required
+        Includes the pipelines of one network level. The default is None.
+    technical : DataFrame, required
+        Includes the technical pipeline data (capacity, construction year, technical lifetime). The default is None.
+    economic : DataFrame, required
+        Includes the economic pipeline data (investment costs, amortization period). The default is None.
+    line_type : String, required
+        Network level as named in the column Type of the pipeline data. The default is None.
+    years : List, required
+        Includes the years of the modeling horizon. The default is None.
 
+    Returns
+    -------
+    parameters : Dict
+        Includes the capacity, depreciation factor and book value per (line, year)
+        and the year of the refurbishment investment per line.
 
-def high_line_capacity_per_year(model, line, year):
-    _line = model.high.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "High-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return _data.Capacity.item()
-    else:
-        return 0
+    The pipelines are joined once to the technical and economic data on
+    (Start, End, Type), all lines and years are then computed as arrays.
+    """
+    _keys = ["Start", "End", "Type"]
+    _lines = pd.DataFrame(
+        {"Start": lines.Start.values, "End": lines.End.values, "Type": line_type}
+    )
+    _data = _lines.merge(
+        technical[_keys + ["Capacity", "Yr.-con.", "Tec.-life"]],
+        on=_keys,
+        how="left",
+        validate="many_to_one",
+    ).merge(
+        economic[_keys + ["Inv.-cost", "Amort."]],
+        on=_keys,
+        how="left",
+        validate="many_to_one",
+    )
+
+    _missing = _data[["Capacity", "Inv.-cost"]].isna().any(axis=1).to_numpy()
+    if _missing.any():
+        raise ValueError(
+            "No technical or economic data for the {} line(s): {}".format(
+                line_type, list(lines.index[_missing])
+            )
+        )
 
+    _year = np.asarray(years)[np.newaxis, :]
+    _con = _data["Yr.-con."].to_numpy()[:, np.newaxis]
+    _end = _con + _data["Tec.-life"].to_numpy()[:, np.newaxis]
+    _cap = _data["Capacity"].to_numpy()[:, np.newaxis]
+    _inv = _data["Inv.-cost"].to_numpy()[:, np.newaxis]
+    _amo = _data["Amort."].to_numpy()[:, np.newaxis]
+
+    capacity = np.where(_end > _year, _cap, 0)
+    depreciation = np.where(_end > _year, 0, 1 - (_year - _end) / 50)
+    book_value = np.where(
+        _year > _con + _amo, 0, (_cap * _inv) * (1 - (_year - _con) / _amo)
+    )
+
+    def _per_line_and_year(values):
+        return {
+            (line, year): value
+            for line, row in zip(lines.index, values.tolist())
+            for year, value in zip(years, row)
+        }
+
+    parameters = {
+        "capacity": _per_line_and_year(capacity),
+        "depreciation": _per_line_and_year(depreciation),
+        "book_value": _per_line_and_year(book_value),
+        "year_of_inv": dict(zip(lines.index, _end[:, 0].astype(int).tolist())),
+    }
+    return parameters
 
-def mid_line_capacity_per_year(model, line, year):
-    _line = model.mid.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Mid-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return _data.Capacity.item()
-    else:
-        return 0
 
+def get_opt_demand_path():
+    """
+    Returns
+    -------
+    path : Path
+        Folder of the table Demands of model run 1, the environment variable
+        OPT_DEMAND or the folder of this variant.
 
-def init_opt_gas_demand_high_pressure(model, node, year, time):
-    data = model.opt_demand
-    value = data.filter(region=node,
-                        variable='Gas|Demand|High-Pressure|Supplied',
-                        year=year,
-                        month=time).data['value'].item()
-    return value
+    """
+    return Path(os.environ.get(OPT_DEMAND) or Path(__file__).resolve().parent)
 
 
-def init_opt_gas_demand_mid_pressure(model, node, year, time):
-    data = model.opt_demand
-    value = data.filter(region=node,
-                        variable='Gas|Demand|Mid-Pressure|Supplied',
-                        year=year,
-                        month=time).data['value'].item()
-    return value
+def read_opt_demand(data=None):
+    """
+    Parameters
+    ----------
+    data : DataFrame, required
+        The table Demands of the cost-optimal model run, see get_opt_demand_path.
+        The default is None.
 
+    Returns
+    -------
+    opt_demand : Dict
+        Includes the values of the demand table per (variable, region, year, month).
 
+    """
+    _keys = ["variable", "region", "year", "month"]
+    _data = data[_keys + ["value"]]
+    _duplicated = _data.duplicated(subset=_keys)
+    if _duplicated.any():
+        raise ValueError(
+            "Duplicated entries in the table Demands: {}".format(
+                _data.loc[_duplicated, _keys].values.tolist()[:5]
+            )
+        )
+    # the solver leaves tiny negative values (e.g. -2e-13) of the covered demands
+    opt_demand = dict(
+        zip(
+            zip(*[_data[_key].tolist() for _key in _keys]),
+            _data.value.clip(lower=0).tolist(),
+        )
+    )
+    return opt_demand
 
-def init_nodal_demand_at_high_pressure(model, node, year, time):
-    _data = model.demand
-    _data = _data.loc[(_data.Node == node) & (_data.Type == "High-Pressure")]
-    if _data.empty:
-        return 0
-    else:
-        _temp = model.temporal_demand
-        _case = _data["Time-res."].item()
-        _temp = _temp.loc[time - 1, _data["Time-res."].item()].item()
-
-        _type = _data["Composition"].item()
-        if _type == "Typ A (Wohnen)":
-            if year > 2040:
-                return 0
-            else:
-                return (_data["Yr.-dem."].item() * _temp) - (
-                    (_data["Yr.-dem."].item() * _temp) / 15
-                ) * (year - 2025)
-        elif _type == "Typ B2 (Wohnen und Dienstleistungen)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.15) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ B3 (Wohnen, Industrie und Gewerbe)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.25) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ C (Dienstleistung)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.2) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ D (Industrie und Gewerbe)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.35) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        else:
-            print("Composition of %s not defined", _type)
-            return (_data["Yr.-dem."].item() * _temp) * (1) ** (year - 2025)
-            
-
-def init_nodal_demand_at_mid_pressure(model, node, year, time):
-    _data = model.demand
-    _data = _data.loc[(_data.Node == node) & (_data.Type == "Mid-Pressure")]
-    if _data.empty:
-        return 0
-    else:
-        _temp = model.temporal_demand
-        _case = _data["Time-res."].item()
-        _temp = _temp.loc[time - 1, _data["Time-res."].item()].item()
-
-        _type = _data["Composition"].item()
-        if _type == "Typ A (Wohnen)":
-            if year > 2040:
-                return 0
-            else:
-                return (_data["Yr.-dem."].item() * _temp) - (
-                    (_data["Yr.-dem."].item() * _temp) / 15
-                ) * (year - 2025)
-        elif _type == "Typ B2 (Wohnen und Dienstleistungen)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.15) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ B3 (Wohnen, Industrie und Gewerbe)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.25) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ C (Dienstleistung)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.2) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        elif _type == "Typ D (Industrie und Gewerbe)":
-            return (_data["Yr.-dem."].item() * _temp) - (1-0.35) * (_data["Yr.-dem."].item() * _temp) / 25 * (year - 2025)
-        else:
-            print("Composition of %s not defined", _type)
-            return (_data["Yr.-dem."].item() * _temp) * (1) ** (year - 2025)
 
+def get_opt_gas_demand(
+    opt_demand=None, variable=None, nodes=None, years=None, months=None
+):
+    """
+    Parameters
+    ----------
+    opt_demand : Dict, required
+        Includes the values of the cost-optimal model run per (variable, region, year, month). The default is None.
+    variable : String, required
+        Variable of the demand covered at one network level. The default is None.
+    nodes : List, required
+        Includes the nodes of the network level. The default is None.
+    years : List, required
+        Includes the years of the modeling horizon. The default is None.
+    months : List, required
+        Includes the months (time steps) per year. The default is None.
+
+    Returns
+    -------
+    values : Dict
+        Includes the gas demand covered per (node, year, month); zero entries are skipped.
+
+    """
+    _index = [
+        (node, year, month) for node in nodes for year in years for month in months
+    ]
+    _missing = [_key for _key in _index if (variable,) + _key not in opt_demand]
+    if _missing:
+        raise KeyError(
+            "{} is missing for {} index(es) of the cost-optimal demand, e.g. {}".format(
+                variable, len(_missing), _missing[:5]
+            )
+        )
+    values = {_key: opt_demand[(variable,) + _key] for _key in _index}
+    values = {_key: _value for _key, _value in values.items() if _value != 0}
+    return values
+
+
+"""
+DECLINE OF THE GAS DEMAND PER COMPOSITION OF THE CONSUMERS
+Linear decline from 2025 over the decline period down to the residual share of
+the demand. After the cut-off year (if defined), the demand is zero.
+"""
+DEMAND_DECLINE = pd.DataFrame(
+    [
+        ["Typ A (Wohnen)", 15, 0.0, 2040],
+        ["Typ B2 (Wohnen und Dienstleistungen)", 25, 0.15, np.nan],
+        ["Typ B3 (Wohnen, Industrie und Gewerbe)", 25, 0.25, np.nan],
+        ["Typ C (Dienstleistung)", 25, 0.2, np.nan],
+        ["Typ D (Industrie und Gewerbe)", 25, 0.35, np.nan],
+    ],
+    columns=["Composition", "Decline period", "Residual share", "Cut-off year"],
+)
+
+
+def get_demand_decline(period=None, residual=None):
+    """
+    Parameters
+    ----------
+    period : Float or Dict, optional
+        Decline period in years, for all compositions or per composition. If None,
+        the decline periods of DEMAND_DECLINE are kept. The default is None.
+    residual : Float or Dict, optional
+        Residual share of the demand, see period. The default is None.
+
+    Returns
+    -------
+    decline : DataFrame
+        A copy of DEMAND_DECLINE with the overridden columns.
+
+    """
+    decline = DEMAND_DECLINE.copy()
+    for _column, _value in [("Decline period", period), ("Residual share", residual)]:
+        if isinstance(_value, dict):
+            _unknown = set(_value) - set(decline.Composition)
+            if _unknown:
+                raise ValueError("Unknown compositions: {}".format(sorted(_unknown)))
+            _value = decline.Composition.map(_value).fillna(decline[_column])
+        if _value is not None:
+            decline[_column] = _value
+    return decline
+
+
+def get_nodal_demand(
+    demand=None,
+    temporal=None,
+    level=None,
+    nodes=None,
+    years=None,
+    months=None,
+    decline=DEMAND_DECLINE,
+):
+    """
+    Parameters
+    ----------
+    demand : DataFrame, required
+        Includes the annual gas demand per node (INPUT_Demand.xlsx). The default is None.
+    temporal : DataFrame, required
+        Includes the monthly shares of the annual demand (INPUT_Time_Resolution.xlsx). The default is None.
+    level : String, required
+        Network level as named in the column Type of the demand data. The default is None.
+    nodes : List, required
+        Includes the nodes of the network level. The default is None.
+    years : List, required
+        Includes the years of the modeling horizon. The default is None.
+    months : List, required
+        Includes the months (time steps) per year. The default is None.
+    decline : DataFrame, optional
+        Includes the decline curves per composition. The default is DEMAND_DECLINE.
+
+    Returns
+    -------
+    values : Dict
+        Includes the gas demand per (node, year, month); zero entries are skipped.
+
+    Gas demand at the transmission network level is constant over the years.
+    """
+    _data = demand.loc[(demand.Type == level) & demand.Node.isin(list(nodes))]
+    if _data.Node.duplicated().any():
+        raise ValueError(
+            "More than one {} demand for the node(s): {}".format(
+                level, list(_data.Node[_data.Node.duplicated()])
+            )
+        )
 
-def init_nodal_demand_at_tra_pressure(model, node, year, time):
-    _data = model.demand
-    _data = _data.loc[(_data.Node == node) & (_data.Type == "Transmission")]
-    if _data.empty:
-        return 0
+    if level == "Transmission":
+        _data = _data.assign(
+            **{"Decline period": 1, "Residual share": 1, "Cut-off year": np.nan}
+        )
     else:
-        _temp = model.temporal_demand
-        _case = _data["Time-res."].item()
-        _temp = _temp.loc[time - 1, _data["Time-res."].item()].item()
-        return (_data["Yr.-dem."].item() * _temp) * (1) ** (year - 2025)
+        _data = _data.merge(decline, on="Composition", how="left")
+        for _type in _data.loc[_data["Decline period"].isna(), "Composition"].unique():
+            print("Composition of {} not defined".format(_type))
+        _data = _data.fillna({"Decline period": 1, "Residual share": 1})
+
+    _year = np.asarray(years)[np.newaxis, :, np.newaxis]
+    _profile = temporal.loc[[month - 1 for month in months], _data["Time-res."]]
+    _base = _data["Yr.-dem."].to_numpy()[:, np.newaxis] * _profile.to_numpy().T
+    _base = _base[:, np.newaxis, :]
+    _period = _data["Decline period"].to_numpy()[:, np.newaxis, np.newaxis]
+    _residual = _data["Residual share"].to_numpy()[:, np.newaxis, np.newaxis]
+    _cut_off = _data["Cut-off year"].to_numpy()[:, np.newaxis, np.newaxis]
+
+    # the decline ends at the residual share after the decline period
+    _elapsed = np.minimum(_year - 2025, _period)
+    _values = _base * (1 - (1 - _residual) * _elapsed / _period)
+    _values = np.where(_year > _cut_off, 0, _values)
+
+    _nodes = list(_data.Node)
+    _index = [_axis.tolist() for _axis in np.nonzero(_values)]
+    values = {
+        (_nodes[n], years[y], months[m]): value
+        for n, y, m, value in zip(*_index, _values[np.nonzero(_values)].tolist())
+    }
+    return values
 
 
 def init_pipeline_length_tra(model, line):
@@ -344,162 +982,37 @@ def init_refurbishment_inv_costs_mid(model):
     return _costs.item()
 
 
-def init_tra_node_per_type(model, node, year):
-    _type = "Transmission"
-    _data = model.source
-    _data = _data.loc[_data.Node == node]
-    if _data.empty:
-        return 0
-    else:
-        return _data.Source.item()
-
-
-def init_hp_node_per_type(model, node, year):
-    _type = "High-Pressure"
-    _data = model.source
-    _data = _data.loc[_data.Node == node]
-    if _data.empty:
-        return 0
-    else:
-        return _data.Source.item()
-
-
-def init_mp_node_per_type(model, node, year):
-    _type = "Mid-Pressure"
-    _data = model.source
-    _data = _data.loc[_data.Node == node]
-    if _data.empty:
-        return 0
-    else:
-        return _data.Source.item()
-
-
-def high_line_depreciation_factor_per_year(model, line, year):
-    _line = model.high.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "High-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return 0
-    else:
-        return 1 - (year - _end) / 50
-
-
-def tra_line_depreciation_factor_per_year(model, line, year):
-    _line = model.transmission.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Transmission"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return 0
-    else:
-        return 1 - (year - _end) / 50
-
-
-def mid_line_depreciation_factor_per_year(model, line, year):
-    _line = model.mid.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Mid-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    if _end > year:
-        return 0
-    else:
-        return 1 - (year - _end) / 50
-
-
-def tra_line_book_value(model, line, year):
-    _line = model.transmission.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Transmission"
-
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _capacity = _data.Capacity.item()
-    _con = _data["Yr.-con."].item()
-
-    _data = model.pipeline_economic
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _c_inv = _data["Inv.-cost"].item()
-    _amo = _data["Amort."].item()
-
-    if year > _con + _amo:
-        return 0
-    else:
-        return (_capacity * _c_inv) * (1 - (year - _con) / _amo)
-
-
-def high_line_book_value(model, line, year):
-    _line = model.high.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "High-Pressure"
-
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _capacity = _data.Capacity.item()
-    _con = _data["Yr.-con."].item()
-
-    _data = model.pipeline_economic
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _c_inv = _data["Inv.-cost"].item()
-    _amo = _data["Amort."].item()
-    if year > _con + _amo:
-        return 0
-    else:
-        return (_capacity * _c_inv) * (1 - (year - _con) / _amo)
-
-
-def mid_line_book_value(model, line, year):
-    _line = model.mid.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Mid-Pressure"
-
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _capacity = _data.Capacity.item()
-    _con = _data["Yr.-con."].item()
+def get_nodal_source(source=None, nodes=None, years=None):
+    """
+    Parameters
+    ----------
+    source : DataFrame, required
+        Includes the annual gas source per node (INPUT_Source.xlsx). The default is None.
+    nodes : List, required
+        Includes the nodes of the network level. The default is None.
+    years : List, required
+        Includes the years of the modeling horizon. The default is None.
 
-    _data = model.pipeline_economic
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _c_inv = _data["Inv.-cost"].item()
-    _amo = _data["Amort."].item()
+    Returns
+    -------
+    values : Dict
+        Includes the gas source per (node, year); zero entries are skipped.
 
-    if year > _con + _amo:
-        return 0
-    else:
-        return (_capacity * _c_inv) * (1 - (year - _con) / _amo)
+    The source of a node applies at each network level the node is part of.
+    """
+    _data = source.loc[source.Node.isin(list(nodes)) & (source.Source != 0)]
+    if _data.Node.duplicated().any():
+        raise ValueError(
+            "More than one source for the node(s): {}".format(
+                list(_data.Node[_data.Node.duplicated()])
+            )
+        )
+    values = {
+        (node, year): value
+        for node, value in zip(_data.Node, _data.Source.tolist())
+        for year in years
+    }
+    return values
 
 
 def init_fixed_costs_tra(model, line):
@@ -523,48 +1036,6 @@ def init_fixed_costs_mid(model, line):
     return _costs.item()
 
 
-def init_year_of_inv_tra(model, line):
-    _line = model.transmission.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Transmission"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    return _end
-
-
-def init_year_of_inv_high(model, line):
-    _line = model.high.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "High-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    return _end
-
-
-def init_year_of_inv_mid(model, line):
-    _line = model.mid.loc[line]
-    _start = _line.Start
-    _end = _line.End
-    _type = "Mid-Pressure"
-    _data = model.pipeline_technical
-    _data = _data.loc[
-        (_data.Start == _start) & (_data.End == _end) & (_data.Type == _type)
-    ]
-    _start = _data["Yr.-con."].item()
-    _end = _start + _data["Tec.-life"].item()
-    return _end
-
-
 def init_total_peak_rel_factor(model, month):
     """
     So far, a constant factor between total and peak gas demand per month is implemented.
@@ -585,22 +1056,73 @@ def init_gas_prices_per_year_and_month(model, year, month):
         return _val_per_year
 
 
-def add_parameter_to_model(model=None):
+def add_parameter_to_model(model=None, decline=DEMAND_DECLINE):
     """
     Parameters
     ----------
     model : pyomo.ConcreteModel, required
         Includes the model instance. The default is None.
+    decline : DataFrame, optional
+        Includes the decline curves of the gas demand per composition, see
+        get_demand_decline. The default is DEMAND_DECLINE.
 
     Returns
     -------
     None.
 
     """
+    _tra = get_line_parameters(
+        lines=model.transmission,
+        technical=model.pipeline_technical,
+        economic=model.pipeline_economic,
+        line_type="Transmission",
+        years=list(model.set_year),
+    )
+    _high = get_line_parameters(
+        lines=model.high,
+        technical=model.pipeline_technical,
+        economic=model.pipeline_economic,
+        line_type="High-Pressure",
+        years=list(model.set_year),
+    )
+    _mid = get_line_parameters(
+        lines=model.mid,
+        technical=model.pipeline_technical,
+        economic=model.pipeline_economic,
+        line_type="Mid-Pressure",
+        years=list(model.set_year),
+    )
+    _demand_high = get_nodal_demand(
+        demand=model.demand,
+        temporal=model.temporal_demand,
+        level="High-Pressure",
+        nodes=model.set_node_hp,
+        years=list(model.set_year),
+        months=list(model.set_time_unit),
+        decline=decline,
+    )
+    _demand_mid = get_nodal_demand(
+        demand=model.demand,
+        temporal=model.temporal_demand,
+        level="Mid-Pressure",
+        nodes=model.set_node_mp,
+        years=list(model.set_year),
+        months=list(model.set_time_unit),
+        decline=decline,
+    )
+    _demand_tra = get_nodal_demand(
+        demand=model.demand,
+        temporal=model.temporal_demand,
+        level="Transmission",
+        nodes=model.set_compressor,
+        years=list(model.set_year),
+        months=list(model.set_time_unit),
+    )
+
     model.par_tra_capacity = py.Param(
         model.set_line_tra,
         model.set_year,
-        initialize=transmission_line_capacity_per_year,
+        initialize=_tra["capacity"],
         within=py.NonNegativeReals,
         doc="Pipeline capacity at the transmission network level",
     )
@@ -608,7 +1130,7 @@ def add_parameter_to_model(model=None):
     model.par_high_capacity = py.Param(
         model.set_line_high,
         model.set_year,
-        initialize=high_line_capacity_per_year,
+        initialize=_high["capacity"],
         within=py.NonNegativeReals,
         doc="Pipeline capacity at the high-pressure network level",
     )
@@ -616,7 +1138,7 @@ def add_parameter_to_model(model=None):
     model.par_mid_capacity = py.Param(
         model.set_line_mid,
         model.set_year,
-        initialize=mid_line_capacity_per_year,
+        initialize=_mid["capacity"],
         within=py.NonNegativeReals,
         doc="Pipeline capacity at the mid-pressure network level",
     )
@@ -625,7 +1147,8 @@ def add_parameter_to_model(model=None):
         model.set_node_hp,
         model.set_year,
         model.set_time_unit,
-        initialize=init_nodal_demand_at_high_pressure,
+        initialize=_demand_high,
+        default=0,
         within=py.NonNegativeReals,
         doc="High-pressure gas demand at node n in year y and month m",
     )
@@ -634,7 +1157,8 @@ def add_parameter_to_model(model=None):
         model.set_node_mp,
         model.set_year,
         model.set_time_unit,
-        initialize=init_nodal_demand_at_mid_pressure,
+        initialize=_demand_mid,
+        default=0,
         within=py.NonNegativeReals,
         doc="Mid-pressure gas demand at node n in year y and month m",
     )
@@ -643,7 +1167,8 @@ def add_parameter_to_model(model=None):
         model.set_compressor,
         model.set_year,
         model.set_time_unit,
-        initialize=init_nodal_demand_at_tra_pressure,
+        initialize=_demand_tra,
+        default=0,
         within=py.NonNegativeReals,
         doc="Nodal gas demand at the transmission network level in year y and month m",
     )
@@ -687,12 +1212,17 @@ def add_parameter_to_model(model=None):
         doc="Specific mid-pressure pipeline refurbishment investment costs per MW and km",
     )
 
-    model.par_wacc = py.Param(initialize=0.05, doc="Weighted average cost of capital")
+    model.par_wacc = py.Param(
+        initialize=0.05, mutable=True, doc="Weighted average cost of capital"
+    )
 
     model.par_source_tra = py.Param(
         model.set_compressor,
         model.set_year,
-        initialize=init_tra_node_per_type,
+        initialize=get_nodal_source(
+            source=model.source, nodes=model.set_compressor, years=list(model.set_year)
+        ),
+        default=0,
         within=py.NonNegativeReals,
         doc="Nodal gas source at the transmission network level in year y and month m",
     )
@@ -700,7 +1230,10 @@ def add_parameter_to_model(model=None):
     model.par_source_hp = py.Param(
         model.set_node_hp,
         model.set_year,
-        initialize=init_hp_node_per_type,
+        initialize=get_nodal_source(
+            source=model.source, nodes=model.set_node_hp, years=list(model.set_year)
+        ),
+        default=0,
         within=py.NonNegativeReals,
         doc="High-pressure gas source at node n in year y",
     )
@@ -708,7 +1241,10 @@ def add_parameter_to_model(model=None):
     model.par_source_mp = py.Param(
         model.set_node_mp,
         model.set_year,
-        initialize=init_mp_node_per_type,
+        initialize=get_nodal_source(
+            source=model.source, nodes=model.set_node_mp, years=list(model.set_year)
+        ),
+        default=0,
         within=py.NonNegativeReals,
         doc="Mid-pressure gas source at node n in year y",
     )
@@ -716,7 +1252,7 @@ def add_parameter_to_model(model=None):
     model.par_depreciation_tra = py.Param(
         model.set_line_tra,
         model.set_year,
-        initialize=tra_line_depreciation_factor_per_year,
+        initialize=_tra["depreciation"],
         within=py.NonNegativeReals,
         doc="Depreciation factor of a refurbished transmission pipeline investment",
     )
@@ -724,7 +1260,7 @@ def add_parameter_to_model(model=None):
     model.par_depreciation_high = py.Param(
         model.set_line_high,
         model.set_year,
-        initialize=high_line_depreciation_factor_per_year,
+        initialize=_high["depreciation"],
         within=py.NonNegativeReals,
         doc="Depreciation factor of a refurbished high-pressure pipeline investment",
     )
@@ -732,7 +1268,7 @@ def add_parameter_to_model(model=None):
     model.par_depreciation_mid = py.Param(
         model.set_line_mid,
         model.set_year,
-        initialize=mid_line_depreciation_factor_per_year,
+        initialize=_mid["depreciation"],
         within=py.NonNegativeReals,
         doc="Depreciation factor of a refurbished mid-pressure pipeline investment",
     )
@@ -740,7 +1276,7 @@ def add_parameter_to_model(model=None):
     model.par_book_value_tra = py.Param(
         model.set_line_tra,
         model.set_year,
-        initialize=tra_line_book_value,
+        initialize=_tra["book_value"],
         within=py.NonNegativeReals,
         doc="Book value of a pipeline at the transmission network level in year y",
     )
@@ -748,7 +1284,7 @@ def add_parameter_to_model(model=None):
     model.par_book_value_high = py.Param(
         model.set_line_high,
         model.set_year,
-        initialize=high_line_book_value,
+        initialize=_high["book_value"],
         within=py.NonNegativeReals,
         doc="Book value of a pipeline at the high-pressure network level in year y",
     )
@@ -756,12 +1292,19 @@ def add_parameter_to_model(model=None):
     model.par_book_value_mid = py.Param(
         model.set_line_mid,
         model.set_year,
-        initialize=mid_line_book_value,
+        initialize=_mid["book_value"],
         within=py.NonNegativeReals,
         doc="Book value of a pipeline at the mid-pressure network level in year y",
     )
 
-    model.par_i = py.Param(initialize=0.025, doc="Interest rate: 2.5%")
+    model.par_i = py.Param(initialize=0.025, mutable=True, doc="Interest rate: 2.5%")
+
+    model.par_storage_capacity = py.Param(
+        model.set_storage,
+        initialize=dict(zip(model.storage.Node, model.storage.Capacity.tolist())),
+        within=py.NonNegativeReals,
+        doc="Gas storage capacity at node n",
+    )
 
     model.par_fixed_tra = py.Param(
         initialize=init_fixed_costs_tra,
@@ -783,21 +1326,21 @@ def add_parameter_to_model(model=None):
 
     model.par_year_of_inv_tra = py.Param(
         model.set_line_tra,
-        initialize=init_year_of_inv_tra,
+        initialize=_tra["year_of_inv"],
         within=py.NonNegativeReals,
         doc="Planned year of refurbishment investment per transmission line",
     )
 
     model.par_year_of_inv_hp = py.Param(
         model.set_line_high,
-        initialize=init_year_of_inv_high,
+        initialize=_high["year_of_inv"],
         within=py.NonNegativeReals,
         doc="Planned year of refurbishment investment per high-pressure line",
     )
 
     model.par_year_of_inv_mp = py.Param(
         model.set_line_mid,
-        initialize=init_year_of_inv_mid,
+        initialize=_mid["year_of_inv"],
         within=py.NonNegativeReals,
         doc="Planned year of refurbishment investment per mid-pressure line",
     )
@@ -814,14 +1357,33 @@ def add_parameter_to_model(model=None):
         model.set_time_unit,
         initialize=init_gas_prices_per_year_and_month,
         within=py.NonNegativeReals,
+        mutable=True,
         doc="Gas price per year and month in order to include saisonale storage into the system.",
     )
+
+    model.par_markup_high = py.Param(
+        initialize=0.8,
+        mutable=True,
+        doc="Revenue markup on the gas price at the high-pressure network level",
+    )
+    model.par_markup_mid = py.Param(
+        initialize=17.5,
+        mutable=True,
+        doc="Revenue markup on the gas price at the mid-pressure network level",
+    )
     
     model.p_opt_high_gas = py.Param(
         model.set_node_hp,
         model.set_year,
         model.set_time_unit,
-        initialize=init_opt_gas_demand_high_pressure,
+        initialize=get_opt_gas_demand(
+            opt_demand=model.opt_demand,
+            variable="Gas|Demand|High-Pressure|Supplied",
+            nodes=model.set_node_hp,
+            years=list(model.set_year),
+            months=list(model.set_time_unit),
+        ),
+        default=0,
         within=py.NonNegativeReals,
         doc='Cost-optimal high-pressure gas demand covered at nodal level.')
     
@@ -829,7 +1391,14 @@ def add_parameter_to_model(model=None):
         model.set_node_mp,
         model.set_year,
         model.set_time_unit,
-        initialize=init_opt_gas_demand_mid_pressure,
+        initialize=get_opt_gas_demand(
+            opt_demand=model.opt_demand,
+            variable="Gas|Demand|Mid-Pressure|Supplied",
+            nodes=model.set_node_mp,
+            years=list(model.set_year),
+            months=list(model.set_time_unit),
+        ),
+        default=0,
         within=py.NonNegativeReals,
         doc='Cost-optimal mid-pressure gas demand covered at nodal level.'
         )
@@ -1199,55 +1768,583 @@ def add_objective_function(model=None):
     return
 
 
-def add_import_and_export_lines_per_node(model=None):
-    """TRANSMISSION NETWORK LEVEL"""
-    _data = model.transmission
-    _dict = dict()
-    for node in _data.Start:
-        _dict[node] = list(_data.loc[_data.Start == node].index)
-    model.tra_export_lines = _dict
-    _dict = dict()
-    for node in _data.End:
-        _dict[node] = list(_data.loc[_data.End == node].index)
-    model.tra_import_lines = _dict
-
-    """HIGH-PRESSURE NETWORK LEVEL"""
-    _data = model.high
-    _dict = dict()
-    for node in _data.Start:
-        _dict[node] = list(_data.loc[_data.Start == node].index)
-    model.high_export_lines = _dict
-    _dict = dict()
-    for node in _data.End:
-        _dict[node] = list(_data.loc[_data.End == node].index)
-    model.high_import_lines = _dict
-
-    """MID-PRESSURE NETWORK LEVEL"""
-    _data = model.mid
-    _dict = dict()
-    for node in _data.Start:
-        _dict[node] = list(_data.loc[_data.Start == node].index)
-    model.mid_export_lines = _dict
-    _dict = dict()
-    for node in _data.End:
-        _dict[node] = list(_data.loc[_data.End == node].index)
-    model.mid_import_lines = _dict
+def add_network_topology(model=None, topology=None):
+    """
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Includes the model instance. The default is None.
+    topology : Dict, required
+        Includes the NetworkTopology per network level. The default is None.
 
+    Returns
+    -------
+    None.
+
+    """
+    model.topology_tra = topology["Transmission"]
+    model.topology_high = topology["High-Pressure"]
+    model.topology_mid = topology["Mid-Pressure"]
     return
 
 
-def print_model(model=None):
+def print_model(model=None, enabled=None):
+    """
+    Writes the model dumps (opt-in): <model>.lp.gz with numeric labels, the map of
+    the labels to the variables and constraints <model>.labels.gz (one line
+    "<label> <name>" each) and a summary of the component sizes <model>.txt.
 
-    model.write("CANCEL.lp", io_options={"symbolic_solver_labels": True})
+    Parameters
+    ----------
+    model : Pyomo model, required
+        The default is None.
+    enabled : Boolean, optional
+        If None, the dumps are enabled by the environment variable DUMP
+        (GND_DUMP=1) or the command line flag DUMP_FLAG. The default is None.
 
-    """PRINT MODEL TO .TXT FILE"""
-    _file = open("CANCEL.txt", "w", encoding="utf-8")
-    model.pprint(ostream=_file, verbose=False, prefix="")
-    _file.close()
-    return
+    Returns
+    -------
+    files : List
+        Includes the written files (none if the dumps are disabled).
 
+    """
+    if enabled is None:
+        enabled = os.environ.get(DUMP, "").lower() in ["1", "true", "yes"]
+        enabled = enabled or DUMP_FLAG in sys.argv
+    if not enabled:
+        return []
+
+    _name = str(model.name)
+    _lp = _name + ".lp"
+    _, _symbol_map_id = model.write(_lp, io_options={"symbolic_solver_labels": False})
+    with open(_lp, "rb") as _source, gzip.open(_lp + ".gz", "wb") as _target:
+        shutil.copyfileobj(_source, _target)
+    os.remove(_lp)
+
+    """MAP OF THE NUMERIC LABELS TO THE NAMES"""
+    _symbol_map = model.solutions.symbol_map[_symbol_map_id]
+    with gzip.open(_name + ".labels.gz", "wt", encoding="utf-8") as _file:
+        for _label, _object in _symbol_map.bySymbol.items():
+            _file.write("{} {}\n".format(_label, _object.name))
+
+    """SUMMARY OF THE COMPONENT SIZES (INSTEAD OF model.pprint)"""
+    with open(_name + ".txt", "w", encoding="utf-8") as _file:
+        for _ctype in [py.Set, py.Param, py.Var, py.Constraint, py.Objective]:
+            _components = list(model.component_objects(_ctype, descend_into=True))
+            _file.write(
+                "{} {} ({} entries)\n".format(
+                    len(_components),
+                    _ctype.__name__,
+                    sum(len(_component) for _component in _components),
+                )
+            )
+            for _component in _components:
+                _active = "" if _component.active else " (deactivated)"
+                _file.write(
+                    "    {}: {}{}\n".format(_component.name, len(_component), _active)
+                )
+    return [_lp + ".gz", _name + ".labels.gz", _name + ".txt"]
+
+
+def set_solver_for_the_model(
+    model=None, solver=None, threads=None, time_limit=None, persistent=False
+):
+    """
+    Parameters
+    ----------
+    model : Pyomo model, required
+        The default is None.
+    solver : String, optional
+        One of SOLVERS (gurobi, highs, cbc, glpk). If None, the environment
+        variable GND_SOLVER is used, otherwise the first available backend.
+        The default is None.
+    threads : Integer, optional
+        Number of threads (GND_THREADS). Not supported by glpk. The default is None.
+    time_limit : Float, optional
+        Time limit in seconds (GND_TIME_LIMIT). The default is None.
+    persistent : Boolean, optional
+        Uses the persistent interface of the backend (gurobi, highs), which keeps
+        the loaded model and its basis between two solves. The default is False.
 
-def set_solver_for_the_model(model=None):
-    Solver = pyomo.opt.SolverFactory("gurobi")
-    Solver.options["LogFile"] = str(model.name) + ".log"
+    Returns
+    -------
+    Solver : Pyomo solver
+        Solver.solve(model) imports the duals into model.dual (if declared) for
+        each backend: gurobi, cbc and glpk via the suffix, highs via appsi.
+
+    """
+    solver = solver or os.environ.get("GND_SOLVER")
+    threads = threads or os.environ.get("GND_THREADS")
+    time_limit = time_limit or os.environ.get("GND_TIME_LIMIT")
+
+    _factory = "persistent" if persistent else "factory"
+    _solvers = [_name for _name in SOLVERS if _factory in SOLVERS[_name]]
+    if solver is None:
+        for _name in _solvers:
+            if pyomo.opt.SolverFactory(SOLVERS[_name][_factory]).available(
+                exception_flag=False
+            ):
+                solver = _name
+                break
+        else:
+            raise RuntimeError("None of the solvers {} is available.".format(_solvers))
+    if solver not in _solvers:
+        raise ValueError(
+            "Unknown solver '{}', choose one of {}.".format(solver, _solvers)
+        )
+
+    _backend = SOLVERS[solver]
+    _arguments = {}
+    if _backend[_factory].startswith("appsi_"):
+        # all variables are components of the model: appsi then skips the check
+        # for unused variables after each removed constraint (slow for many)
+        _arguments["only_child_vars"] = True
+    Solver = pyomo.opt.SolverFactory(_backend[_factory], **_arguments)
+    if not Solver.available(exception_flag=False):
+        raise RuntimeError("The solver '{}' is not available.".format(solver))
+
+    if "log_file" in _backend:
+        Solver.options[_backend["log_file"]] = str(model.name) + ".log"
+    if threads is not None:
+        if "threads" in _backend:
+            Solver.options[_backend["threads"]] = int(threads)
+        else:
+            print("The solver '{}' ignores the number of threads.".format(solver))
+    if time_limit is not None:
+        # glpk only accepts whole seconds
+        _cast = int if solver == "glpk" else float
+        Solver.options[_backend["time_limit"]] = _cast(float(time_limit))
+    print("Solver: {} ({})".format(solver, _backend[_factory]))
     return Solver
+
+
+class Session:
+    """
+    Sensitivity runs on one built model: updates the mutable parameters (MUTABLE)
+    in place and re-solves through the persistent interface of the solver, which
+    keeps the loaded model and warm starts from the basis of the last solve.
+
+    Parameters
+    ----------
+    model : Pyomo model, required
+        Built model (with constraints and objective). The default is None.
+    solver : String, optional
+        gurobi or highs, see set_solver_for_the_model. The default is None.
+    threads : Integer, optional
+        The default is None.
+    time_limit : Float, optional
+        The default is None.
+
+    Attributes
+    ----------
+    Solver : Pyomo solver
+        Persistent solver of the session.
+    results : List
+        Includes one dictionary (parameter values, objective, seconds) per solve.
+
+    """
+
+    def __init__(self, model=None, solver=None, threads=None, time_limit=None):
+        self.model = model
+        self.Solver = set_solver_for_the_model(
+            model,
+            solver=solver,
+            threads=threads,
+            time_limit=time_limit,
+            persistent=True,
+        )
+        self.results = []
+
+    def update(self, **parameters):
+        """
+        Sets mutable parameters, e.g. update(par_wacc=0.06, par_markup_mid=15),
+        see set_parameters.
+        """
+        set_parameters(model=self.model, **parameters)
+        return
+
+    def solve(self, tee=False, **parameters):
+        """
+        Updates the parameters (see update) and re-solves the model in place.
+
+        Returns
+        -------
+        objective : Float
+            Optimal objective value.
+
+        """
+        self.update(**parameters)
+        _start = time.perf_counter()
+        solution = self.Solver.solve(self.model, tee=tee)
+        _seconds = time.perf_counter() - _start
+        if solution.solver.termination_condition != "optimal":
+            raise RuntimeError(
+                "Solve ended with '{}' ({}).".format(
+                    solution.solver.termination_condition, parameters
+                )
+            )
+        objective = py.value(self.model.objective)
+        _record = {
+            _name: _value
+            for _name, _value in parameters.items()
+            if np.isscalar(_value)
+        }
+        _record.update(objective=objective, seconds=round(_seconds, 4))
+        self.results.append(_record)
+        return objective
+
+    def sweep(self, parameter=None, values=None, tee=False):
+        """
+        Solves the model once per value of one mutable parameter, e.g.
+        sweep("par_markup_mid", np.linspace(10, 20, 20)).
+
+        Returns
+        -------
+        DataFrame
+            Includes the value, the objective and the solver time per point.
+
+        """
+        _results = []
+        for _value in values:
+            self.solve(tee=tee, **{parameter: _value})
+            _results.append(self.results[-1])
+        return pd.DataFrame(_results)
+
+
+def get_overrides():
+    """
+    Returns
+    -------
+    overrides : Dict
+        The parameter overrides of the environment variable OVERRIDES (JSON),
+        empty if it is not set.
+
+    """
+    overrides = json.loads(os.environ.get(OVERRIDES) or "{}")
+    _known = MUTABLE + ["horizon", "decline_period", "residual_share"]
+    _unknown = [_name for _name in overrides if _name not in _known]
+    if _unknown:
+        raise ValueError(
+            "Unknown overrides {}, choose from {}.".format(_unknown, _known)
+        )
+    return overrides
+
+
+def set_parameters(model=None, **values):
+    """
+    Sets mutable parameters (MUTABLE) in place, e.g. par_wacc=0.06. A scalar is
+    set for every index of an indexed parameter, a dictionary or pandas.Series
+    (index -> value) only for its indices.
+    """
+    for _name, _value in values.items():
+        if _name not in MUTABLE:
+            raise ValueError(
+                "Parameter '{}' is not mutable, choose one of {}.".format(
+                    _name, MUTABLE
+                )
+            )
+        _param = getattr(model, _name)
+        if isinstance(_value, pd.Series):
+            _value = _value.to_dict()
+        if not isinstance(_value, dict):
+            _value = dict.fromkeys(_param.keys(), float(_value))
+        _param.store_values(_value)
+    return
+
+
+def get_start_path():
+    """
+    Returns
+    -------
+    path : str or None
+        Solution folder of the warm start, selected by START_FLAG <folder> or the
+        environment variable START, or None (cold start).
+
+    """
+    path = os.environ.get(START) or None
+    if START_FLAG in sys.argv:
+        _position = sys.argv.index(START_FLAG) + 1
+        path = sys.argv[_position] if _position < len(sys.argv) else None
+    return path
+
+
+def get_basis(Solver=None):
+    """
+    Returns
+    -------
+    basis : Dict or None
+        Basis status (see BASIS) per (component, index) of the variables and
+        constraints after a solve, or None if the backend does not provide it.
+        Only the appsi interface of highs does (through its column/row maps).
+
+    """
+    if getattr(Solver, "_solver_model", None) is None or not hasattr(
+        Solver, "_pyomo_con_to_solver_con_map"
+    ):
+        return None
+    _basis = Solver._solver_model.getBasis()
+    if not _basis.valid:
+        return None
+    _columns = [BASIS[int(_status)] for _status in _basis.col_status]
+    _rows = [BASIS[int(_status)] for _status in _basis.row_status]
+    basis = {}
+    for _id, _column in Solver._pyomo_var_to_solver_var_map.items():
+        _var = Solver._vars[_id][0]
+        basis[_var.parent_component().local_name, _var.index()] = _columns[_column]
+    for _con, _row in Solver._pyomo_con_to_solver_con_map.items():
+        basis[_con.parent_component().local_name, _con.index()] = _rows[_row]
+    return basis
+
+
+def set_basis(model=None, Solver=None, start=None):
+    """
+    Loads the model into the (appsi highs) solver and sets the basis of the warm
+    start. Variables and constraints that are not in the start get a nonbasic
+    (variables) or basic (constraints) status. Too many basic entries are made
+    nonbasic where the start value is at a bound, missing ones are filled up with
+    basic constraints; HiGHS repairs a singular basis itself.
+
+    Returns
+    -------
+    Boolean
+        Whether HiGHS accepted the basis.
+
+    """
+    import highspy
+
+    Solver.set_instance(model)
+    _highs = Solver._solver_model
+    _lp = _highs.getLp()
+    _lower, _upper = np.array(_lp.col_lower_), np.array(_lp.col_upper_)
+    _codes = {_name: _code for _code, _name in enumerate(BASIS)}
+
+    def _nonbasic(column):
+        if np.isfinite(_lower[column]):
+            return _codes["lower"]
+        return _codes["upper"] if np.isfinite(_upper[column]) else _codes["zero"]
+
+    _columns = np.zeros(_lp.num_col_, dtype=int)
+    _at_bound = []
+    for _id, _column in Solver._pyomo_var_to_solver_var_map.items():
+        _var = Solver._vars[_id][0]
+        _value, _status = start.get(
+            (_var.parent_component().local_name, _var.index()), (None, None)
+        )
+        if _status == "basic":
+            _columns[_column] = _codes["basic"]
+            if _value is not None and _value == _lower[_column]:
+                _at_bound.append(_column)
+        elif _status == "upper" and np.isfinite(_upper[_column]):
+            _columns[_column] = _codes["upper"]
+        else:
+            _columns[_column] = _nonbasic(_column)
+
+    _rows = np.full(_lp.num_row_, _codes["basic"])
+    for _con, _row in Solver._pyomo_con_to_solver_con_map.items():
+        _, _status = start.get(
+            (_con.parent_component().local_name, _con.index()), (None, None)
+        )
+        _rows[_row] = _codes.get(_status, _codes["basic"])
+
+    # a basis has as many basic entries as rows
+    _basic = (_columns == _codes["basic"]).sum() + (_rows == _codes["basic"]).sum()
+    _excess = int(_basic) - _lp.num_row_
+    for _column in _at_bound[: max(_excess, 0)]:
+        _columns[_column] = _nonbasic(_column)
+        _excess -= 1
+    if _excess < 0:
+        _promoted = np.flatnonzero(_rows != _codes["basic"])[:-_excess]
+        _rows[_promoted] = _codes["basic"]
+        _excess += len(_promoted)
+
+    _basis = highspy.HighsBasis()
+    _basis.col_status = [highspy.HighsBasisStatus(_code) for _code in _columns]
+    _basis.row_status = [highspy.HighsBasisStatus(_code) for _code in _rows]
+    _basis.valid = True
+    return _excess == 0 and _highs.setBasis(_basis) == highspy.HighsStatus.kOk
+
+
+def set_start(model=None, Solver=None, start=None):
+    """
+    Warm start from an earlier run (see report.read_start). A MIP gets the
+    values of the variables as MIP start, an LP the basis if the backend supports
+    it (highs) and the earlier run is the same model: primal values alone do not
+    warm start the simplex.
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        The default is None.
+    Solver : Pyomo solver, required
+        See set_solver_for_the_model. The default is None.
+    start : Dict, required
+        Includes (value, basis status) per (component, index). The default is None.
+
+    Returns
+    -------
+    warmstart : Boolean
+        The argument warmstart of Solver.solve.
+
+    """
+    _variables = list(model.component_data_objects(py.Var, descend_into=True))
+    if all(_var.is_continuous() for _var in _variables):
+        if not hasattr(Solver, "_pyomo_con_to_solver_con_map"):
+            print("Warm start: no basis for this solver backend, cold start.")
+        elif all(_status is None for _, _status in start.values()):
+            # report stage, gurobi, cbc, glpk: a made-up basis turns off the presolve
+            print("Warm start: the earlier run has no basis, cold start.")
+        elif set_basis(model=model, Solver=Solver, start=start):
+            print("Warm start: basis of the earlier run.")
+        else:
+            print("Warm start: the basis is not accepted, cold start.")
+        return False
+
+    _count = 0
+    for _var in _variables:
+        _value, _ = start.get(
+            (_var.parent_component().local_name, _var.index()), (None, None)
+        )
+        if _value is not None:
+            _var.set_value(_value, skip_validation=True)
+            _count += 1
+    print("Warm start: {} of {} values as MIP start.".format(_count, len(_variables)))
+    return Solver.warm_start_capable()
+
+
+def get_stage():
+    """
+    Returns
+    -------
+    stage : str or None
+        The run stage that is selected by STAGE_FLAG <stage> or the environment
+        variable STAGE (one of STAGES). None means that the model is built,
+        solved and reported in one process.
+
+    """
+    stage = os.environ.get(STAGE) or None
+    if STAGE_FLAG in sys.argv:
+        _position = sys.argv.index(STAGE_FLAG) + 1
+        stage = sys.argv[_position] if _position < len(sys.argv) else ""
+    if stage is not None and stage not in STAGES:
+        raise ValueError(
+            "Unknown stage '{}', choose one of {}.".format(stage, STAGES)
+        )
+    return stage
+
+
+def get_backend():
+    """
+    Returns
+    -------
+    backend : str
+        The backend that is selected by BACKEND_FLAG <backend> or the environment
+        variable BACKEND (one of BACKENDS). The default is pyomo.
+
+    """
+    backend = os.environ.get(BACKEND) or BACKENDS[0]
+    if BACKEND_FLAG in sys.argv:
+        _position = sys.argv.index(BACKEND_FLAG) + 1
+        backend = sys.argv[_position] if _position < len(sys.argv) else ""
+    if backend not in BACKENDS:
+        raise ValueError(
+            "Unknown backend '{}', choose one of {}.".format(backend, BACKENDS)
+        )
+    return backend
+
+
+def write_mps(model=None, path=STAGE_PATH):
+    """
+    Build stage: writes the model with numeric labels to <path>/model.mps and the
+    map of the labels to the variables and constraints (name and index) to
+    <path>/names.json.
+
+    Parameters
+    ----------
+    model : Pyomo model, required
+        The default is None.
+    path : String, optional
+        The default is STAGE_PATH.
+
+    Returns
+    -------
+    file : String
+        The MPS file.
+
+    """
+    os.makedirs(path, exist_ok=True)
+    file = os.path.join(path, "model.mps")
+    _, _symbol_map_id = model.write(
+        file, format="mps", io_options={"symbolic_solver_labels": False}
+    )
+    _symbol_map = model.solutions.symbol_map[_symbol_map_id]
+
+    names = {"model": model.name, "columns": {}, "rows": {}}
+    for _label, _object in _symbol_map.bySymbol.items():
+        _entry = [_object.parent_component().local_name, _object.index()]
+        if _object.ctype is py.Var:
+            names["columns"][_label] = _entry
+        elif _object.ctype is py.Constraint:
+            names["rows"][_label] = _entry
+    with open(os.path.join(path, "names.json"), "w") as _file:
+        # numpy integers (e.g. line ids) as Python integers
+        json.dump(names, _file, default=lambda _value: _value.item())
+    return file
+
+
+def read_sol(model=None, path=STAGE_PATH):
+    """
+    Report stage: loads <path>/model.sol (written by solve.py) into the model,
+    i.e. the values of the variables and, if the model has the suffix model.dual,
+    the duals of the constraints. The model has to be built as in the build stage.
+
+    Parameters
+    ----------
+    model : Pyomo model, required
+        The default is None.
+    path : String, optional
+        The default is STAGE_PATH.
+
+    Returns
+    -------
+    solution : Dict
+        Includes the status and the objective value reported by the solver.
+
+    """
+    with open(os.path.join(path, "names.json")) as _file:
+        names = json.load(_file)
+    if names["model"] != model.name:
+        raise ValueError(
+            "The stage {} belongs to the model {}".format(path, names["model"])
+        )
+
+    def _data(entry):
+        _name, _index = entry
+        if isinstance(_index, list):
+            _index = tuple(_index)
+        return getattr(model, _name)[_index]
+
+    _dual = getattr(model, "dual", None)
+    solution = {}
+    with open(os.path.join(path, "model.sol")) as _file:
+        solution["status"] = _file.readline().split(maxsplit=1)[1].strip()
+        solution["objective"] = float(_file.readline().split()[1])
+        _section = None
+        for _line in _file:
+            _label, _value = _line.split()
+            if _label in ("columns", "rows"):
+                _section = _label
+            elif _section == "columns" and _label in names["columns"]:
+                _data(names["columns"][_label]).set_value(
+                    float(_value), skip_validation=True
+                )
+            elif _section == "rows" and _dual is not None:
+                # MPS rows are c_e_<label>_, c_l_<label>_, c_u_<label>_ or, for
+                # ranges, r_l_<label>_ and r_u_<label>_ (duals are added up)
+                _match = re.match(r"^[cr]_[elu]_(.+)_$", _label)
+                if _match and _match.group(1) in names["rows"]:
+                    _constraint = _data(names["rows"][_match.group(1)])
+                    _dual[_constraint] = _dual.get(_constraint, 0) + float(_value)
+    print(
+        "Solution: {} (objective {})".format(solution["status"], solution["objective"])
+    )
+    return solution
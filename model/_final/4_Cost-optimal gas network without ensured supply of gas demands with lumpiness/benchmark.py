@@ -0,0 +1,81 @@
+from pathlib import Path
+import sys
+import pandas as pd
+import report
+import sweep
+import utils
+
+
+"""
+BENCHMARK OF THE DIAMETER FORMULATIONS: python benchmark.py [formulation ...]
+[--workers N] [--threads N]
+Runs model.py once per formulation (see utils.DIAMETERS, by default binary and
+log, since highs does not support the SOS1 constraints of sos1) as a sweep (see
+sweep.py) with the time limit GND_TIME_LIMIT and collects the statistics of the
+MIP solves (table Mip of each run) in the table sweep/<sweep id>/Benchmark.
+"""
+FORMULATIONS = ["binary", "log"]
+
+
+def benchmark(formulations=None, workers=None, threads=None, formats=None):
+    """
+    Parameters
+    ----------
+    formulations : List, optional
+        Diameter formulations (see utils.DIAMETERS). If None, FORMULATIONS.
+        The default is None.
+    workers, threads, formats : optional
+        See sweep.sweep. The default is None.
+
+    Returns
+    -------
+    results : DataFrame
+        Includes one row per formulation: status, objective, bound, gap, nodes
+        and seconds of the MIP solve, the wall time and the folder of the run.
+
+    """
+    formulations = formulations or FORMULATIONS
+    for _formulation in formulations:
+        utils.get_diameter_formulation(_formulation)
+    _runs = sweep.sweep(
+        grid={"diameter": list(formulations)},
+        workers=workers,
+        threads=threads,
+        formats=formats,
+    )
+
+    _results = []
+    for _run in _runs.to_dict("records"):
+        _result = dict(formulation=_run["diameter"], run_status=_run["status"])
+        if _run["status"] == "ok":
+            _mip = report.read_table(path=_run["path"], name="Mip")
+            _result.update(_mip.drop(columns="formulation").iloc[0].to_dict())
+        _result.update(wall_seconds=_run["seconds"], path=_run["path"])
+        _results.append(_result)
+
+    results = pd.DataFrame(_results)
+    # sweep/<sweep id>/<run id>/solution/<run id>
+    _path = Path(_runs["path"].iloc[0]).parents[2]
+    report.write_table(
+        results,
+        path=_path,
+        name="Benchmark",
+        formats=report.get_output_formats(formats),
+    )
+    return results
+
+
+if __name__ == "__main__":
+    _arguments = sys.argv[1:]
+    _options = {}
+    for _flag in [sweep.WORKERS_FLAG, sweep.THREADS_FLAG]:
+        if _flag in _arguments:
+            _position = _arguments.index(_flag)
+            _options[_flag] = int(_arguments[_position + 1])
+            del _arguments[_position : _position + 2]
+    results = benchmark(
+        formulations=_arguments or None,
+        workers=_options.get(sweep.WORKERS_FLAG),
+        threads=_options.get(sweep.THREADS_FLAG),
+    )
+    print(results.drop(columns="path").to_string(index=False))
@@ -1,8 +1,127 @@
 import pyomo.environ as py
 
 
+"""
+FIX AND DUAL (SEE pin_demand): FAMILIES OF add THAT THE DEMAND PINS REPLACE, AS IN
+THE VARIANT CO_MD2 OF MODEL RUN 2: the demand limits and declines of CO (LIMITS)
+and the supply profiles, which are redundant once every month is pinned: they
+would leave the duals of the pins non-unique
+"""
+LIMITS = [
+    "c_limit_high_demand",
+    "c_limit_mid_demand",
+    "c_decline_gas_supply",
+    "c_decline_gas_mid_pressure",
+]
+PINNED = LIMITS + ["c_ensure_supply_profile_high", "c_ensure_supply_profile_mid"]
+
+"""
+FAMILIES OF add OF A SINGLE VARIANT: the demand pins of CO_MD2 (PINS), the covered
+demands and declines in every month of ES (ENSURED) and the diameter choice of
+LUMPINESS (DIAMETER_CHOICE, with the variables of the lumpiness model run)
+"""
+PINS = ["c_opt_bound_high", "c_opt_bound_mid"]
+ENSURED = [
+    "c_ensure_high_demand",
+    "c_ensure_mid_demand",
+    "c_decline_gas_supply_monthly",
+    "c_decline_gas_mid_pressure_monthly",
+]
+DIAMETER_CHOICE = [
+    "c_lumpiness_high",
+    "c_single_lumpiness_high",
+    "c_lumpiness_mid",
+    "c_single_lumpiness_mid",
+    "c_diameter_sos_high",
+    "c_diameter_sos_mid",
+    "c_diameter_choice_high",
+    "c_diameter_choice_mid",
+    "c_diameter_bit_high",
+    "c_diameter_bit_mid",
+]
+
+"""
+CONSTRAINT FAMILIES (NAMES IN add) THAT ARE NOT BUILT PER MODEL VARIANT (also the
+rows left out by matrix.build); VARIANT is the variant of this model run
+"""
+VARIANTS = {
+    "CO": PINS + ENSURED + DIAMETER_CHOICE,
+    "CO_MD2": PINNED + ENSURED + DIAMETER_CHOICE,
+    "ES": PINS + LIMITS + DIAMETER_CHOICE,
+    "LUMPINESS": PINS + ENSURED,
+}
+VARIANT = "LUMPINESS"
+
+
+class ConstraintRegistry:
+    """
+    Adds the constraint families of add to the model (see ConstraintRegistry.add),
+    but only the active ones.
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        The default is None.
+    variant : str, optional
+        Key of VARIANTS; its families are not built. If None, VARIANT is used.
+        The default is None.
+    families : List, optional
+        Explicit list of the active families (overrides the variant).
+        The default is None.
+
+    Attributes
+    ----------
+    active : List
+        Includes the families added to the model (in the order of add).
+    skipped : List
+        Includes the families not built.
+
+    """
+
+    def __init__(self, model=None, variant=None, families=None):
+        if families is None:
+            variant = variant or VARIANT
+            if variant not in VARIANTS:
+                raise ValueError(
+                    "Variant {} is not implemented in this model run ({})".format(
+                        variant, list(VARIANTS)
+                    )
+                )
+        self.model = model
+        self.families = None if families is None else list(families)
+        self.inactive = VARIANTS.get(variant, [])
+        self.active = []
+        self.skipped = []
+
+    def builds(self, name):
+        """Whether the family <name> is active in the variant (or the families)."""
+        if self.families is None:
+            return name not in self.inactive
+        return name in self.families
+
+    def add(self, name, component):
+        """
+        Adds the (not yet constructed) constraint family <component> to the model as
+        <name> if it is active; otherwise it is never constructed.
+        """
+        if self.builds(name):
+            self.model.add_component(name, component)
+            self.active.append(name)
+        else:
+            self.skipped.append(name)
+        return
+
+    def validate(self):
+        """Raises a ValueError for explicit families that do not exist in add."""
+        _known = self.active + self.skipped
+        _unknown = [name for name in self.families or [] if name not in _known]
+        if _unknown:
+            raise ValueError("Unknown constraint families: {}".format(_unknown))
+        return
+
+
 def cal_capex_per_year(model, year):
-    if year != 2050:
+    if year != model.set_year.last():
         return model.var_capex[year] == model.var_pi[year] * model.par_wacc
     else:
         return model.var_capex[year] == model.var_pi[year]
@@ -220,10 +339,7 @@ def export_from_transmission_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.tra_export_lines.keys():
-        lines = model.tra_export_lines[n]
-    else:
-        lines = []
+    lines = model.topology_tra.export_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -247,10 +363,7 @@ def import_from_transmission_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.tra_import_lines.keys():
-        lines = model.tra_import_lines[n]
-    else:
-        lines = []
+    lines = model.topology_tra.import_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -274,10 +387,7 @@ def export_from_high_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.high_export_lines.keys():
-        lines = model.high_export_lines[n]
-    else:
-        lines = []
+    lines = model.topology_high.export_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -301,10 +411,7 @@ def import_from_high_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.high_import_lines.keys():
-        lines = model.high_import_lines[n]
-    else:
-        lines = []
+    lines = model.topology_high.import_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -328,10 +435,7 @@ def export_from_mid_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.mid_export_lines.keys():
-        lines = model.mid_export_lines[n]
-    else:
-        lines = []
+    lines = model.topology_mid.export_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -355,10 +459,7 @@ def import_from_mid_node(model, n, y, m):
 
     Return : Constraint (12) (Part 1)
     """
-    if n in model.mid_import_lines.keys():
-        lines = model.mid_import_lines[n]
-    else:
-        lines = []
+    lines = model.topology_mid.import_lines(n)
     _length = len(lines)
 
     if _length == 0:
@@ -398,7 +499,7 @@ def negative_bound_per_mid_line(model, p, y, m):
 
 
 def gas_balance_constraint_transmission(model, n, y, m):
-    if n not in model.set_delivery_tra_hp:
+    if n not in model.topology_tra.delivery_out:
         # node n is connected only to the transmission network level
         return (
             model.var_source_tra[n, y, m]
@@ -407,7 +508,7 @@ def gas_balance_constraint_transmission(model, n, y, m):
             * (model.var_export_tra[n, y, m] - model.var_import_tra[n, y, m])
             == 0
         )
-    elif n in model.set_delivery_tra_hp:
+    elif n in model.topology_tra.delivery_out:
         """Node n is connected to both, the transmission and high-pressure network level"""
         return (
             model.var_source_tra[n, y, m]
@@ -419,7 +520,9 @@ def gas_balance_constraint_transmission(model, n, y, m):
         )
 
 def gas_balance_con_high_pressure(model, n, y, m):
-    if (n in model.set_delivery_tra_hp) and (n not in model.set_delivery_hp_mp):
+    _delivery_in = model.topology_high.delivery_in
+    _delivery_out = model.topology_high.delivery_out
+    if (n in _delivery_in) and (n not in _delivery_out):
         """Node n is only connected to the transmission and high-pressure network level. Consequently, this node does not supply mid-pressure gas demand"""
         if n in model.set_storage:
             return (
@@ -441,7 +544,7 @@ def gas_balance_con_high_pressure(model, n, y, m):
                 == 0
             )
 
-    elif (n not in model.set_delivery_tra_hp) and (n not in model.set_delivery_hp_mp):
+    elif (n not in _delivery_in) and (n not in _delivery_out):
         if n in model.set_storage:
             return (
                 model.var_source_high[n, y, m]
@@ -460,7 +563,7 @@ def gas_balance_con_high_pressure(model, n, y, m):
                 == 0
             )
 
-    elif (n not in model.set_delivery_tra_hp) and (n in model.set_delivery_hp_mp):
+    elif (n not in _delivery_in) and (n in _delivery_out):
         if n in model.set_storage:
             return (
                 model.var_source_high[n, y, m]
@@ -483,7 +586,7 @@ def gas_balance_con_high_pressure(model, n, y, m):
 
 
 def gas_balance_con_mid_pressure(model, n, y, m):
-    if n not in model.set_delivery_hp_mp:
+    if n not in model.topology_mid.delivery_in:
         """Node is only connected to the mid-pressure network level"""
         return (
             model.var_source_mid[n, y, m]
@@ -524,21 +627,22 @@ def gas_balance_con_storage(model, n, y, m):
 
 
 def state_of_charge_upper_bound(model, n, y, m):
-    _data = model.storage
-    return (
-        model.var_storage_soc[n, y, m] <= _data.loc[_data.Node == n]["Capacity"].item()
-    )
+    return model.var_storage_soc[n, y, m] <= model.par_storage_capacity[n]
 
 
 """REVENUES CONSTRAINTS"""
 
 
 def revenues_high_pressure_level(model, n, y, m):
-    return model.var_revenues_high[n, y, m] == model.var_demand_high[n, y, m] * (0.8 + model.par_gas_prices[y, m])
+    return model.var_revenues_high[n, y, m] == model.var_demand_high[n, y, m] * (
+        model.par_markup_high + model.par_gas_prices[y, m]
+    )
 
 
 def revenues_mid_pressure_level(model, n, y, m):
-    return model.var_revenues_mid[n, y, m] == model.var_demand_mid[n, y, m] * (17.5 + model.par_gas_prices[y, m])
+    return model.var_revenues_mid[n, y, m] == model.var_demand_mid[n, y, m] * (
+        model.par_markup_mid + model.par_gas_prices[y, m]
+    )
 
 
 def revenues_per_year(model, y):
@@ -563,18 +667,23 @@ def meet_tra_gas_demand(model, n, y, m):
     # Since no revenues are gained by supplying gas demand at 
     # the transmission network level, the corresponding (transmission)
     # demand has to be covered (hard constrained).
+    if model.par_demand_tra[n, y, m] == 0:
+        # structurally zero: bound the variable instead of adding a row
+        model.var_demand_tra[n, y, m].setub(0)
+        return py.Constraint.Skip
     return model.var_demand_tra[n, y, m] == model.par_demand_tra[n, y, m]
 
 def demand_upper_bound_high(model, n, y, m):
     # Since the supplied demand at the high-pressure network level 
     # results in revenues which are considered in the objective function,
     # the covered demand needs to be limited by the demand paramater.
+    # a row also for a structurally zero demand: its dual is a shadow price
     return model.var_demand_high[n, y, m] <= model.par_demand_high[n, y, m]
 
 def ensure_declining_gas_supply(model, n, y, m):
     # ensures that the model does not reconnect formerly unsupplied demands
     # at the high-pressure network level
-    if (y != 2050) and (m == 1):
+    if (y != model.set_year.last()) and (m == 1):
         return model.var_demand_high[n, y + 1, m] <= model.var_demand_high[n, y, m]
     else:
         return py.Constraint.Skip
@@ -582,7 +691,7 @@ def ensure_declining_gas_supply(model, n, y, m):
 def ensure_declining_gas_supply_mid(model, n, y, m):
     # ensures that the model does not reconnect formerly unsupplied demands
     # at the mid-pressure network level
-    if (y != 2050) and (m == 1):
+    if (y != model.set_year.last()) and (m == 1):
         return model.var_demand_mid[n, y + 1, m] <= model.var_demand_mid[n, y, m]
     else:
         return py.Constraint.Skip
@@ -591,8 +700,39 @@ def demand_upper_bound_mid(model, n, y, m):
     # Since the supplied demand at the high-pressure network level results 
     # in revenues which are considered in the objective function, 
     # the covered demand needs to be limited by the demand paramater.
+    # a row also for a structurally zero demand: its dual is a shadow price
     return model.var_demand_mid[n, y, m] <= model.par_demand_mid[n, y, m]
 
+def ensure_high_gas_demand(model, n, y, m):
+    # ES: the gas demand at the high-pressure network level has to be covered;
+    # a row also for a structurally zero demand: its dual is a shadow price
+    return model.var_demand_high[n, y, m] == model.par_demand_high[n, y, m]
+
+def ensure_mid_gas_demand(model, n, y, m):
+    # ES: the gas demand at the mid-pressure network level has to be covered
+    return model.var_demand_mid[n, y, m] == model.par_demand_mid[n, y, m]
+
+def ensure_declining_gas_supply_monthly(model, n, y, m):
+    # ES: as ensure_declining_gas_supply, but in every month
+    if y != model.set_year.last():
+        return model.var_demand_high[n, y + 1, m] <= model.var_demand_high[n, y, m]
+    else:
+        return py.Constraint.Skip
+
+def ensure_declining_gas_supply_mid_monthly(model, n, y, m):
+    # ES: as ensure_declining_gas_supply_mid, but in every month
+    if y != model.set_year.last():
+        return model.var_demand_mid[n, y + 1, m] <= model.var_demand_mid[n, y, m]
+    else:
+        return py.Constraint.Skip
+
+def lower_bound_high_gas_covered(model, n, y, m):
+    # fix and dual: pins the covered demand at its cost-optimal value
+    return model.var_demand_high[n, y, m] == model.p_opt_high_gas[n, y, m]
+
+def lower_bound_mid_gas_covered(model, n, y, m):
+    return model.var_demand_mid[n, y, m] == model.p_opt_mid_gas[n, y, m]
+
 def ensure_supply_profile_high(model, n, y, m):
     if m == 1:
         return py.Constraint.Skip
@@ -634,6 +774,11 @@ def max_annual_source_per_node_tra(model, n, y):
 
     """
 
+    if model.par_source_tra[n, y] == 0:
+        # structurally zero: bound the variables instead of adding a row
+        for month in model.set_time_unit:
+            model.var_source_tra[n, y, month].setub(0)
+        return py.Constraint.Skip
     return (
         sum(model.var_source_tra[n, y, month] for month in model.set_time_unit)
         <= model.par_source_tra[n, y]
@@ -660,6 +805,11 @@ def max_annual_source_per_node_high(model, n, y):
 
     """
 
+    if model.par_source_hp[n, y] == 0:
+        # structurally zero: bound the variables instead of adding a row
+        for month in model.set_time_unit:
+            model.var_source_high[n, y, month].setub(0)
+        return py.Constraint.Skip
     return (
         sum(model.var_source_high[n, y, month] for month in model.set_time_unit)
         <= model.par_source_hp[n, y]
@@ -686,6 +836,11 @@ def max_annual_source_per_node_mid(model, n, y):
 
     """
 
+    if model.par_source_mp[n, y] == 0:
+        # structurally zero: bound the variables instead of adding a row
+        for month in model.set_time_unit:
+            model.var_source_mid[n, y, month].setub(0)
+        return py.Constraint.Skip
     return (
         sum(model.var_source_mid[n, y, month] for month in model.set_time_unit)
         <= model.par_source_mp[n, y]
@@ -699,388 +854,775 @@ def total_spendings_per_year(model, year):
         for month in model.set_time_unit)
 
 
-def add(model=None):
+def diameter_sos_high(model, line):
+    # the capacities order the diameters of the set, no pipe first (weight 0)
+    _diameters = [model.v_diameter_high[line, d] for d in model.set_lumpiness]
+    _weights = [model.par_diameter_capacity[d] for d in model.set_lumpiness]
+    return [model.v_diameter_none_high[line]] + _diameters, [0] + _weights
 
-    """ADD CONSTRAINTS TO MODEL INSTANCE"""
-    model.con_capex = py.Constraint(
-        model.set_year, rule=cal_capex_per_year, doc="Capex = WACC x Book-Value"
-    )
-    model.con_fixed = py.Constraint(
-        model.set_year,
-        rule=cal_total_fixed_costs_per_year,
-        doc="Opex = Fix_Tra + Fix_High + Fix_Mid",
-    )
-    model.con_fixed_tra = py.Constraint(
-        model.set_year, rule=cal_fixed_costs_tra, doc="Fix_Tra = c_fix x Total capacity"
-    )
-    model.con_fixed_high = py.Constraint(
-        model.set_year,
-        rule=cal_fixed_costs_high,
-        doc="Fix_High = c_fix x Total capacity",
-    )
-    model.con_fixed_mid = py.Constraint(
-        model.set_year, rule=cal_fixed_costs_mid, doc="Fix_Mid = c_fix x Total capacity"
-    )
 
-    model.con_total_tra_cap = py.Constraint(
-        model.set_year,
-        rule=cal_total_tra_capacity,
-        doc="Calculate total transmission pipeline capacity",
-    )
-    model.con_total_high_cap = py.Constraint(
-        model.set_year,
-        rule=cal_total_high_capacity,
-        doc="Calculate total high-pressure pipeline capacity",
-    )
-    model.con_total_mid_cap = py.Constraint(
-        model.set_year,
-        rule=cal_total_mid_capacity,
-        doc="Calculate total mid-pressure pipeline capacity",
-    )
+def diameter_sos_mid(model, line):
+    _diameters = [model.v_diameter_mid[line, d] for d in model.set_lumpiness]
+    _weights = [model.par_diameter_capacity[d] for d in model.set_lumpiness]
+    return [model.v_diameter_none_mid[line]] + _diameters, [0] + _weights
 
-    model.con_total_tra_cap_line = py.Constraint(
-        model.set_year,
-        model.set_line_tra,
-        rule=cal_cap_per_tra_line,
-        doc="Total pipeline capacity = Initial + Refurbished",
-    )
-    model.con_total_high_cap_line = py.Constraint(
-        model.set_year,
-        model.set_line_high,
-        rule=cal_cap_per_hp_line,
-        doc="Total pipeline capacity = Initial + Refurbished",
-    )
-    model.con_total_mid_cap_line = py.Constraint(
-        model.set_year,
-        model.set_line_mid,
-        rule=cal_cap_per_mp_line,
-        doc="Total pipeline capacity = Initial + Refurbished",
-    )
 
-    model.con_total_book_val = py.Constraint(
-        model.set_year,
-        rule=cal_total_book_value_per_year,
-        doc="Book-Value = BV_Tra + BV_High + BV_Mid",
-    )
-    model.con_book_value_tra = py.Constraint(
-        model.set_year,
-        rule=cal_book_value_tra_per_year,
-        doc="Total (Transmission) Book Value",
-    )
-    model.con_book_value_high = py.Constraint(
-        model.set_year,
-        rule=cal_book_value_high_per_year,
-        doc="Total (High-Pressure) Book Value",
-    )
-    model.con_book_value_mid = py.Constraint(
-        model.set_year,
-        rule=cal_book_value_mid_per_year,
-        doc="Total (Mid-Pressure) Book Value",
-    )
+def diameter_choice_high(model, line):
+    # with the SOS1 set, the shares sum to one only if the nonzero share is 1
+    return model.v_diameter_none_high[line] + sum(
+        model.v_diameter_high[line, d] for d in model.set_lumpiness
+    ) == 1
 
-    model.con_book_value_tra_line = py.Constraint(
-        model.set_year,
-        model.set_line_tra,
-        rule=cal_book_value_tra_line,
-        doc="Transmission: Book value of pipeline = Existing + Refurbished",
-    )
-    model.con_book_value_high_line = py.Constraint(
-        model.set_year,
-        model.set_line_high,
-        rule=cal_book_value_high_line,
-        doc="High-Pressure: Book value of pipeline = Existing + Refurbished",
-    )
-    model.con_book_value_mid_line = py.Constraint(
-        model.set_year,
-        model.set_line_mid,
-        rule=cal_book_value_mid_line,
-        doc="Mid-Pressure: Book value of pipeline = Existing + Refurbished",
-    )
 
-    model.con_inv_tra_line = py.Constraint(
-        model.set_line_tra,
-        rule=cal_investment_costs_per_tra_line,
-        doc="Transmission: Ref. Investment = [EUR/MW/km] x Length x Capacity",
-    )
-    model.con_inv_high_line = py.Constraint(
-        model.set_line_high,
-        rule=cal_investment_costs_per_high_line,
-        doc="High-Pressure: Ref. Investment = [EUR/MW/km] x Length x Capacity",
-    )
-    model.con_inv_mid_line = py.Constraint(
-        model.set_line_mid,
-        rule=cal_investment_costs_per_mid_line,
-        doc="Mid-Pressure: Ref. Investment = [EUR/MW/km] x Length x Capacity",
-    )
+def diameter_choice_mid(model, line):
+    return model.v_diameter_none_mid[line] + sum(
+        model.v_diameter_mid[line, d] for d in model.set_lumpiness
+    ) == 1
 
-    model.con_gamma_inv_tra_bounds = py.Constraint(
-        model.set_line_tra,
-        model.set_year,
-        rule=set_bounds_of_gamma_inv_transmission,
-        doc="Transmision: Refurbished Capacity. Before investment year 0; after constant.",
-    )
-    model.con_gamma_inv_high_bounds = py.Constraint(
-        model.set_line_high,
-        model.set_year,
-        rule=set_bounds_of_gamma_inv_high,
-        doc="High-Pressure: Refurbished Capacity. Before investment year 0; after constant.",
-    )
-    model.con_gamma_inv_mid_bounds = py.Constraint(
-        model.set_line_mid,
-        model.set_year,
-        rule=set_bounds_of_gamma_inv_mid,
-        doc="Mid-Pressure: Refurbished Capacity. Before investment year 0; after constant.",
-    )
 
-    model.con_total_export_per_tra_node = py.Constraint(
-        model.set_compressor,
-        model.set_year,
-        model.set_time_unit,
-        rule=export_from_transmission_node,
-        doc="Transmission: Total export from one node (sum up all relevant pipelines).",
-    )
-    model.con_total_export_per_high_node = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=export_from_high_node,
-        doc="High-Pressure: Total export from one node (sum up all relevant pipelines).",
-    )
-    model.con_total_export_per_mid_node = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=export_from_mid_node,
-        doc="Mid-Pressure: Total export from one node (sum up all relevant pipelines).",
+def diameter_bit_high(model, line, bit):
+    # a bit is set iff the index (position in the catalog, 0: none) of the chosen
+    # diameter has it, so that at most one diameter gets a nonzero share
+    return model.v_diameter_bit_high[line, bit] == sum(
+        model.v_diameter_high[line, d]
+        for d in model.set_lumpiness
+        if model.set_lumpiness.ord(d) >> bit & 1
     )
 
-    model.con_total_import_per_tra_node = py.Constraint(
-        model.set_compressor,
-        model.set_year,
-        model.set_time_unit,
-        rule=import_from_transmission_node,
-        doc="Transmission: Total import to one node (sum up all relevant pipelines).",
-    )
-    model.con_total_import_per_high_node = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=import_from_high_node,
-        doc="High-Pressure: Total import to one node (sum up all relevant pipelines).",
-    )
-    model.con_total_import_per_mid_node = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=import_from_mid_node,
-        doc="Mid-Pressure: Total import to one node (sum up all relevant pipelines).",
-    )
 
-    model.con_positive_capacity_bound_tra = py.Constraint(
-        model.set_line_tra,
-        model.set_year,
-        model.set_time_unit,
-        rule=positive_bound_per_tra_line,
-        doc="Transmission: transported amount at one pipeline <= Pipeline capacity; Constraint 14.1; Direction 1.",
-    )
-    model.con_positive_capacity_bound_high = py.Constraint(
-        model.set_line_high,
-        model.set_year,
-        model.set_time_unit,
-        rule=positive_bound_per_high_line,
-        doc="High-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 14.2; Direction 1.",
-    )
-    model.con_positive_capacity_bound_mid = py.Constraint(
-        model.set_line_mid,
-        model.set_year,
-        model.set_time_unit,
-        rule=positive_bound_per_mid_line,
-        doc="Mid-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 14.3; Direction 1.",
-    )
-    model.con_negative_capacity_bound_tra = py.Constraint(
-        model.set_line_tra,
-        model.set_year,
-        model.set_time_unit,
-        rule=negative_bound_per_tra_line,
-        doc="Transmission: transported amount at one pipeline <= Pipeline capacity; Constraint 15.1; Direction 2.",
-    )
-    model.con_negative_capacity_bound_high = py.Constraint(
-        model.set_line_high,
-        model.set_year,
-        model.set_time_unit,
-        rule=negative_bound_per_high_line,
-        doc="High-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 15.2; Direction 2.",
-    )
-    model.con_negative_capacity_bound_mid = py.Constraint(
-        model.set_line_mid,
-        model.set_year,
-        model.set_time_unit,
-        rule=negative_bound_per_mid_line,
-        doc="Mid-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 15.3; Direction 2.",
+def diameter_bit_mid(model, line, bit):
+    return model.v_diameter_bit_mid[line, bit] == sum(
+        model.v_diameter_mid[line, d]
+        for d in model.set_lumpiness
+        if model.set_lumpiness.ord(d) >> bit & 1
     )
 
-    model.c_gas_balance_tra = py.Constraint(
-        model.set_compressor,
-        model.set_year,
-        model.set_time_unit,
-        rule=gas_balance_constraint_transmission,
-        doc="Transmission: Gas balance at one node; Constraint 16.1.",
-    )
-    model.c_gas_balance_hp = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=gas_balance_con_high_pressure,
-        doc="High-Pressure: Gas balance at one node; Constraint 16.2.",
-    )
-    model.c_gas_balance_mp = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=gas_balance_con_mid_pressure,
-        doc="Mid-Pressure: Gas balance at one node; Constraint 16.3.",
-    )
 
-    model.c_soc_upper_bound = py.Constraint(
-        model.set_storage,
-        model.set_year,
-        model.set_time_unit,
-        rule=state_of_charge_upper_bound,
-        doc="High-Pressure: Max gas storage capacity at one node; Constraint 19b.",
-    )
-    model.c_soc_in_and_out = py.Constraint(
-        model.set_storage,
-        model.set_year,
-        model.set_time_unit,
-        rule=gas_balance_con_storage,
-        doc="High-Pressure: State of charge for gas storage at one node; Constraint 19a.",
-    )
+def add(model=None, variant=None, families=None):
+    """
+    Adds the constraints of a model variant (or of an explicit list of families).
 
-    model.c_rev_high = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=revenues_high_pressure_level,
-        doc="High-Pressure: Revenues = (Supplied) Demand x Factor; Constraint 20.1.",
-    )
-    model.c_rev_mid = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=revenues_mid_pressure_level,
-        doc="Mid-Pressure: Revenues = (Supplied) Demand x Factor; Constraint 20.2.",
-    )
-    model.c_rev_year = py.Constraint(
-        model.set_year,
-        rule=revenues_per_year,
-        doc="All: Revenues = Sum(Revenues) for all pressure levels; Constraint 21.",
-    )
-    model.c_equal_tra_demand = py.Constraint(
-        model.set_compressor,
-        model.set_year,
-        model.set_time_unit,
-        rule=meet_tra_gas_demand,
-        doc="Transmission: Gas demand must be satisfied (since no economic incentive is considered in the Obj. function).",
-    )
-    model.c_limit_high_demand = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=demand_upper_bound_high,
-        doc="Upper limit of the high-pressure gas demand covered is set by the corresponding input parameter.",
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        The default is None.
+    variant : str, optional
+        Model variant (key of VARIANTS). If None, VARIANT is used. The default is None.
+    families : List, optional
+        Names of the constraint families to build, e.g. ["con_capex", ...]; all
+        others are not built. Overrides the variant. The default is None.
+
+    Returns
+    -------
+    List
+        Includes the names of the constraint families added to the model.
+
+    """
+    registry = ConstraintRegistry(model=model, variant=variant, families=families)
+
+    """ADD CONSTRAINTS TO MODEL INSTANCE"""
+    registry.add(
+        "con_capex",
+        py.Constraint(
+            model.set_year,
+            rule=cal_capex_per_year,
+            doc="Capex = WACC x Book-Value",
+        ),
+    )
+    registry.add(
+        "con_fixed",
+        py.Constraint(
+            model.set_year,
+            rule=cal_total_fixed_costs_per_year,
+            doc="Opex = Fix_Tra + Fix_High + Fix_Mid",
+        ),
+    )
+    registry.add(
+        "con_fixed_tra",
+        py.Constraint(
+            model.set_year,
+            rule=cal_fixed_costs_tra,
+            doc="Fix_Tra = c_fix x Total capacity",
+        ),
+    )
+    registry.add(
+        "con_fixed_high",
+        py.Constraint(
+            model.set_year,
+            rule=cal_fixed_costs_high,
+            doc="Fix_High = c_fix x Total capacity",
+        ),
+    )
+    registry.add(
+        "con_fixed_mid",
+        py.Constraint(
+            model.set_year,
+            rule=cal_fixed_costs_mid,
+            doc="Fix_Mid = c_fix x Total capacity",
+        ),
+    )
+
+    registry.add(
+        "con_total_tra_cap",
+        py.Constraint(
+            model.set_year,
+            rule=cal_total_tra_capacity,
+            doc="Calculate total transmission pipeline capacity",
+        ),
+    )
+    registry.add(
+        "con_total_high_cap",
+        py.Constraint(
+            model.set_year,
+            rule=cal_total_high_capacity,
+            doc="Calculate total high-pressure pipeline capacity",
+        ),
+    )
+    registry.add(
+        "con_total_mid_cap",
+        py.Constraint(
+            model.set_year,
+            rule=cal_total_mid_capacity,
+            doc="Calculate total mid-pressure pipeline capacity",
+        ),
+    )
+
+    registry.add(
+        "con_total_tra_cap_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_tra,
+            rule=cal_cap_per_tra_line,
+            doc="Total pipeline capacity = Initial + Refurbished",
+        ),
+    )
+    registry.add(
+        "con_total_high_cap_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_high,
+            rule=cal_cap_per_hp_line,
+            doc="Total pipeline capacity = Initial + Refurbished",
+        ),
+    )
+    registry.add(
+        "con_total_mid_cap_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_mid,
+            rule=cal_cap_per_mp_line,
+            doc="Total pipeline capacity = Initial + Refurbished",
+        ),
+    )
+
+    registry.add(
+        "con_total_book_val",
+        py.Constraint(
+            model.set_year,
+            rule=cal_total_book_value_per_year,
+            doc="Book-Value = BV_Tra + BV_High + BV_Mid",
+        ),
+    )
+    registry.add(
+        "con_book_value_tra",
+        py.Constraint(
+            model.set_year,
+            rule=cal_book_value_tra_per_year,
+            doc="Total (Transmission) Book Value",
+        ),
+    )
+    registry.add(
+        "con_book_value_high",
+        py.Constraint(
+            model.set_year,
+            rule=cal_book_value_high_per_year,
+            doc="Total (High-Pressure) Book Value",
+        ),
+    )
+    registry.add(
+        "con_book_value_mid",
+        py.Constraint(
+            model.set_year,
+            rule=cal_book_value_mid_per_year,
+            doc="Total (Mid-Pressure) Book Value",
+        ),
+    )
+
+    registry.add(
+        "con_book_value_tra_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_tra,
+            rule=cal_book_value_tra_line,
+            doc="Transmission: Book value of pipeline = Existing + Refurbished",
+        ),
+    )
+    registry.add(
+        "con_book_value_high_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_high,
+            rule=cal_book_value_high_line,
+            doc="High-Pressure: Book value of pipeline = Existing + Refurbished",
+        ),
+    )
+    registry.add(
+        "con_book_value_mid_line",
+        py.Constraint(
+            model.set_year,
+            model.set_line_mid,
+            rule=cal_book_value_mid_line,
+            doc="Mid-Pressure: Book value of pipeline = Existing + Refurbished",
+        ),
+    )
+
+    registry.add(
+        "con_inv_tra_line",
+        py.Constraint(
+            model.set_line_tra,
+            rule=cal_investment_costs_per_tra_line,
+            doc="Transmission: Ref. Investment = [EUR/MW/km] x Length x Capacity",
+        ),
+    )
+    registry.add(
+        "con_inv_high_line",
+        py.Constraint(
+            model.set_line_high,
+            rule=cal_investment_costs_per_high_line,
+            doc="High-Pressure: Ref. Investment = [EUR/MW/km] x Length x Capacity",
+        ),
+    )
+    registry.add(
+        "con_inv_mid_line",
+        py.Constraint(
+            model.set_line_mid,
+            rule=cal_investment_costs_per_mid_line,
+            doc="Mid-Pressure: Ref. Investment = [EUR/MW/km] x Length x Capacity",
+        ),
+    )
+
+    registry.add(
+        "con_gamma_inv_tra_bounds",
+        py.Constraint(
+            model.set_line_tra,
+            model.set_year,
+            rule=set_bounds_of_gamma_inv_transmission,
+            doc="Transmision: Refurbished Capacity. Before investment year 0; after constant.",
+        ),
+    )
+    registry.add(
+        "con_gamma_inv_high_bounds",
+        py.Constraint(
+            model.set_line_high,
+            model.set_year,
+            rule=set_bounds_of_gamma_inv_high,
+            doc="High-Pressure: Refurbished Capacity. Before investment year 0; after constant.",
+        ),
+    )
+    registry.add(
+        "con_gamma_inv_mid_bounds",
+        py.Constraint(
+            model.set_line_mid,
+            model.set_year,
+            rule=set_bounds_of_gamma_inv_mid,
+            doc="Mid-Pressure: Refurbished Capacity. Before investment year 0; after constant.",
+        ),
+    )
+
+    registry.add(
+        "con_total_export_per_tra_node",
+        py.Constraint(
+            model.set_compressor,
+            model.set_year,
+            model.set_time_unit,
+            rule=export_from_transmission_node,
+            doc="Transmission: Total export from one node (sum up all relevant pipelines).",
+        ),
+    )
+    registry.add(
+        "con_total_export_per_high_node",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=export_from_high_node,
+            doc="High-Pressure: Total export from one node (sum up all relevant pipelines).",
+        ),
+    )
+    registry.add(
+        "con_total_export_per_mid_node",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=export_from_mid_node,
+            doc="Mid-Pressure: Total export from one node (sum up all relevant pipelines).",
+        ),
+    )
+
+    registry.add(
+        "con_total_import_per_tra_node",
+        py.Constraint(
+            model.set_compressor,
+            model.set_year,
+            model.set_time_unit,
+            rule=import_from_transmission_node,
+            doc="Transmission: Total import to one node (sum up all relevant pipelines).",
+        ),
+    )
+    registry.add(
+        "con_total_import_per_high_node",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=import_from_high_node,
+            doc="High-Pressure: Total import to one node (sum up all relevant pipelines).",
+        ),
+    )
+    registry.add(
+        "con_total_import_per_mid_node",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=import_from_mid_node,
+            doc="Mid-Pressure: Total import to one node (sum up all relevant pipelines).",
+        ),
+    )
+
+    registry.add(
+        "con_positive_capacity_bound_tra",
+        py.Constraint(
+            model.set_line_tra,
+            model.set_year,
+            model.set_time_unit,
+            rule=positive_bound_per_tra_line,
+            doc="Transmission: transported amount at one pipeline <= Pipeline capacity; Constraint 14.1; Direction 1.",
+        ),
+    )
+    registry.add(
+        "con_positive_capacity_bound_high",
+        py.Constraint(
+            model.set_line_high,
+            model.set_year,
+            model.set_time_unit,
+            rule=positive_bound_per_high_line,
+            doc="High-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 14.2; Direction 1.",
+        ),
+    )
+    registry.add(
+        "con_positive_capacity_bound_mid",
+        py.Constraint(
+            model.set_line_mid,
+            model.set_year,
+            model.set_time_unit,
+            rule=positive_bound_per_mid_line,
+            doc="Mid-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 14.3; Direction 1.",
+        ),
+    )
+    registry.add(
+        "con_negative_capacity_bound_tra",
+        py.Constraint(
+            model.set_line_tra,
+            model.set_year,
+            model.set_time_unit,
+            rule=negative_bound_per_tra_line,
+            doc="Transmission: transported amount at one pipeline <= Pipeline capacity; Constraint 15.1; Direction 2.",
+        ),
+    )
+    registry.add(
+        "con_negative_capacity_bound_high",
+        py.Constraint(
+            model.set_line_high,
+            model.set_year,
+            model.set_time_unit,
+            rule=negative_bound_per_high_line,
+            doc="High-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 15.2; Direction 2.",
+        ),
+    )
+    registry.add(
+        "con_negative_capacity_bound_mid",
+        py.Constraint(
+            model.set_line_mid,
+            model.set_year,
+            model.set_time_unit,
+            rule=negative_bound_per_mid_line,
+            doc="Mid-Pressure: transported amount at one pipeline <= Pipeline capacity; Constraint 15.3; Direction 2.",
+        ),
+    )
+
+    registry.add(
+        "c_gas_balance_tra",
+        py.Constraint(
+            model.set_compressor,
+            model.set_year,
+            model.set_time_unit,
+            rule=gas_balance_constraint_transmission,
+            doc="Transmission: Gas balance at one node; Constraint 16.1.",
+        ),
+    )
+    registry.add(
+        "c_gas_balance_hp",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=gas_balance_con_high_pressure,
+            doc="High-Pressure: Gas balance at one node; Constraint 16.2.",
+        ),
+    )
+    registry.add(
+        "c_gas_balance_mp",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=gas_balance_con_mid_pressure,
+            doc="Mid-Pressure: Gas balance at one node; Constraint 16.3.",
+        ),
+    )
+
+    registry.add(
+        "c_soc_upper_bound",
+        py.Constraint(
+            model.set_storage,
+            model.set_year,
+            model.set_time_unit,
+            rule=state_of_charge_upper_bound,
+            doc="High-Pressure: Max gas storage capacity at one node; Constraint 19b.",
+        ),
+    )
+    registry.add(
+        "c_soc_in_and_out",
+        py.Constraint(
+            model.set_storage,
+            model.set_year,
+            model.set_time_unit,
+            rule=gas_balance_con_storage,
+            doc="High-Pressure: State of charge for gas storage at one node; Constraint 19a.",
+        ),
+    )
+
+    registry.add(
+        "c_rev_high",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=revenues_high_pressure_level,
+            doc="High-Pressure: Revenues = (Supplied) Demand x Factor; Constraint 20.1.",
+        ),
+    )
+    registry.add(
+        "c_rev_mid",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=revenues_mid_pressure_level,
+            doc="Mid-Pressure: Revenues = (Supplied) Demand x Factor; Constraint 20.2.",
+        ),
+    )
+    registry.add(
+        "c_rev_year",
+        py.Constraint(
+            model.set_year,
+            rule=revenues_per_year,
+            doc="All: Revenues = Sum(Revenues) for all pressure levels; Constraint 21.",
+        ),
+    )
+    registry.add(
+        "c_equal_tra_demand",
+        py.Constraint(
+            model.set_compressor,
+            model.set_year,
+            model.set_time_unit,
+            rule=meet_tra_gas_demand,
+            doc="Transmission: Gas demand must be satisfied (since no economic incentive is considered in the Obj. function).",
+        ),
+    )
+    registry.add(
+        "c_limit_high_demand",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=demand_upper_bound_high,
+            doc="Upper limit of the high-pressure gas demand covered is set by the corresponding input parameter.",
+        ),
     )
     
-    model.c_decline_gas_supply = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        model.set_time_unit,
-        rule=ensure_declining_gas_supply,
-        doc="Declining gas supply at the high-pressure network level."
+    registry.add(
+        "c_decline_gas_supply",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_declining_gas_supply,
+            doc="Declining gas supply at the high-pressure network level.",
+        ),
     )
     
-    model.c_decline_gas_mid_pressure = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=ensure_declining_gas_supply_mid,
-        doc='Declining gas demand that is supplied at the mid-pressure network level'
+    registry.add(
+        "c_decline_gas_mid_pressure",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_declining_gas_supply_mid,
+            doc='Declining gas demand that is supplied at the mid-pressure network level',
+        ),
+    )
+
+    registry.add(
+        "c_limit_mid_demand",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=demand_upper_bound_mid,
+            doc="Upper limit of the mid-pressure gas demand covered is set by the corresponding input parameter.",
+        ),
+    )
+    registry.add(
+        "c_ensure_high_demand",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_high_gas_demand,
+            doc="ES: The high-pressure gas demand must be covered.",
+        ),
+    )
+    registry.add(
+        "c_ensure_mid_demand",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_mid_gas_demand,
+            doc="ES: The mid-pressure gas demand must be covered.",
+        ),
+    )
+    registry.add(
+        "c_decline_gas_supply_monthly",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_declining_gas_supply_monthly,
+            doc="ES: Declining gas supply at the high-pressure network level (every month).",
+        ),
+    )
+    registry.add(
+        "c_decline_gas_mid_pressure_monthly",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_declining_gas_supply_mid_monthly,
+            doc="ES: Declining gas supply at the mid-pressure network level (every month).",
+        ),
+    )
+    registry.add(
+        "c_opt_bound_high",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=lower_bound_high_gas_covered,
+            doc="CO_MD2: The covered high-pressure demand is pinned at its optimal value.",
+        ),
+    )
+    registry.add(
+        "c_opt_bound_mid",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=lower_bound_mid_gas_covered,
+            doc="CO_MD2: The covered mid-pressure demand is pinned at its optimal value.",
+        ),
+    )
+    registry.add(
+        "c_limit_tra_source",
+        py.Constraint(
+            model.set_compressor,
+            model.set_year,
+            rule=max_annual_source_per_node_tra,
+            doc="Transmission: Upper limit of annual gas injected at one node.",
+        ),
+    )
+    registry.add(
+        "c_limit_high_source",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            rule=max_annual_source_per_node_high,
+            doc="High-Pressure: Upper limit of annual gas injected at one node.",
+        ),
+    )
+    registry.add(
+        "c_limit_mid_source",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            rule=max_annual_source_per_node_mid,
+            doc="Mid-Pressure: Upper limit of annual gas injected at one node.",
+        ),
     )
-
-    model.c_limit_mid_demand = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        model.set_time_unit,
-        rule=demand_upper_bound_mid,
-        doc="Upper limit of the mid-pressure gas demand covered is set by the corresponding input parameter.",
-    )
-    model.c_limit_tra_source = py.Constraint(
-        model.set_compressor,
-        model.set_year,
-        rule=max_annual_source_per_node_tra,
-        doc="Transmission: Upper limit of annual gas injected at one node.",
-    )
-    model.c_limit_high_source = py.Constraint(
-        model.set_node_hp,
-        model.set_year,
-        rule=max_annual_source_per_node_high,
-        doc="High-Pressure: Upper limit of annual gas injected at one node.",
-    )
-    model.c_limit_mid_source = py.Constraint(
-        model.set_node_mp,
-        model.set_year,
-        rule=max_annual_source_per_node_mid,
-        doc="Mid-Pressure: Upper limit of annual gas injected at one node.",
-    )
-    
-    model.c_gas_purchase = py.Constraint(
-        model.set_year,
-        rule=total_spendings_per_year,
-        doc="Costs for delivering gas from the transmission into the high-pressure network level.")
-    
-    model.c_ensure_supply_profile_high = py.Constraint(
-        model.set_node_hp,
-        model.set_year, 
-        model.set_time_unit,
-        rule=ensure_supply_profile_high)
     
-    model.c_ensure_supply_profile_mid = py.Constraint(
-        model.set_node_mp,
-        model.set_year, 
-        model.set_time_unit,
-        rule=ensure_supply_profile_mid)
+    registry.add(
+        "c_gas_purchase",
+        py.Constraint(
+            model.set_year,
+            rule=total_spendings_per_year,
+            doc="Costs for delivering gas from the transmission into the high-pressure network level.",
+        ),
+    )
     
+    registry.add(
+        "c_ensure_supply_profile_high",
+        py.Constraint(
+            model.set_node_hp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_supply_profile_high,
+        ),
+    )
     
+    registry.add(
+        "c_ensure_supply_profile_mid",
+        py.Constraint(
+            model.set_node_mp,
+            model.set_year,
+            model.set_time_unit,
+            rule=ensure_supply_profile_mid,
+        ),
+    )
+
+    """LUMPINESS: DIAMETER CHOICE OF THE HIGH- AND MID-PRESSURE PIPELINES"""
+    if registry.builds("c_lumpiness_high") and not hasattr(model, "v_diameter_high"):
+        raise ValueError(
+            "The variant LUMPINESS needs the diameter variables of its model run."
+        )
+
     def ensure_lumpiness_of_high_pipelines(model, line):
         _inv_year = model.par_year_of_inv_hp[line]
-        righ_side = model.v_diameter_high[line, '0.1'] * 0.82 + model.v_diameter_high[line, '0.2'] * 4.62 + model.v_diameter_high[line, '0.3'] * 12.72 + model.v_diameter_high[line, '0.4'] * 26.11 + model.v_diameter_high[line, '0.5'] * 45.62 + model.v_diameter_high[line, '0.6'] * 71.96 + model.v_diameter_high[line, '0.7'] * 105.8 +  model.v_diameter_high[line, '0.8'] * 147.73 + model.v_diameter_high[line, '0.9'] * 198.31 + model.v_diameter_high[line, '1.0'] * 258.07 + model.v_diameter_high[line, '1.1'] * 327.51 + model.v_diameter_high[line, '1.15'] * 366 + model.v_diameter_high[line, '1.2'] * 407.09 + model.v_diameter_high[line, '1.3'] * 497.27  
+        righ_side = sum(
+            model.v_diameter_high[line, d] * model.par_diameter_capacity[d]
+            for d in model.set_lumpiness
+        )
         return model.var_gamma_high_line[_inv_year, line] == righ_side
     
-    model.c_lumpiness_high = py.Constraint(
-        model.set_line_high,
-        rule=ensure_lumpiness_of_high_pipelines
-        )
+    registry.add(
+        "c_lumpiness_high",
+        py.Constraint(model.set_line_high, rule=ensure_lumpiness_of_high_pipelines),
+    )
     
     def ensure_single_lumpiness(model, line):
-        return model.v_diameter_high[line, '0.1'] + model.v_diameter_high[line, '0.2'] + model.v_diameter_high[line, '0.3'] + model.v_diameter_high[line, '0.4'] + model.v_diameter_high[line, '0.5'] + model.v_diameter_high[line, '0.6'] + model.v_diameter_high[line, '0.7'] +  model.v_diameter_high[line, '0.8'] + model.v_diameter_high[line, '0.9'] + model.v_diameter_high[line, '1.0'] + model.v_diameter_high[line, '1.1'] + model.v_diameter_high[line, '1.15'] + model.v_diameter_high[line, '1.2'] + model.v_diameter_high[line, '1.3'] <= 1
+        return sum(model.v_diameter_high[line, d] for d in model.set_lumpiness) <= 1
         
-    model.c_single_lumpiness_high = py.Constraint(
-        model.set_line_high,
-        rule=ensure_single_lumpiness)
+    registry.add(
+        "c_single_lumpiness_high",
+        py.Constraint(model.set_line_high, rule=ensure_single_lumpiness),
+    )
     
     def ensure_lumpiness_of_mid_pipelines(model, line):
         _inv_year = model.par_year_of_inv_mp[line]
-        righ_side = model.v_diameter_mid[line, '0.1'] * 0.82 + model.v_diameter_mid[line, '0.2'] * 4.62 + model.v_diameter_mid[line, '0.3'] * 12.72 + model.v_diameter_mid[line, '0.4'] * 26.11 + model.v_diameter_mid[line, '0.5'] * 45.62 + model.v_diameter_mid[line, '0.6'] * 71.96 + model.v_diameter_mid[line, '0.7'] * 105.8 + model.v_diameter_mid[line, '0.8'] * 147.73 + model.v_diameter_mid[line, '0.9'] * 198.31 + model.v_diameter_mid[line, '1.0'] * 258.07 + model.v_diameter_mid[line, '1.1'] * 327.51 + model.v_diameter_mid[line, '1.15'] * 366 + model.v_diameter_mid[line, '1.2'] * 407.09 + model.v_diameter_mid[line, '1.3'] * 497.27  
+        righ_side = sum(
+            model.v_diameter_mid[line, d] * model.par_diameter_capacity[d]
+            for d in model.set_lumpiness
+        )
         return model.var_gamma_mid_line[_inv_year, line] == righ_side
     
-    model.c_lumpiness_mid = py.Constraint(
-        model.set_line_mid,
-        rule=ensure_lumpiness_of_mid_pipelines)
+    registry.add(
+        "c_lumpiness_mid",
+        py.Constraint(model.set_line_mid, rule=ensure_lumpiness_of_mid_pipelines),
+    )
     
     def ensure_single_lumpiness_mid(model, line):
-        return model.v_diameter_mid[line, '0.1'] + model.v_diameter_mid[line, '0.2'] + model.v_diameter_mid[line, '0.3'] + model.v_diameter_mid[line, '0.4'] + model.v_diameter_mid[line, '0.5'] + model.v_diameter_mid[line, '0.6'] + model.v_diameter_mid[line, '0.7'] + model.v_diameter_mid[line, '0.8'] + model.v_diameter_mid[line, '0.9'] + model.v_diameter_mid[line, '1.0'] + model.v_diameter_mid[line, '1.1'] + model.v_diameter_mid[line, '1.15'] + model.v_diameter_mid[line, '1.2'] + model.v_diameter_mid[line, '1.3'] <= 1
-        
-    model.c_single_lumpiness_mid = py.Constraint(
-        model.set_line_mid,
-        rule=ensure_single_lumpiness_mid)
+        return sum(model.v_diameter_mid[line, d] for d in model.set_lumpiness) <= 1
         
-    return
+    registry.add(
+        "c_single_lumpiness_mid",
+        py.Constraint(model.set_line_mid, rule=ensure_single_lumpiness_mid),
+    )
+
+    """DIAMETER FORMULATIONS sos1 AND log (SEE utils.DIAMETERS)"""
+    _formulation = getattr(model, "diameter_formulation", None)
+    if _formulation == "sos1":
+        registry.add(
+            "c_diameter_sos_high",
+            py.SOSConstraint(model.set_line_high, rule=diameter_sos_high, sos=1),
+        )
+        registry.add(
+            "c_diameter_sos_mid",
+            py.SOSConstraint(model.set_line_mid, rule=diameter_sos_mid, sos=1),
+        )
+        registry.add(
+            "c_diameter_choice_high",
+            py.Constraint(model.set_line_high, rule=diameter_choice_high),
+        )
+        registry.add(
+            "c_diameter_choice_mid",
+            py.Constraint(model.set_line_mid, rule=diameter_choice_mid),
+        )
+
+    if _formulation == "log":
+        registry.add(
+            "c_diameter_bit_high",
+            py.Constraint(
+                model.set_line_high,
+                model.set_diameter_bit,
+                rule=diameter_bit_high,
+            ),
+        )
+        registry.add(
+            "c_diameter_bit_mid",
+            py.Constraint(
+                model.set_line_mid,
+                model.set_diameter_bit,
+                rule=diameter_bit_mid,
+            ),
+        )
+
+    registry.validate()
+    return registry.active
+
+
+def pin_demand(model=None):
+    """
+    Fix and dual: turns the solved model into the variant CO_MD2 of model run 2 in
+    place. The covered demands are pinned at their optimal values p_opt_high_gas
+    and p_opt_mid_gas (see utils.add_opt_demand) by the equality constraints
+    c_opt_bound_high and c_opt_bound_mid, whose duals are the shadow prices (a
+    fixed variable has none), and the families PINNED are deactivated.
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        The default is None.
+
+    Returns
+    -------
+    List
+        Includes the names of the deactivated constraint families.
+
+    """
+    model.c_opt_bound_high = py.Constraint(
+        model.set_node_hp,
+        model.set_year,
+        model.set_time_unit,
+        rule=lower_bound_high_gas_covered)
+
+    model.c_opt_bound_mid = py.Constraint(
+        model.set_node_mp,
+        model.set_year,
+        model.set_time_unit,
+        rule=lower_bound_mid_gas_covered)
+
+    for _name in PINNED:
+        getattr(model, _name).deactivate()
+    return list(PINNED)
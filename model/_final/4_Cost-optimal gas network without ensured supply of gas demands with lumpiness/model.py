@@ -1,35 +1,50 @@
+import sys
 import pandas as pd
 import utils
 import constraints
 import report
 from pathlib import Path
-from pyomo.environ import Suffix
-import numpy as np
+from pyomo.environ import Suffix, value
 
 
-"""READ IN SHAPEFILES"""
-_trans = utils.read_shapefile(path="transmission", name="transmission.shp")
-_high = utils.read_shapefile(path="high", name="high.shp")
-_mid = utils.read_shapefile(path="mid", name="mid.shp")
+"""BUILD PROFILE (ENABLED BY GND_PROFILE=1, GND_PROFILE=memory OR --profile)"""
+profiler = utils.Profiler()
+
+
+"""PARAMETER OVERRIDES OF A SWEEP RUN (GND_OVERRIDES, SEE sweep.py)"""
+_overrides = utils.get_overrides()
+
+
+"""READ IN SHAPEFILES (NETWORK TOPOLOGY ONLY, NO GEOMETRIES)"""
+with profiler.phase("read shapefiles"):
+    _trans = utils.read_shapefile(
+        path="transmission", name="transmission.shp", geometry=False
+    )
+    _high = utils.read_shapefile(path="high", name="high.shp", geometry=False)
+    _mid = utils.read_shapefile(path="mid", name="mid.shp", geometry=False)
 
 
 """READ IN DATA"""
 _path = Path("data")
 
-_demand = pd.read_excel(_path / "INPUT_Demand.xlsx")
-_pipeline_eco = pd.read_excel(_path / "INPUT_Pipelines_Economic.xlsx")
-_pipeline_tec = pd.read_excel(_path / "INPUT_Pipelines_Technical.xlsx")
-_refurbishment = pd.read_excel(_path / "INPUT_Refurbishment.xlsx")
-_source = pd.read_excel(_path / "INPUT_Source.xlsx")
-_storage = pd.read_excel(_path / "INPUT_Storage_Technical.xlsx")
-_time_dev = pd.read_excel(_path / "INPUT_Time_Resolution.xlsx")
-_prices = pd.read_excel(_path / "INPUT_Prices.xlsx")
+with profiler.phase("read input data"):
+    _demand = utils.read_input(path=_path / "INPUT_Demand.xlsx")
+    _pipeline_eco = utils.read_input(path=_path / "INPUT_Pipelines_Economic.xlsx")
+    _pipeline_tec = utils.read_input(path=_path / "INPUT_Pipelines_Technical.xlsx")
+    _refurbishment = utils.read_input(path=_path / "INPUT_Refurbishment.xlsx")
+    _source = utils.read_input(path=_path / "INPUT_Source.xlsx")
+    _storage = utils.read_input(path=_path / "INPUT_Storage_Technical.xlsx")
+    _time_dev = utils.read_input(path=_path / "INPUT_Time_Resolution.xlsx")
+    _prices = utils.read_input(path=_path / "INPUT_Prices.xlsx")
+    _diameters = utils.read_input(path=_path / "INPUT_Diameters.xlsx")
 
 
 """NODES OF THE NETWORK"""
-_nodes = utils.get_nodes_from_lines(
-    transmission=_trans, high_pressure=_high, mid_pressure=_mid
-)
+with profiler.phase("network topology"):
+    _topology = utils.get_network_topology(
+        transmission=_trans, high_pressure=_high, mid_pressure=_mid
+    )
+    _nodes = utils.get_nodes_from_lines(topology=_topology)
 
 
 """PYOMO.CONCRETEMODEL()"""
@@ -39,7 +54,7 @@ model.transmission = _trans
 model.high = _high
 model.mid = _mid
 
-utils.add_import_and_export_lines_per_node(model=model)
+utils.add_network_topology(model=model, topology=_topology)
 
 model.demand = _demand
 model.pipeline_economic = _pipeline_eco
@@ -49,28 +64,121 @@ model.source = _source
 model.storage = _storage
 model.temporal_demand = _time_dev
 model.prices = _prices
+model.diameters = _diameters
+model.diameter_formulation = utils.get_diameter_formulation(
+    _overrides.pop("diameter", None)
+)
 
-utils.add_nodal_sets(model=model, nodes=_nodes)
-
-utils.add_line_sets(model=model, data=[_trans, _high, _mid])
-utils.add_time_horizon(model=model, year=2050, temporal=12)
-utils.add_parameter_to_model(model=model)
-utils.add_decision_variables(model=model)
-
-constraints.add(model=model)
-utils.add_objective_function(model=model)
-
-"""PRINT AND DISPLAY THE MODEL"""
-utils.print_model(model)
-
-
-"""START TO SOLVE THE MODEL"""
-Solver = utils.set_solver_for_the_model(model)
-solution = Solver.solve(model, tee=True)
-
-solution.write()
+with profiler.phase("sets"):
+    utils.add_nodal_sets(model=model, nodes=_nodes)
+    utils.add_line_sets(model=model, data=[_trans, _high, _mid])
+    utils.add_time_horizon(
+        model=model, year=_overrides.pop("horizon", utils.HORIZON), temporal=12
+    )
+with profiler.components("parameters"):
+    utils.add_parameter_to_model(
+        model=model,
+        decline=utils.get_demand_decline(
+            period=_overrides.pop("decline_period", None),
+            residual=_overrides.pop("residual_share", None),
+        ),
+    )
+    utils.set_parameters(model=model, **_overrides)
+with profiler.components("variables"):
+    utils.add_decision_variables(model=model)
+
+with profiler.components("constraints"):
+    constraints.add(model=model, variant="LUMPINESS")
+with profiler.phase("objective"):
+    utils.add_objective_function(model=model)
+
+"""PRINT AND DISPLAY THE MODEL (ENABLED BY GND_DUMP=1 OR --dump)"""
+with profiler.phase("print model"):
+    utils.print_model(model)
+
+
+"""RUN STAGES: STOP AFTER WRITING THE MODEL (BUILD) OR LOAD THE SOLUTION (REPORT)"""
+_stage = utils.get_stage()
+_heuristic = utils.get_heuristic()
+if _heuristic and _stage is not None:
+    raise ValueError("The heuristic solves in this process, not in stages.")
+if _heuristic and utils.get_start_path() is not None:
+    raise ValueError("The heuristic starts from its rounding, not from a warm start.")
+if _stage == "build":
+    with profiler.phase("write mps"):
+        utils.write_mps(model=model)
+    profiler.write(path=utils.STAGE_PATH)
+    sys.exit()
+
+"""START TO SOLVE THE MODEL (REPORT STAGE: LOAD THE SOLUTION OF solve.py)"""
+if _stage == "report":
+    with profiler.phase("load solution"):
+        solution = utils.read_sol(model=model)
+    _basis = None
+    _mip = None
+else:
+    Solver = utils.set_solver_for_the_model(model)
+    _warmstart = False
+    if utils.get_start_path() is not None:
+        with profiler.phase("warm start"):
+            _warmstart = utils.set_start(
+                model=model,
+                Solver=Solver,
+                start=report.read_start(path=utils.get_start_path(), model=model),
+            )
+    _relaxation = None
+    if _heuristic:
+        with profiler.phase("lp relaxation"):
+            _relaxed = utils.relax_integers(model=model)
+            Solver.solve(model, tee=True)
+            _relaxation = value(model.objective)
+            _fixed, _lines = utils.round_diameters(model=model, relaxed=_relaxed)
+            print("Heuristic: {} of {} lines fixed.".format(_fixed, _lines))
+            utils.clear_basis(Solver)
+            _warmstart = Solver.warm_start_capable()
+    with profiler.phase("solve"):
+        solution = Solver.solve(model, tee=True, warmstart=_warmstart)
+    solution.write()
+    _mip = utils.get_mip_statistics(
+        Solver=Solver, solution=solution, bound=_relaxation
+    )
+    if _heuristic:
+        _mip.update(heuristic=True, fixed_lines=_fixed, lines=_lines)
+
+    """FIXED MIP: RE-SOLVE THE LP OF THE INCUMBENT DIAMETERS FOR THE DUALS"""
+    if utils.get_fixed_mip():
+        with profiler.phase("fixed mip"):
+            _fixed = utils.fix_integers(model=model)
+            if _fixed is None:
+                print("Fixed MIP: no incumbent, no duals.")
+            else:
+                print("Fixed MIP: {} integer variables fixed.".format(_fixed))
+                model.dual = Suffix(direction=Suffix.IMPORT)
+                utils.clear_basis(Solver)
+                solution = Solver.solve(model, tee=True)
+        solution.write()
+    _basis = utils.get_basis(Solver)
 model.objective.display()
 
 """REPORT RESULTS IN OUTPUT FILES"""
-report.write_results_to_folder(model, "CO_LUMPINESS")
+with profiler.phase("report"):
+    _solution_path = report.write_results_to_folder(model, "CO_LUMPINESS", basis=_basis)
+profiler.write(path=_solution_path)
+
+"""STATISTICS OF THE MIP SOLVE (FORMULATION, GAP, NODES), SEE benchmark.py"""
+# heuristic: the gap to the LP relaxation and the number of fixed lines
+if _mip is not None:
+    _mip = dict(formulation=model.diameter_formulation, **_mip)
+    report.write_table(pd.DataFrame([_mip]), path=_solution_path, name="Mip")
+
+"""SHADOW PRICES OF THE DEMAND LIMITS (NODE x YEAR, FIRST MONTH), FIXED MIP ONLY"""
+if hasattr(model, "dual"):
+    report.write_shadow_prices(
+        model=model,
+        path=_solution_path,
+        constraints={
+            "HP_SHD_PRICES": model.c_limit_high_demand,
+            "MP_SHD_PRICES": model.c_limit_mid_demand,
+        },
+    )
     
\ No newline at end of file
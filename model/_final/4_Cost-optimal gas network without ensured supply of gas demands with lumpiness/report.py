@@ -1,255 +1,1029 @@
 from datetime import datetime
+from pathlib import Path
+import gzip
+import hashlib
+import itertools
+import json
 import os
+import sqlite3
+import sys
+import uuid
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pyomo.environ as py
 
 
-def write_IAMC(output_df, model, scenario, region, variable, unit, time, values):
-    if isinstance(values, list):
-        _df = pd.DataFrame(
-            {
-                "model": model,
-                "scenario": scenario,
-                "region": region,
-                "variable": variable,
-                "unit": unit,
-                "year": time,
-                "value": values,
-            }
+"""OUTPUT FORMATS OF THE RESULTS (PARQUET BY DEFAULT, SELECTED BY GND_OUTPUT)"""
+OUTPUT = "GND_OUTPUT"
+FORMATS = ["parquet", "csv.gz", "xlsx"]
+DEFAULT_FORMATS = ["parquet"]
+
+"""MAXIMUM NUMBER OF ROWS OF AN EXCEL SHEET (INCLUDING THE HEADER)"""
+EXCEL_ROWS = 1048576
+
+"""
+FULL MONTHLY DISPATCH: (VARIABLE, IAMC VARIABLE, UNIT, PEAK)
+- variables are indexed by (node/line, year, month)
+- PEAK: the variable is a peak flow that is scaled by par_total_peak_factor of the
+  month (as in the gas balance), i.e. the energy of the month is reported
+"""
+DISPATCH = [
+    ("var_source_tra", "Gas|Source|Transmission", "MWh", False),
+    ("var_source_high", "Gas|Source|High-Pressure", "MWh", False),
+    ("var_source_mid", "Gas|Source|Mid-Pressure", "MWh", False),
+    ("var_demand_tra", "Gas|Demand|Supplied|Transmission", "MWh", False),
+    ("var_demand_high", "Gas|Demand|Supplied|High-Pressure", "MWh", False),
+    ("var_demand_mid", "Gas|Demand|Supplied|Mid-Pressure", "MWh", False),
+    ("var_import_tra", "Gas|Import|Transmission", "MWh", True),
+    ("var_import_high", "Gas|Import|High-Pressure", "MWh", True),
+    ("var_import_mid", "Gas|Import|Mid-Pressure", "MWh", True),
+    ("var_export_tra", "Gas|Export|Transmission", "MWh", True),
+    ("var_export_high", "Gas|Export|High-Pressure", "MWh", True),
+    ("var_export_mid", "Gas|Export|Mid-Pressure", "MWh", True),
+    ("var_del_tra_high", "Gas|Deliver|Transmission|High-Pressure", "MWh", False),
+    ("var_del_high_mid", "Gas|Deliver|High-Pressure|Mid-Pressure", "MWh", False),
+    ("var_storage_in_out", "Gas|Storage|Input-Output|High-Pressure", "MWh", False),
+    ("var_storage_soc", "Gas|Storage|State of Charge|High-Pressure", "MWh", False),
+    ("var_transported_tra", "Transmission|Pipeline flow", "MW", False),
+    ("var_transported_high", "High-Pressure|Pipeline flow", "MW", False),
+    ("var_transported_mid", "Mid-Pressure|Pipeline flow", "MW", False),
+]
+
+"""ROWS OF THE FULL DISPATCH THAT ARE HELD IN MEMORY AT ONCE"""
+DISPATCH_CHUNK = 100000
+
+"""
+CONSTRAINT FAMILIES WHOSE DUALS ARE WRITTEN TO THE SOLUTION FOLDER
+- families that do not exist or are deactivated in a model run are skipped
+"""
+DUALS = [
+    "c_gas_balance_tra",
+    "c_gas_balance_hp",
+    "c_gas_balance_mp",
+    "con_positive_capacity_bound_tra",
+    "con_positive_capacity_bound_high",
+    "con_positive_capacity_bound_mid",
+    "con_negative_capacity_bound_tra",
+    "con_negative_capacity_bound_high",
+    "con_negative_capacity_bound_mid",
+    "c_limit_high_demand",
+    "c_limit_mid_demand",
+    "c_ensure_high_demand",
+    "c_ensure_mid_demand",
+    "c_opt_bound_high",
+    "c_opt_bound_mid",
+]
+
+"""
+RESULTS STORE: ONE SQLITE DATABASE THAT ALL RUNS ARE APPENDED TO
+- GND_STORE sets another database (e.g. shared by all model variants) or disables
+  the store ("none")
+- the tables of STORE_TABLES are indexed on STORE_INDEX
+"""
+STORE = "GND_STORE"
+STORE_FILE = os.path.join("solution", "results.sqlite")
+STORE_TABLES = {
+    "capacities": "PipCapacity",
+    "demands": "Demands",
+    "dispatch": "FullDispatch",
+    "duals": "Duals_",
+}
+STORE_INDEX = ["scenario", "run_id", "variable", "region", "year", "month"]
+STORE_COLUMNS = ["model", "unit", "value"]
+
+"""NAMES OF THE INDEX SETS IN LABELLED RESULTS (DEFAULT: SET NAME WITHOUT set_)"""
+INDEX_NAMES = {
+    "set_compressor": "node",
+    "set_node_hp": "node",
+    "set_node_mp": "node",
+    "set_storage": "node",
+    "set_delivery_tra_hp": "node",
+    "set_delivery_hp_mp": "node",
+    "set_line_tra": "line",
+    "set_line_high": "line",
+    "set_line_mid": "line",
+    "set_time_unit": "month",
+}
+
+"""
+WARM START ARTIFACT: VALUE (AND BASIS STATUS) OF EVERY VARIABLE AND CONSTRAINT,
+MATCHED BY NAME AND INDEX IN ANOTHER RUN OF ANY VARIANT (utils.set_start), the
+basis only in a run of the same model (column model, see get_model_signature)
+"""
+START = "Start"
+
+"""
+RUN IDS (FOLDER solution/<run id>): <scenario>-<time>-<random suffix>, so that
+concurrent runs never share a folder. GND_RUN_ID sets the run ID (sweep.py).
+"""
+RUN_ID = "GND_RUN_ID"
+RUN_TIME = "%Y%m%dT%H%M%S"
+
+
+def get_iamc_table(model, scenario, region, variable, unit, year, values, month=None):
+    """
+    Builds a table in IAMC format with one DataFrame constructor. Each argument is
+    either a scalar (same for all rows) or an array with one entry per row.
+    """
+    _data = {
+        "model": model,
+        "scenario": scenario,
+        "region": region,
+        "variable": variable,
+        "unit": unit,
+        "year": year,
+    }
+    if month is not None:
+        _data["month"] = month
+    _data["value"] = values
+    return pd.DataFrame(_data, index=range(len(values)))
+
+
+def get_values(component=None, index=None):
+    """
+    Parameters
+    ----------
+    component : pyomo.Var or pyomo.Param, required
+        The default is None.
+    index : List, required
+        Includes the sets the component is indexed by. The default is None.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Includes the values of the component in one pass, shaped by the sets.
+
+    """
+    _values = component.extract_values()
+    _keys = itertools.product(*index) if len(index) > 1 else index[0]
+    values = np.array(
+        [_values[_key] if _key in _values else component[_key] for _key in _keys],
+        dtype=float,
+    )
+    return values.reshape([len(_set) for _set in index])
+
+
+def get_output_formats(formats=None):
+    """
+    Parameters
+    ----------
+    formats : str or List, optional
+        Output formats, e.g. "parquet,xlsx" or ["csv.gz"]. If None, the
+        environment variable OUTPUT is used, otherwise DEFAULT_FORMATS.
+        The default is None.
+
+    Returns
+    -------
+    formats : List
+        Includes the selected output formats (a subset of FORMATS).
+
+    """
+    if formats is None:
+        formats = os.environ.get(OUTPUT) or DEFAULT_FORMATS
+    if isinstance(formats, str):
+        formats = [_format.strip() for _format in formats.split(",")]
+    formats = [_format.lower() for _format in formats if _format]
+    for _format in formats:
+        if _format not in FORMATS:
+            raise ValueError(
+                "Unknown output format '{}', use one of {}".format(
+                    _format, ", ".join(FORMATS)
+                )
+            )
+    return formats
+
+
+def write_table(df=None, path=None, name=None, formats=None, index=False):
+    """
+    Parameters
+    ----------
+    df : pandas.DataFrame, required
+        The default is None.
+    path : str, required
+        Folder of the results. The default is None.
+    name : str, required
+        Name of the table without suffix, e.g. "Dispatch". The default is None.
+    formats : str or List, optional
+        See get_output_formats. The default is None.
+    index : bool, optional
+        Whether the (labelled) index is written as well. The default is False.
+
+    Returns
+    -------
+    files : List
+        Includes the written files.
+
+    """
+    files = []
+    for _format in get_output_formats(formats):
+        _file = os.path.join(path, "{}.{}".format(name, _format))
+        if _format == "parquet":
+            df.to_parquet(_file, index=index)
+        elif _format == "csv.gz":
+            df.to_csv(_file, index=index, compression="gzip")
+        elif _format == "xlsx":
+            if len(df) >= EXCEL_ROWS:
+                print("{}: too many rows for Excel, skipped".format(_file))
+                continue
+            df.to_excel(_file, index=index)
+        files.append(_file)
+    return files
+
+
+def read_table(path=None, name=None):
+    """
+    Parameters
+    ----------
+    path : str, required
+        Folder of the results. The default is None.
+    name : str, required
+        Name of the table without suffix. The default is None.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Read from the first available format (in the order of FORMATS).
+
+    """
+    _path = Path(path)
+    if (_path / (name + ".parquet")).exists():
+        return pd.read_parquet(_path / (name + ".parquet"))
+    if (_path / (name + ".csv.gz")).exists():
+        return pd.read_csv(_path / (name + ".csv.gz"))
+    return pd.read_excel(_path / (name + ".xlsx"))
+
+
+def export_to_excel(path=None, overwrite=False):
+    """
+    Writes the Excel files of a result folder on request (lazily), converted
+    from the Parquet (or compressed CSV) files of the run.
+
+    Parameters
+    ----------
+    path : str, required
+        Folder of the results, e.g. solution/CO_MD1-20230101T1200.
+        The default is None.
+    overwrite : bool, optional
+        Whether existing Excel files are replaced. The default is False.
+
+    Returns
+    -------
+    files : List
+        Includes the written Excel files.
+
+    """
+    _path = Path(path)
+    _names = sorted(
+        {_file.name[: -len(".parquet")] for _file in _path.glob("*.parquet")}
+        | {_file.name[: -len(".csv.gz")] for _file in _path.glob("*.csv.gz")}
+    )
+    files = []
+    for _name in _names:
+        if (_path / (_name + ".xlsx")).exists() and not overwrite:
+            continue
+        df = read_table(path=_path, name=_name)
+        # a labelled index (e.g. nodes) is kept, a plain row number is not
+        _index = not isinstance(df.index, pd.RangeIndex)
+        files += write_table(
+            df=df, path=_path, name=_name, formats=["xlsx"], index=_index
         )
+    return files
+
+
+def write_full_dispatch(
+    model=None, scenario=None, path=None, formats=None, chunk=DISPATCH_CHUNK
+):
+    """
+    Streams the dispatch of every node, line, year and month (see DISPATCH) to
+    FullDispatch.<format>. Each variable is walked in chunks of rows that are
+    appended to the file (a Parquet row group or a part of the gzip stream), so
+    only one chunk is held in memory. Excel is not supported (row limit).
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model. The default is None.
+    scenario : str, required
+        The default is None.
+    path : str, required
+        Folder of the results. The default is None.
+    formats : str or List, optional
+        See get_output_formats; "xlsx" is ignored. The default is None.
+    chunk : int, optional
+        Number of rows per chunk. The default is DISPATCH_CHUNK.
+
+    Returns
+    -------
+    rows : int
+        Number of rows written.
+
+    """
+    _formats = [_f for _f in get_output_formats(formats) if _f != "xlsx"]
+    _formats = _formats or DEFAULT_FORMATS
+    _file = os.path.join(path, "FullDispatch.{}")
+    _schema = pa.schema(
+        [
+            ("model", pa.string()),
+            ("scenario", pa.string()),
+            ("region", pa.string()),
+            ("variable", pa.string()),
+            ("unit", pa.string()),
+            ("year", pa.int64()),
+            ("month", pa.int64()),
+            ("value", pa.float64()),
+        ]
+    )
+    _parquet = None
+    if "parquet" in _formats:
+        _parquet = pq.ParquetWriter(_file.format("parquet"), _schema)
+    _csv = None
+    if "csv.gz" in _formats:
+        _csv = gzip.open(_file.format("csv.gz"), "wt", newline="")
+    _factor = model.par_total_peak_factor.extract_values()
+
+    rows = 0
+    try:
+        for _name, _variable, _unit, _peak in DISPATCH:
+            _items = iter(getattr(model, _name).items())
+            while True:
+                _chunk = list(itertools.islice(_items, chunk))
+                if not _chunk:
+                    break
+                _keys, _vars = zip(*_chunk)
+                _region, _year, _month = zip(*_keys)
+                _values = np.array([_var.value for _var in _vars], dtype=float)
+                if _peak:
+                    _values *= np.array([_factor[_m] for _m in _month])
+                df = get_iamc_table(
+                    model.name,
+                    scenario,
+                    [str(_r) for _r in _region],
+                    _variable,
+                    _unit,
+                    np.array(_year, dtype=np.int64),
+                    _values,
+                    month=np.array(_month, dtype=np.int64),
+                )
+                if _parquet is not None:
+                    _parquet.write_table(
+                        pa.Table.from_pandas(df, schema=_schema, preserve_index=False)
+                    )
+                if _csv is not None:
+                    df.to_csv(_csv, header=rows == 0, index=False)
+                rows += len(df)
+    finally:
+        if _parquet is not None:
+            _parquet.close()
+        if _csv is not None:
+            _csv.close()
+    return rows
+
+
+def get_duals(model=None, constraint=None, names=None, full=False):
+    """
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model with the suffix model.dual. The default is None.
+    constraint : pyomo.Constraint, required
+        Any (indexed) constraint family, e.g. model.c_gas_balance_hp.
+        The default is None.
+    names : List, optional
+        Names of the index levels. The default is None, i.e. the names of the
+        index sets (see INDEX_NAMES), e.g. ["node", "year", "month"].
+    full : bool, optional
+        Whether the index covers all elements of the index sets, i.e. with NaN for
+        skipped constraints (e.g. no demand). The default is False.
+
+    Returns
+    -------
+    duals : pandas.DataFrame
+        Includes the duals of all constraints of the family (column "dual"),
+        indexed by the index sets of the constraint.
+
+    """
+    if not hasattr(model, "dual"):
+        raise ValueError("The model has no suffix model.dual (e.g. a MIP)")
+    _sets = list(constraint.index_set().subsets()) if constraint.is_indexed() else []
+    if names is None:
+        names = [
+            INDEX_NAMES.get(_set.local_name, _set.local_name.replace("set_", ""))
+            for _set in _sets
+        ]
+    _dual = model.dual
+    _keys = list(constraint.keys())
+    _values = np.array(
+        [_dual.get(_constraint, np.nan) for _constraint in constraint.values()],
+        dtype=float,
+    )
+    if len(_sets) > 1:
+        _index = pd.MultiIndex.from_tuples(_keys, names=names)
     else:
-        _df = pd.DataFrame(
-            {
-                "model": model,
-                "scenario": scenario,
-                "region": region,
-                "variable": variable,
-                "unit": unit,
-                "year": time,
-                "value": values,
-            },
-            index=[0],
-        )
-    output_df = output_df.append(_df)
-    return output_df
-
-
-def write_iamc_format_with_month(output_df, model, scenario, region, variable, unit, year, month, values):
-    if isinstance(values, list):
-        _df = pd.DataFrame(
-            {
-                "model": model,
-                "scenario": scenario,
-                "region": region,
-                "variable": variable,
-                "unit": unit,
-                "year": year,
-                "month": month,
-                "value": values,
-            }
+        _index = pd.Index(_keys, name=names[0] if names else None)
+    duals = pd.DataFrame({"dual": _values}, index=_index)
+    if full and _sets:
+        if len(_sets) > 1:
+            _full = pd.MultiIndex.from_tuples(
+                itertools.product(*[list(_set) for _set in _sets]), names=names
+            )
+        else:
+            _full = pd.Index(list(_sets[0]), name=names[0])
+        duals = duals.reindex(_full)
+    return duals
+
+
+def write_duals(model=None, path=None, constraints=None, formats=None, duals=None):
+    """
+    Writes the duals of each constraint family to Duals_<constraint>.<format>.
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model with the suffix model.dual. The default is None.
+    path : str, required
+        Folder of the results. The default is None.
+    constraints : List, optional
+        Names of the constraint families. The default is None, i.e. DUALS.
+    formats : str or List, optional
+        See get_output_formats. The default is None.
+    duals : Dict, optional
+        Includes the duals (Series) per constraint family of the matrix backend
+        (see matrix.load_solution), used instead of model.dual. The default is None.
+
+    Returns
+    -------
+    files : List
+        Includes the written files.
+
+    """
+    files = []
+    for _name in constraints or DUALS:
+        if duals is not None:
+            if _name not in duals:
+                continue
+            df = duals[_name].rename("dual").to_frame()
+        else:
+            _constraint = getattr(model, _name, None)
+            if _constraint is None or not _constraint.active:
+                continue
+            df = get_duals(model=model, constraint=_constraint)
+        files += write_table(
+            df.reset_index(),
+            path=path,
+            name="Duals_{}".format(_name),
+            formats=formats,
         )
+    return files
+
+
+def get_shadow_prices(model=None, constraint=None, duals=None):
+    """
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model with the suffix model.dual. The default is None.
+    constraint : pyomo.Constraint or str, required
+        Demand constraint family (indexed by node, year and month) or its name,
+        e.g. model.c_opt_bound_high. The default is None.
+    duals : Dict, optional
+        Includes the duals (Series) per constraint family of the matrix backend
+        (see matrix.load_solution), used instead of model.dual. The default is None.
+
+    Returns
+    -------
+    prices : pandas.DataFrame
+        Includes the duals of the first month per node (rows) and year (columns),
+        with NaN at nodes without a constraint (no demand).
+
+    """
+    if duals is not None:
+        _duals = duals[getattr(constraint, "local_name", constraint)]
+        _nodes = _duals.index.unique("node")
     else:
-        _df = pd.DataFrame(
-            {
-                "model": model,
-                "scenario": scenario,
-                "region": region,
-                "variable": variable,
-                "unit": unit,
-                "year": year,
-                "month": month,
-                "value": values,
-            },
-            index=[0],
+        if isinstance(constraint, str):
+            constraint = getattr(model, constraint)
+        _nodes = list(constraint.index_set().subsets())[0]
+        _duals = get_duals(model=model, constraint=constraint, full=True)["dual"]
+    prices = _duals.xs(1, level="month").unstack("year")
+    return prices.reindex(index=list(_nodes), columns=list(model.set_year))
+
+
+def write_shadow_prices(
+    model=None, path=None, constraints=None, formats=None, duals=None
+):
+    """
+    Writes the shadow prices of demand constraints per node and year (first month)
+    to one table each, e.g. HP_SHD_PRICES and MP_SHD_PRICES, with NaN at nodes
+    without a constraint (no demand).
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model with the suffix model.dual. The default is None.
+    path : str, required
+        Folder of the results. The default is None.
+    constraints : Dict, required
+        Includes the constraint family (indexed by node, year and month) or its
+        name per table, e.g. {"HP_SHD_PRICES": model.c_opt_bound_high}. The default
+        is None.
+    formats : str or List, optional
+        See get_output_formats. The default is None.
+    duals : Dict, optional
+        See get_shadow_prices. The default is None.
+
+    Returns
+    -------
+    files : List
+        Includes the written files.
+
+    """
+    files = []
+    for _name, _constraint in constraints.items():
+        df = get_shadow_prices(model=model, constraint=_constraint, duals=duals)
+        df.columns = [str(year) for year in df.columns]
+        files += write_table(df, path=path, name=_name, formats=formats, index=True)
+    return files
+
+
+def get_index_key(index=None):
+    """Index of a variable or constraint as JSON list, e.g. '["Bregenz", 2050, 1]'."""
+    return json.dumps(
+        list(index) if isinstance(index, tuple) else [index],
+        # numpy integers (e.g. line ids) as Python integers
+        default=lambda _value: _value.item(),
+    )
+
+
+def get_model_signature(model=None):
+    """
+    Returns
+    -------
+    signature : str
+        Hash of the variable families and of the active constraint families with
+        their number of (equality) rows: equal for two runs of the same variant,
+        e.g. different for CO and ES or for the pinned model of the fix and dual.
+
+    """
+    _parts = [
+        "{} {}".format(_var.local_name, len(_var))
+        for _var in model.component_objects(py.Var, descend_into=True)
+    ]
+    for _constraint in model.component_objects(py.Constraint, active=True):
+        _rows = [_row.equality for _row in _constraint.values() if _row.active]
+        _parts.append("{} {} {}".format(_constraint.local_name, len(_rows), sum(_rows)))
+    return hashlib.sha1("\n".join(sorted(_parts)).encode()).hexdigest()[:16]
+
+
+def write_start(model=None, path=None, formats=None, basis=None):
+    """
+    Writes the warm start artifact START: component, index (see get_index_key),
+    value and basis status of every variable and, if a basis is given, of every
+    constraint of the basis.
+
+    Parameters
+    ----------
+    model : pyomo.ConcreteModel, required
+        Solved model. The default is None.
+    path : str, required
+        Folder of the results. The default is None.
+    formats : str or List, optional
+        See get_output_formats. The default is None.
+    basis : Dict, optional
+        Basis status per (component, index), see utils.get_basis.
+        The default is None.
+
+    Returns
+    -------
+    files : List
+        Includes the written files.
+
+    """
+    basis = basis or {}
+    _rows = []
+    for _var in model.component_data_objects(py.Var, descend_into=True):
+        _key = (_var.parent_component().local_name, _var.index())
+        _rows.append(
+            (_key[0], get_index_key(_key[1]), _var.value, basis.pop(_key, None))
         )
-    output_df = output_df.append(_df)
-    return output_df
-
-
-def get_values_from_model(variable, index=None):
-    value = []
-    # key = dict()
-    if type(index) == list:
-        if len(index) == 2:
-            for i1 in index[0]:
-                for i2 in index[1]:
-                    value.append(np.around(py.value(variable[i1, i2]), 3))
-                    # key[(i1, i2)] = np.around(py.value(variable[i1, i2]), 3)
-        elif len(index) == 3:
-            for i1 in index[0]:
-                for i2 in index[1]:
-                    for i3 in index[2]:
-                        value.append(np.around(py.value(variable[i1, i2, i3]), 3))
-                        # key[(i1, i2, i3)] = np.around(py.value(variable[i1, i2, i3]), 3)
-    return value
-
-
-def write_results_to_folder(model=None, scenario=None):
-    time = datetime.now().strftime("%Y%m%dT%H%M")
-    path = os.path.join("solution", "{}-{}".format(scenario, time))
+    # the remaining entries of the basis are the constraints
+    for (_name, _index), _status in basis.items():
+        _rows.append((_name, get_index_key(_index), None, _status))
+    df = pd.DataFrame(_rows, columns=["component", "index", "value", "basis"])
+    df["model"] = get_model_signature(model)
+    return write_table(df, path=path, name=START, formats=formats)
+
+
+def read_start(path=None, model=None):
+    """
+    Parameters
+    ----------
+    path : str, required
+        Folder of the results of the earlier run. The default is None.
+    model : pyomo.ConcreteModel, optional
+        Model of this run. Unless the artifact comes from the same model (see
+        get_model_signature), the basis statuses are dropped: the basis of another
+        variant turns off the presolve of HiGHS and is slower than a cold start.
+        The default is None.
+
+    Returns
+    -------
+    start : Dict
+        Includes (value, basis status) per (component, index) of the warm start
+        artifact START in the folder <path>.
+
+    """
+    df = read_table(path=path, name=START)
+    df["value"] = df["value"].astype(object).where(df["value"].notna(), None)
+    df["basis"] = df["basis"].astype(object).where(df["basis"].notna(), None)
+    if model is not None and df["basis"].notna().any():
+        _signature = df["model"].iloc[0] if "model" in df else None
+        if _signature != get_model_signature(model):
+            print("Warm start: the earlier run is another model, no basis.")
+            df["basis"] = None
+    start = {}
+    _columns = ["component", "index", "value", "basis"]
+    for _name, _index, _value, _status in df[_columns].itertuples(
+        index=False, name=None
+    ):
+        _index = tuple(json.loads(_index))
+        start[_name, _index[0] if len(_index) == 1 else _index] = (_value, _status)
+    return start
+
+
+def get_run_id(scenario=None):
+    """Unique run ID <scenario>-<time>-<random suffix>, see RUN_TIME."""
+    return "{}-{}-{}".format(
+        scenario, datetime.now().strftime(RUN_TIME), uuid.uuid4().hex[:8]
+    )
+
+
+def get_run_time(run_id=None):
+    """
+    Returns
+    -------
+    created : str or None
+        The time of the run ID in ISO format, also of the older IDs in minutes
+        (<scenario>-%Y%m%dT%H%M), or None if the ID includes no time.
+
+    """
+    for _part in reversed(str(run_id).split("-")):
+        for _format in [RUN_TIME, "%Y%m%dT%H%M"]:
+            try:
+                return datetime.strptime(_part, _format).isoformat()
+            except ValueError:
+                continue
+    return None
+
+
+def get_store(store=None):
+    """
+    Parameters
+    ----------
+    store : str, optional
+        Path of the database. If None, the environment variable STORE is used,
+        otherwise STORE_FILE. The default is None.
+
+    Returns
+    -------
+    connection : sqlite3.Connection or None
+        Connection to the store (tables and indices are created if needed), or
+        None if the store is disabled.
+
+    """
+    if store is None:
+        store = os.environ.get(STORE) or STORE_FILE
+    if str(store).lower() == "none":
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(store)), exist_ok=True)
+    # a timeout and write-ahead logging, since several runs may append at once
+    connection = sqlite3.connect(store, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, scenario TEXT, "
+        "model TEXT, created TEXT, path TEXT, objective REAL)"
+    )
+    for _table in STORE_TABLES:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS {} (scenario TEXT, run_id TEXT, "
+            "variable TEXT, region TEXT, year INTEGER, month INTEGER, model TEXT, "
+            "unit TEXT, value REAL)".format(_table)
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_{0} ON {0} ({1})".format(
+                _table, ", ".join(STORE_INDEX)
+            )
+        )
+    return connection
+
+
+def iter_table(path=None, name=None, chunk=DISPATCH_CHUNK):
+    """Reads a table of a results folder in chunks of rows (see read_table)."""
+    _path = Path(path)
+    if (_path / (name + ".parquet")).exists():
+        for _batch in pq.ParquetFile(_path / (name + ".parquet")).iter_batches(chunk):
+            yield _batch.to_pandas()
+    elif (_path / (name + ".csv.gz")).exists():
+        yield from pd.read_csv(_path / (name + ".csv.gz"), chunksize=chunk)
+    elif (_path / (name + ".xlsx")).exists():
+        yield pd.read_excel(_path / (name + ".xlsx"))
+
+
+def get_store_table(df=None, scenario=None, run_id=None):
+    """
+    Brings a table in IAMC format (or a table of duals) to the columns of the
+    store: STORE_INDEX + STORE_COLUMNS. Years such as "2050-01" (Dispatch) are
+    split into year and month; tables without months get NULL.
+    """
+    df = df.copy()
+    if "dual" in df.columns:
+        # Duals_<constraint>: the first index level (node or line) is the region
+        df = df.rename(columns={df.columns[0]: "region", "dual": "value"})
+    _year = df["year"].astype(str)
+    if "month" not in df.columns:
+        _split = _year.str.split("-", n=1, expand=True)
+        _year = _split[0]
+        df["month"] = pd.to_numeric(_split.get(1, np.nan), errors="coerce")
+    df["year"] = pd.to_numeric(_year, errors="coerce")
+    df["region"] = df["region"].astype(str)
+    df["scenario"] = scenario
+    df["run_id"] = run_id
+    for _column in STORE_COLUMNS:
+        if _column not in df.columns:
+            df[_column] = None
+    df["month"] = df["month"].astype("Int64")
+    df["year"] = df["year"].astype("Int64")
+    return df[STORE_INDEX + STORE_COLUMNS]
+
+
+def store_results(path=None, store=None, chunk=DISPATCH_CHUNK):
+    """
+    Appends a results folder (of this or an earlier run) to the results store.
+    A run that is already in the store is replaced.
+
+    Parameters
+    ----------
+    path : str, required
+        Folder of the results, i.e. solution/<scenario>-<time>. The default is None.
+    store : str, optional
+        See get_store. The default is None.
+    chunk : int, optional
+        Number of rows that are read and inserted at once. The default is
+        DISPATCH_CHUNK.
+
+    Returns
+    -------
+    run_id : str or None
+        Identifier of the run in the store (the name of the folder), or None if
+        the store is disabled.
+
+    """
+    connection = get_store(store)
+    if connection is None:
+        return None
+    _path = Path(path)
+    run_id = _path.name
+    _created = get_run_time(run_id)
+    _values = read_table(path=_path, name="Values")
+    scenario = str(_values["scenario"].iloc[0])
+
+    with connection:
+        for _table in ["runs"] + list(STORE_TABLES):
+            connection.execute(
+                "DELETE FROM {} WHERE run_id = ?".format(_table), (run_id,)
+            )
+        connection.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                scenario,
+                str(_values["model"].iloc[0]),
+                _created,
+                str(_path.resolve()),
+                float(_values["value"].iloc[0]),
+            ),
+        )
+        for _table, _name in STORE_TABLES.items():
+            if _table == "duals":
+                _names = sorted(
+                    {_file.name.split(".", 1)[0] for _file in _path.glob(_name + "*")}
+                )
+            elif _table == "dispatch" and not list(_path.glob(_name + ".*")):
+                # runs without the full dispatch: the dispatch of selected nodes
+                _names = ["Dispatch"]
+            else:
+                _names = [_name]
+            for _name in _names:
+                for df in iter_table(path=_path, name=_name, chunk=chunk):
+                    if _table == "duals":
+                        df = df.assign(
+                            variable=_name[len("Duals_") :], model=_values["model"][0]
+                        )
+                    df = get_store_table(df=df, scenario=scenario, run_id=run_id)
+                    connection.executemany(
+                        "INSERT INTO {} VALUES ({})".format(
+                            _table, ", ".join("?" * len(df.columns))
+                        ),
+                        df.astype(object).where(df.notna(), None).itertuples(
+                            index=False, name=None
+                        ),
+                    )
+    connection.close()
+    return run_id
+
+
+def query_store(sql=None, parameters=(), store=None):
+    """
+    Runs a query on the results store, e.g. the mid-pressure capacity in 2050 of
+    all CO and ES runs:
+
+        SELECT scenario, run_id, SUM(value) FROM capacities
+        WHERE variable = 'Mid-Pressure|Pipeline capacity' AND year = 2050
+        GROUP BY scenario, run_id
+
+    Returns
+    -------
+    df : pandas.DataFrame
+
+    """
+    connection = get_store(store)
+    if connection is None:
+        raise ValueError("The results store is disabled ({}=none)".format(STORE))
+    try:
+        return pd.read_sql_query(sql, connection, params=parameters)
+    finally:
+        connection.close()
+
+
+def write_results_to_folder(
+    model=None,
+    scenario=None,
+    formats=None,
+    full_dispatch=True,
+    store=None,
+    run_id=None,
+    basis=None,
+    duals=None,
+):
+    """
+    Writes Values, Dispatch, PipCapacity and Demands in IAMC format to
+    solution/<run id> in the selected output formats (see get_output_formats)
+    and returns the folder. If run_id is None, the environment variable RUN_ID
+    or a new ID (see get_run_id) is used. If full_dispatch is True, the
+    dispatch of all nodes and lines is streamed to FullDispatch as well. The
+    duals (of the suffix model.dual or, with the matrix backend, of duals, see
+    matrix.load_solution) are written to Duals_<name>,
+    the values of all variables (and the basis, see utils.get_basis) to the warm
+    start artifact START, and the run is appended to the results store (see
+    get_store).
+    """
+    formats = get_output_formats(formats)
+    run_id = run_id or os.environ.get(RUN_ID) or get_run_id(scenario)
+    path = os.path.join("solution", run_id)
 
     if not os.path.exists(path):
         os.makedirs(path)
 
-    df_out = pd.DataFrame()
     _scenario = scenario
     _model = model.name
 
     _value = np.around(py.value(model.objective), 0)
-    output_iamc = write_IAMC(
-        df_out, _model, _scenario, "Vorarlberg", "NPV", "EUR", "2025", _value
+    output_iamc = get_iamc_table(
+        _model, _scenario, "Vorarlberg", "NPV", "EUR", "2025", [_value]
     )
 
-    output_iamc.to_excel(os.path.join(path, "Values.xlsx"), index=False)
+    write_table(output_iamc, path=path, name="Values", formats=formats)
 
-    var = get_values_from_model(
-        variable=model.var_gamma_tra_line, index=[model.set_year, model.set_line_tra]
-    )
-    
-    
-    df_out = pd.DataFrame()
+    """WRITE THE DISPATCH OF SELECTED NODES (LAST YEAR, FIRST MONTH) TO IAMC FORMAT"""
+    _last = model.set_year.last()
+    _rows = []
+    _factor = model.par_total_peak_factor[1]
     regions = ['Nenzing', 'Bregenz', 'Schlins']
     for region in regions:
-        dem_hp = model.var_demand_high[region, 2050, 1]()
-        df_out = write_IAMC(
-            df_out,
-            _model,
-            _scenario,
-            str(region),
-            'Gas|Demand|Supplied|High-Pressure',
-            'MWh',
-            '2050-01',
-            dem_hp)
-        
-        dem_hp_ex = model.par_demand_high[region, 2050, 1]
-        df_out = write_IAMC(
-            df_out,
-            _model,
-            _scenario,
-            str(region),
-            'Gas|Demand|Available|High-Pressure',
-            'MWh',
-            '2050-01',
-            dem_hp_ex)
-        
-        gas_imp = model.var_import_high[region, 2050, 1]() * model.par_total_peak_factor[1]
-        df_out = write_IAMC(
-            df_out,
-            _model,
-            _scenario,
-            str(region),
-            'Gas|Import|High-Pressure',
-            'MWh',
-            '2050-01',
-            gas_imp)
-        
-        gas_exp = model.var_export_high[region, 2050, 1]() * model.par_total_peak_factor[1]
-        df_out = write_IAMC(
-            df_out,
-            _model,
-            _scenario,
-            str(region),
-            'Gas|Export|High-Pressure',
-            'MWh',
-            '2050-01',
-            gas_exp)
-        
+        _index = (region, _last, 1)
+        _rows += [
+            (region, 'Gas|Demand|Supplied|High-Pressure', model.var_demand_high[_index]()),
+            (region, 'Gas|Demand|Available|High-Pressure', model.par_demand_high[_index]),
+            (region, 'Gas|Import|High-Pressure', model.var_import_high[_index]() * _factor),
+            (region, 'Gas|Export|High-Pressure', model.var_export_high[_index]() * _factor),
+        ]
         if region in model.set_delivery_hp_mp:
-            gas_del_to_mid = model.var_del_high_mid[region, 2050, 1]()
-            df_out = write_IAMC(
-                df_out,
-                _model,
-                _scenario,
-                str(region),
-                'Gas|Deliver|High-Pressure|Mid-Pressure',
-                'MWh',
-                '2050-01',
-                gas_del_to_mid)
-        
+            _value = model.var_del_high_mid[_index]()
+            _rows.append((region, 'Gas|Deliver|High-Pressure|Mid-Pressure', _value))
         if region in model.set_delivery_tra_hp:
-            df_out = write_IAMC(df_out,
-                                _model, 
-                                _scenario,
-                                str(region),
-                                'Gas|Deliver|Transmission|High-Pressure',
-                                'MWh',
-                                '2050-01',
-                                model.var_del_tra_high[region, 2050, 1]()
-                                )
-    
+            _value = model.var_del_tra_high[_index]()
+            _rows.append((region, 'Gas|Deliver|Transmission|High-Pressure', _value))
+
     # HÖRBRANZ
-    df_out = write_IAMC(df_out,
-                        _model,
-                        _scenario,
-                        'Hörbranz',
-                        'Gas|Source|Transmission',
-                        'MWh',
-                        '2050-01',
-                        model.var_source_tra['Hörbranz', 2050, 1]()
-                        )
-    
-    df_out = write_IAMC(df_out,
-                        _model, 
-                        _scenario,
-                        'Hörbranz',
-                        'Gas|Export|Transmission',
-                        'MWh',
-                        '2050-01',
-                        model.var_export_tra['Hörbranz', 2050, 1]()
-                        )
-    
+    _index = ('Hörbranz', _last, 1)
+    _rows.append(('Hörbranz', 'Gas|Source|Transmission', model.var_source_tra[_index]()))
+    _rows.append(('Hörbranz', 'Gas|Export|Transmission', model.var_export_tra[_index]()))
+
     # BLUDESCH
-    df_out = write_IAMC(df_out,
-                        _model,
-                        _scenario,
-                        'Bludesch',
-                        'Gas|Import|Mid-Pressure',
-                        'MWh',
-                        '2050-01',
-                        model.var_import_mid['Bludesch', 2050, 1]()
-                        )
-    
-    df_out = write_IAMC(df_out,
-                        _model, 
-                        _scenario,
-                        'Bludesch',
-                        'Gas|Demand|Mid-Pressure',
-                        'MWh',
-                        '2050-01',
-                        model.var_demand_mid['Bludesch', 2050, 1]()
-                        )
+    _index = ('Bludesch', _last, 1)
+    _rows.append(('Bludesch', 'Gas|Import|Mid-Pressure', model.var_import_mid[_index]()))
+    _rows.append(('Bludesch', 'Gas|Demand|Mid-Pressure', model.var_demand_mid[_index]()))
+
+    _region, _variable, _values = (list(_x) for _x in zip(*_rows))
+    df_out = get_iamc_table(
+        _model, _scenario, _region, _variable, 'MWh', '{}-01'.format(_last), _values
+    )
+    write_table(df_out, path=path, name="Dispatch", formats=formats)
+
+    """STREAM THE DISPATCH OF ALL NODES, LINES, YEARS AND MONTHS"""
+    if full_dispatch:
+        write_full_dispatch(model=model, scenario=_scenario, path=path, formats=formats)
+
 
-    df_out.to_excel(os.path.join(path, "Dispatch.xlsx"), index=False)
-            
-    
     """WRITE LINE CAPACITIES TO IAMC FORMAT"""
-    df_out = pd.DataFrame()
-    for tline in model.set_line_tra:
-        for year in model.set_year:
-            df_out = write_IAMC(df_out, _model, _scenario, tline, "Transmission|Pipeline capacity", "MW", year, py.value(model.var_gamma_tra_line[year, tline]))
-    for hline in model.set_line_high:
-        for year in model.set_year:
-            df_out = write_IAMC(df_out, _model, _scenario, hline, "High-Pressure|Pipeline capacity", "MW", year, py.value(model.var_gamma_high_line[year, hline]))
-    for mline in model.set_line_mid:
-        for year in model.set_year:
-            df_out = write_IAMC(df_out, _model, _scenario, mline, "Mid-Pressure|Pipeline capacity", "MW", year, py.value(model.var_gamma_mid_line[year, mline]))
-    df_out.to_excel(os.path.join(path, "PipCapacity.xlsx"), index=False)                
+    _years = list(model.set_year)
+    _tables = []
+    for _var, _lines, _variable in [
+        (model.var_gamma_tra_line, model.set_line_tra, "Transmission"),
+        (model.var_gamma_high_line, model.set_line_high, "High-Pressure"),
+        (model.var_gamma_mid_line, model.set_line_mid, "Mid-Pressure"),
+    ]:
+        _lines = list(_lines)
+        # (year, line) -> rows per line and year
+        _capacity = get_values(_var, [_years, _lines]).T
+        _tables.append(
+            get_iamc_table(
+                _model,
+                _scenario,
+                np.repeat(_lines, len(_years)),
+                _variable + "|Pipeline capacity",
+                "MW",
+                np.tile(_years, len(_lines)),
+                _capacity.ravel(),
+            )
+        )
+    df_out = pd.concat(_tables, ignore_index=True)
+    write_table(df_out, path=path, name="PipCapacity", formats=formats)
 
 
     '''WRITE DEMAND SUPPLIED AND NOT SUPPLIED TO IAMC FORMAT'''
-    df_out = pd.DataFrame()
-    for year in model.set_year:
-        for month in model.set_time_unit:
-            for node in model.set_node_hp:
-                supplied = py.value(model.var_demand_high[node, year, month])
-                df_out = write_iamc_format_with_month(df_out, _model, _scenario, node, "Gas|Demand|High-Pressure|Supplied", "MWh", year, month, supplied)
-                notsupplied = model.par_demand_high[node, year, month] - py.value(model.var_demand_high[node, year, month])
-                df_out = write_iamc_format_with_month(df_out, _model, _scenario, node, "Gas|Demand|High-Pressure|Not Supplied", "MWh", year, month, notsupplied)
-            for node in model.set_node_mp:
-                supplied = py.value(model.var_demand_mid[node, year, month])
-                df_out = write_iamc_format_with_month(df_out, _model, _scenario, node, "Gas|Demand|Mid-Pressure|Supplied", "MWh", year, month, supplied)
-                notsupplied = model.par_demand_mid[node, year, month] - py.value(model.var_demand_mid[node, year, month])
-                df_out = write_iamc_format_with_month(df_out, _model, _scenario, node, "Gas|Demand|Mid-Pressure|Not Supplied", "MWh", year, month, notsupplied)
-    df_out.to_excel(os.path.join(path, "Demands.xlsx"), index=False)
-    return
+    _months = list(model.set_time_unit)
+    _blocks = []
+    for _level, _nodes in [("High", model.set_node_hp), ("Mid", model.set_node_mp)]:
+        _nodes = list(_nodes)
+        _index = [_nodes, _years, _months]
+        _level_name = _level.lower()
+        supplied = get_values(getattr(model, "var_demand_" + _level_name), _index)
+        available = get_values(getattr(model, "par_demand_" + _level_name), _index)
+        notsupplied = available - supplied
+        # rows per (year, month): supplied and not supplied per node
+        _values = np.stack([supplied, notsupplied], axis=-1).transpose(1, 2, 0, 3)
+        _variable = [
+            "Gas|Demand|{}-Pressure|Supplied".format(_level),
+            "Gas|Demand|{}-Pressure|Not Supplied".format(_level),
+        ]
+        _blocks.append(
+            (
+                _values.reshape(len(_years), len(_months), -1),
+                np.repeat(_nodes, 2),
+                np.tile(_variable, len(_nodes)),
+            )
+        )
+    _values = np.concatenate([_block[0] for _block in _blocks], axis=-1)
+    _region = np.concatenate([_block[1] for _block in _blocks])
+    _variable = np.concatenate([_block[2] for _block in _blocks])
+    _rows = _values.shape[-1]
+    df_out = get_iamc_table(
+        _model,
+        _scenario,
+        np.tile(_region, len(_years) * len(_months)),
+        np.tile(_variable, len(_years) * len(_months)),
+        "MWh",
+        np.repeat(_years, len(_months) * _rows),
+        _values.ravel(),
+        month=np.tile(np.repeat(_months, _rows), len(_years)),
+    )
+    write_table(df_out, path=path, name="Demands", formats=formats)
+
+    """DUALS OF THE NODAL BALANCES, LINE CAPACITIES AND DEMAND BOUNDS (ALL MONTHS)"""
+    if hasattr(model, "dual") or duals is not None:
+        write_duals(model=model, path=path, formats=formats, duals=duals)
+
+    """VALUES AND BASIS FOR A WARM START OF OTHER RUNS"""
+    write_start(model=model, path=path, formats=formats, basis=basis)
+
+    """APPEND THE RUN TO THE RESULTS STORE"""
+    store_results(path=path, store=store)
+    return path
+
+
+"""
+COMMAND LINE
+- python report.py solution/<scenario>-<time> [...]: Excel export on request
+- python report.py --store solution/<scenario>-<time> [...]: appends (earlier) runs
+  to the results store
+"""
+if __name__ == "__main__":
+    _store = "--store" in sys.argv[1:]
+    for _path in [_arg for _arg in sys.argv[1:] if _arg != "--store"]:
+        if _store:
+            print("{}: {}".format(store_results(path=_path), _path))
+        else:
+            for _file in export_to_excel(path=_path):
+                print(_file)
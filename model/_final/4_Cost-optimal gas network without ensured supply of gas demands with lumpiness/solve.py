@@ -0,0 +1,168 @@
+import importlib.util
+import os
+import sys
+import time
+
+
+"""
+SOLVE WORKER: python solve.py [stage/model.mps] [stage/model.sol]
+Solves the MPS file of the build stage (python model.py --stage build) and writes
+the solution for the report stage (python model.py --stage report). Only the
+solver is imported (gurobipy or highspy), no pyomo, pandas or geopandas, so that
+solves can run in lightweight processes. GND_SOLVER, GND_THREADS and
+GND_TIME_LIMIT are used as in model.py.
+"""
+SOLVERS = ["gurobi", "highs"]
+
+"""STATUS CODES OF GUROBI (GRB.Status) AS THE STATUS NAMES OF HIGHS"""
+GUROBI_STATUS = {
+    1: "Not Set",
+    2: "Optimal",
+    3: "Infeasible",
+    4: "Primal infeasible or unbounded",
+    5: "Unbounded",
+    6: "Bound on objective reached",
+    7: "Iteration limit reached",
+    8: "Node limit reached",
+    9: "Time limit reached",
+    10: "Solution limit reached",
+    11: "Interrupted by user",
+    12: "Numerical trouble",
+    13: "Suboptimal",
+    14: "In progress",
+    15: "Target for objective reached",
+    16: "Work limit reached",
+    17: "Memory limit reached",
+}
+
+
+def is_available(solver=None):
+    """Whether the Python API (and, for gurobi, a license) of the solver is found."""
+    try:
+        if solver == "gurobi":
+            import gurobipy
+
+            gurobipy.Env().dispose()
+        elif solver == "highs":
+            # the module is found without loading the library
+            return importlib.util.find_spec("highspy") is not None
+        else:
+            return False
+    except Exception:
+        return False
+    return True
+
+
+def solve_with_highs(file=None, threads=None, time_limit=None):
+    """
+    Parameters
+    ----------
+    file : String, required
+        The MPS file. The default is None.
+    threads : Integer, optional
+        The default is None.
+    time_limit : Float, optional
+        Time limit in seconds. The default is None.
+
+    Returns
+    -------
+    solution : Dict
+        Includes the status, the objective value, the values of the columns and
+        the duals of the rows (None for a MIP) as lists of (name, value).
+
+    """
+    import highspy
+
+    _highs = highspy.Highs()
+    if threads is not None:
+        _highs.setOptionValue("threads", int(threads))
+    if time_limit is not None:
+        _highs.setOptionValue("time_limit", float(time_limit))
+    _highs.readModel(file)
+    _highs.run()
+
+    _lp = _highs.getLp()
+    _solution = _highs.getSolution()
+    solution = {
+        "status": _highs.modelStatusToString(_highs.getModelStatus()),
+        "objective": _highs.getInfo().objective_function_value,
+        "columns": list(zip(_lp.col_names_, _solution.col_value)),
+        "rows": None,
+    }
+    if _solution.dual_valid:
+        solution["rows"] = list(zip(_lp.row_names_, _solution.row_dual))
+    return solution
+
+
+def solve_with_gurobipy(file=None, threads=None, time_limit=None):
+    """Same as solve_with_highs, but with gurobipy."""
+    import gurobipy
+
+    _model = gurobipy.read(file)
+    if threads is not None:
+        _model.Params.Threads = int(threads)
+    if time_limit is not None:
+        _model.Params.TimeLimit = float(time_limit)
+    _model.optimize()
+
+    solution = {
+        "status": GUROBI_STATUS.get(_model.Status, "Unknown"),
+        "objective": _model.ObjVal,
+        "columns": [(_var.VarName, _var.X) for _var in _model.getVars()],
+        "rows": None,
+    }
+    if not _model.IsMIP:
+        solution["rows"] = [
+            (_constraint.ConstrName, _constraint.Pi)
+            for _constraint in _model.getConstrs()
+        ]
+    return solution
+
+
+def write_solution(file=None, solution=None):
+    """
+    Writes the solution as plain text: a line with the status and one with the
+    objective value, then "columns <n>" and one line "<name> <value>" per column
+    and, unless the model is a MIP, "rows <n>" and one line "<name> <dual>" per
+    row.
+    """
+    with open(file, "w") as _file:
+        _file.write("status {}\n".format(solution["status"]))
+        _file.write("objective {:.17g}\n".format(solution["objective"]))
+        for _section in ["columns", "rows"]:
+            if solution[_section] is None:
+                continue
+            _file.write("{} {}\n".format(_section, len(solution[_section])))
+            for _name, _value in solution[_section]:
+                _file.write("{} {:.17g}\n".format(_name, _value))
+    return file
+
+
+if __name__ == "__main__":
+    _mps = sys.argv[1] if len(sys.argv) > 1 else os.path.join("stage", "model.mps")
+    _sol = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(_mps)[0] + ".sol"
+
+    solver = os.environ.get("GND_SOLVER")
+    if solver is None:
+        solver = next((_s for _s in SOLVERS if is_available(_s)), None)
+        if solver is None:
+            raise RuntimeError("None of the solvers {} is available.".format(SOLVERS))
+    if solver not in SOLVERS:
+        raise ValueError(
+            "Unknown solver '{}', choose one of {}.".format(solver, SOLVERS)
+        )
+
+    _start = time.perf_counter()
+    _solve = solve_with_gurobipy if solver == "gurobi" else solve_with_highs
+    solution = _solve(
+        file=_mps,
+        threads=os.environ.get("GND_THREADS"),
+        time_limit=os.environ.get("GND_TIME_LIMIT"),
+    )
+    write_solution(file=_sol, solution=solution)
+    _seconds = time.perf_counter() - _start
+    print(
+        "{}: {} (objective {}, {:.1f} s)".format(
+            _sol, solution["status"], solution["objective"], _seconds
+        )
+    )